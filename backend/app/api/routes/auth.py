@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
+from app.core.executors import HASHING, run_in_executor
 from app.models.schemas import (
     UserRegister, UserLogin, UserResponse, Token, UserCreate
 )
@@ -24,7 +25,10 @@ async def register(
     This creates both a new company and the first admin user.
     """
     try:
-        user, access_token = auth_service.register_company_and_admin(user_data, db)
+        # bcrypt is deliberately slow, keep it off the event loop
+        user, access_token = await run_in_executor(
+            HASHING, auth_service.register_company_and_admin, user_data, db
+        )
         
         return {
             "message": "Registration successful",
@@ -55,7 +59,9 @@ async def login(
     Returns access token for authenticated requests.
     """
     try:
-        user, access_token = auth_service.authenticate_user(
+        user, access_token = await run_in_executor(
+            HASHING,
+            auth_service.authenticate_user,
             credentials.email,
             credentials.password,
             db
@@ -100,7 +106,9 @@ async def create_user(
     Only admins can create new users for their company.
     """
     try:
-        user = auth_service.create_employee(
+        user = await run_in_executor(
+            HASHING,
+            auth_service.create_employee,
             user_data,
             current_user.company_id,
             db
@@ -1,18 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+import time
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Header, Request
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.core.database import get_db
-from app.models.schemas import DocumentUploadResponse, DocumentResponse, DocumentListResponse
-from app.services.document_service import DocumentService
+from app.core.executors import EMBEDDING, PARSING, run_in_executor
+from app.models.schemas import (
+    DocumentUploadResponse, DocumentResponse, DocumentListResponse, IngestionJobResponse,
+    BulkUploadResponse, UploadSessionCreate, UploadSessionResponse, SearchQuery, SearchResponse, SearchResult
+)
+from app.services.document_service import DocumentBusyError, DocumentService
+from app.services.ingestion_service import IngestionService
+from app.services.upload_session_service import UploadSessionConflictError, UploadSessionService
 from app.api.dependencies import get_current_user, get_current_admin_user
-from app.models.database import User
+from app.models.database import User, UploadSession
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
 document_service = DocumentService()
+ingestion_service = IngestionService(document_service)
+upload_session_service = UploadSessionService(document_service)
 
 
-@router.post("/upload", response_model=DocumentUploadResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/upload", response_model=DocumentUploadResponse, status_code=status.HTTP_202_ACCEPTED)
 async def upload_document(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_admin_user),
@@ -21,16 +30,22 @@ async def upload_document(
     """
     Upload a document (admin only).
     
-    Uploads and processes a PDF document, extracting text and generating embeddings.
+    Saves the PDF and queues it for ingestion. Poll the returned job ID
+    for parsing and embedding progress.
     """
     try:
-        document = await document_service.upload_document(
+        document, job = await document_service.upload_document(
             file=file,
             company_id=current_user.company_id,
             user_id=current_user.id,
-            db=db
+            db=db,
+            queue_job=ingestion_service.add_job
         )
-        return DocumentUploadResponse.from_orm(document)
+        ingestion_service.notify()
+        
+        response = DocumentUploadResponse.from_orm(document)
+        response.job_id = job.id
+        return response
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -43,6 +58,259 @@ async def upload_document(
         )
 
 
+@router.post("/bulk", response_model=BulkUploadResponse, status_code=status.HTTP_202_ACCEPTED)
+async def bulk_upload_documents(
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload many PDFs, or a single ZIP archive of PDFs (admin only).
+    
+    Accepted files are queued as one batch that workers ingest together.
+    Invalid and duplicate files are listed under ``skipped`` instead of
+    failing the whole upload.
+    """
+    try:
+        documents, jobs, skipped = await run_in_executor(
+            PARSING,
+            document_service.bulk_upload_documents,
+            files=files,
+            company_id=current_user.company_id,
+            user_id=current_user.id,
+            db=db,
+            queue_batch=ingestion_service.add_batch
+        )
+        ingestion_service.notify()
+        batch_id = jobs[0].batch_id if jobs else None
+        
+        responses = []
+        for document, job in zip(documents, jobs):
+            response = DocumentUploadResponse.from_orm(document)
+            response.job_id = job.id
+            responses.append(response)
+        
+        return BulkUploadResponse(batch_id=batch_id, documents=responses, skipped=skipped)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Bulk upload failed: {str(e)}"
+        )
+
+
+def _upload_session_response(session: UploadSession) -> UploadSessionResponse:
+    """Build the API view of an upload session."""
+    ranges = upload_session_service.received_ranges(session)
+    return UploadSessionResponse(
+        id=session.id,
+        original_filename=session.original_filename,
+        file_size=session.file_size,
+        received_bytes=sum(end - start for start, end in ranges),
+        received_ranges=[[start, end] for start, end in ranges],
+        created_at=session.created_at,
+        expires_at=session.expires_at,
+        completed_at=session.completed_at,
+        document_id=session.document_id
+    )
+
+
+@router.post("/uploads", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    upload: UploadSessionCreate,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Start a resumable upload (admin only).
+    
+    Send the file in byte ranges with ``PUT /documents/uploads/{id}``, then
+    call ``POST /documents/uploads/{id}/complete`` to queue it for ingestion.
+    """
+    try:
+        session = upload_session_service.create_session(
+            filename=upload.filename,
+            file_size=upload.file_size,
+            content_hash=upload.content_hash,
+            company_id=current_user.company_id,
+            user_id=current_user.id,
+            db=db
+        )
+        return _upload_session_response(session)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Could not create upload session: {str(e)}"
+        )
+
+
+@router.get("/uploads/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the byte ranges received so far, to resume an interrupted upload.
+    """
+    try:
+        session = upload_session_service.get_session(session_id, current_user.company_id, db)
+        return _upload_session_response(session)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+
+@router.put("/uploads/{session_id}", response_model=UploadSessionResponse)
+async def upload_range(
+    session_id: str,
+    request: Request,
+    content_range: str = Header(...),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload one byte range of a resumable upload (admin only).
+    
+    The request body holds the raw bytes named by the Content-Range header.
+    Ranges may be sent in any order and in parallel. Fails with 409 once
+    the session is being completed.
+    """
+    try:
+        session = await upload_session_service.write_range(
+            session_id=session_id,
+            company_id=current_user.company_id,
+            content_range=content_range,
+            body=request.stream(),
+            db=db
+        )
+        return _upload_session_response(session)
+    except UploadSessionConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Range upload failed: {str(e)}"
+        )
+
+
+@router.post("/uploads/{session_id}/complete", response_model=DocumentUploadResponse, status_code=status.HTTP_202_ACCEPTED)
+async def complete_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Finish a resumable upload and queue the document for ingestion (admin only).
+    """
+    try:
+        document, job = await upload_session_service.complete_session(
+            session_id=session_id,
+            company_id=current_user.company_id,
+            db=db,
+            queue_job=ingestion_service.add_job
+        )
+        ingestion_service.notify()
+        
+        response = DocumentUploadResponse.from_orm(document)
+        response.job_id = job.id
+        return response
+    except UploadSessionConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Could not complete upload: {str(e)}"
+        )
+
+
+@router.delete("/uploads/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Abort a resumable upload and delete the received data (admin only)."""
+    try:
+        upload_session_service.cancel_session(session_id, current_user.company_id, db)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+
+@router.put("/{document_id}", response_model=DocumentUploadResponse, status_code=status.HTTP_202_ACCEPTED)
+async def replace_document(
+    document_id: int,
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Replace a document with a revised version (admin only).
+    
+    Only chunks whose text changed are re-embedded; the job result reports
+    how many embeddings were reused and how many were recomputed. Refused
+    with 409 while an ingestion job is running on the document.
+    """
+    try:
+        document, job = await document_service.replace_document(
+            document_id=document_id,
+            file=file,
+            company_id=current_user.company_id,
+            db=db,
+            queue_job=ingestion_service.add_job
+        )
+        ingestion_service.notify()
+        
+        response = DocumentUploadResponse.from_orm(document)
+        response.job_id = job.id
+        return response
+    except DocumentBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Document replacement failed: {str(e)}"
+        )
+
+
 @router.get("/", response_model=DocumentListResponse)
 async def list_documents(
     current_user: User = Depends(get_current_user),
@@ -69,6 +337,83 @@ async def list_documents(
         )
 
 
+@router.post("/search", response_model=SearchResponse)
+async def search_documents(
+    search: SearchQuery,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Search the company's documents for several questions at once.
+    
+    All questions are embedded together and answered by one batched vector
+    store query, so evaluation runs and multi-question turns should send
+    their questions in one request instead of one request each. A single
+    question is embedded through the query micro-batcher, together with
+    other requests' questions arriving at the same time.
+    """
+    try:
+        started = time.perf_counter()
+        embeddings = None
+        if len(search.queries) == 1:
+            embedding = await document_service.embedding_service.generate_embedding_async(search.queries[0])
+            embeddings = embedding[None, :]
+        results = await run_in_executor(
+            EMBEDDING,
+            document_service.search_many,
+            queries=search.queries,
+            company_id=current_user.company_id,
+            db=db,
+            top_k=search.top_k,
+            embeddings=embeddings
+        )
+        return SearchResponse(
+            results=[
+                SearchResult(query=query, sources=sources)
+                for query, sources in zip(search.queries, results)
+            ],
+            response_time=int((time.perf_counter() - started) * 1000)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Search failed"
+        )
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the status and per-stage progress of an ingestion job.
+    """
+    try:
+        job = ingestion_service.get_job(
+            job_id=job_id,
+            company_id=current_user.company_id,
+            db=db
+        )
+        return IngestionJobResponse.from_orm(job)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve job"
+        )
+
+
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_document(
     document_id: int,
@@ -81,12 +426,19 @@ async def delete_document(
     Removes document from database and vector store.
     """
     try:
-        document_service.delete_document(
+        await run_in_executor(
+            EMBEDDING,
+            document_service.delete_document,
             document_id=document_id,
             company_id=current_user.company_id,
             db=db
         )
         return {"message": "Document deleted successfully"}
+    except DocumentBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,111 @@
+"""
+Management commands.
+
+Usage (from the backend directory):
+    python -m app.cli reindex --company 1 --workers 4
+    python -m app.cli fit-pca --samples 20000
+"""
+import argparse
+import json
+import logging
+import sys
+
+from app.core.database import init_db
+
+
+def reindex(args) -> int:
+    """Rebuild a company's vector collection with the current settings."""
+    from app.services.document_service import DocumentService
+    from app.services.reindex_service import ReindexService
+    
+    def report(progress):
+        print(
+            f"[{progress['completed']}/{progress['total']}] document {progress['document_id']}  "
+            f"{progress['documents_per_second']:.2f} docs/s  "
+            f"{progress['pages_per_second']:.1f} pages/s  "
+            f"{progress['chunks_per_second']:.1f} chunks/s  "
+            f"failed {progress['failed']}",
+            flush=True
+        )
+    
+    service = ReindexService(DocumentService(), workers=args.workers)
+    try:
+        summary = service.reindex_company(args.company, restart=args.restart, progress_callback=report)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    
+    print(json.dumps(summary, indent=2))
+    if not summary["swapped"]:
+        print("Some documents failed; rerun the command to retry them.", file=sys.stderr)
+        return 1
+    
+    if summary["queued"]:
+        print(
+            f"{len(summary['queued'])} documents changed during the swap; "
+            f"the API server's ingestion workers will re-ingest them."
+        )
+    
+    print("Restart the API server if EMBEDDING_MODEL changed, so queries use the new model.")
+    return 0
+
+
+def fit_pca(args) -> int:
+    """Fit the PCA projection used when EMBEDDING_DIMENSION is set, from stored chunks."""
+    from app.config import settings
+    from app.services.embedding_service import EmbeddingService
+    from app.services.vector_store_service import VectorStoreService
+    from app.utils.dimension_reduction import PCAProjection
+    
+    texts = VectorStoreService().sample_texts(args.samples)
+    service = EmbeddingService()
+    dimension = service.backend.get_dimension()
+    if len(texts) < dimension:
+        print(f"error: found {len(texts)} chunks, need at least {dimension} to fit a projection", file=sys.stderr)
+        return 1
+    
+    path = service.fit_projection(texts)
+    projection = PCAProjection.load(path)
+    print(f"Fitted to {len(texts)} chunks, saved to {path}")
+    for kept in (32, 64, 128, 192, 256, 384, 512, 768):
+        if kept < dimension:
+            print(f"  {kept:>4} dimensions keep {projection.retained_variance(kept):.1%} of variance")
+    print(
+        f"Set EMBEDDING_DIMENSION (now {settings.EMBEDDING_DIMENSION}) and EMBEDDING_REDUCTION=pca, "
+        f"restart the API server and reindex every company."
+    )
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    reindex_parser = commands.add_parser(
+        "reindex",
+        help="Re-parse, re-chunk and re-embed every document of a company"
+    )
+    reindex_parser.add_argument("--company", type=int, required=True, help="Company ID")
+    reindex_parser.add_argument("--workers", type=int, default=None, help="Documents processed in parallel")
+    reindex_parser.add_argument("--restart", action="store_true", help="Ignore saved progress and start over")
+    reindex_parser.set_defaults(handler=reindex)
+    
+    fit_pca_parser = commands.add_parser(
+        "fit-pca",
+        help="Fit the embedding model's PCA projection to a sample of stored chunks"
+    )
+    fit_pca_parser.add_argument("--samples", type=int, default=20000, help="Chunks to fit to")
+    fit_pca_parser.set_defaults(handler=fit_pca)
+    
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    init_db()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import os
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -17,11 +18,99 @@ class Settings(BaseSettings):
     # File Upload 
     UPLOAD_DIR: str = "./uploads"
     MAX_UPLOAD_SIZE: int = 25 * 1024 * 1024  # 25MB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # bytes read per write while saving uploads
+    BULK_MAX_FILES: int = 500  # files per bulk upload or ZIP archive
     ALLOWED_EXTENSIONS: set = {".pdf"}
     
+    # Resumable Uploads
+    RESUMABLE_MAX_UPLOAD_SIZE: int = 500 * 1024 * 1024  # 500MB
+    UPLOAD_SESSION_DIR: str = "./uploads/.sessions"
+    UPLOAD_SESSION_TTL: int = 24 * 60 * 60  # seconds an unfinished upload session is kept
+    UPLOAD_SESSION_CLEANUP_INTERVAL: float = 15 * 60  # seconds between removals of expired upload sessions
+    
+    # PDF Parsing
+    PDF_EXTRACTION_STRATEGY: str = "pdfplumber"  # "pdfplumber", "pypdf", or "tiered" (PyPDF2 with pdfplumber fallback per page)
+    PDF_PARSER_WORKERS: int = 4  # processes used for large PDFs, 1 disables parallel extraction
+    PDF_PARALLEL_MIN_PAGES: int = 50  # smaller documents are parsed in-process
+    PDF_PARALLEL_RANGE_PAGES: int = 16  # pages handed to a parser process at a time
+    
+    # Extraction Cache
+    EXTRACTION_CACHE_ENABLED: bool = True  # reuse extracted text when a file is processed again
+    EXTRACTION_CACHE_DIR: str = "./instance/extraction_cache"
+    EXTRACTION_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024  # 1GB, least recently used entries are evicted
+    EXTRACTION_CACHE_COMPRESSION: int = 6  # gzip level
+    
     # Text Processing 
     CHUNK_SIZE: int = 500
     CHUNK_OVERLAP: int = 50
+    CHUNKING_MODE: str = "chars"  # "chars" (CHUNK_SIZE characters) or "tokens" (embedding model tokens)
+    CHUNK_MAX_TOKENS: int = 0  # token budget per chunk, 0 uses the model's max sequence length
+    CHUNK_OVERLAP_TOKENS: int = 32
+
+    # Embeddings
+    EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_WARMUP_TEXTS: int = 8  # dummy texts embedded at startup before /ready reports ready, 0 skips
+    EMBEDDING_DIMENSION: int = 0  # reduce vectors to this many dimensions, 0 keeps the model's
+    EMBEDDING_REDUCTION: str = "pca"  # "pca" (fitted with `python -m app.cli fit-pca`) or "truncate" (Matryoshka models)
+    EMBEDDING_PCA_DIR: str = "./instance/pca"  # fitted projections, one per model
+    EMBEDDING_NORMALIZE: bool = True  # scale vectors to unit length, so distances are cosine-based
+    EMBEDDING_BATCH_SIZE: int = 32  # texts per model forward pass when not length-bucketing
+    EMBEDDING_LENGTH_BUCKETING: bool = True  # batch texts of similar token length, sized by EMBEDDING_TOKEN_BUDGET
+    EMBEDDING_TOKEN_BUDGET: int = 4096  # padded tokens per forward pass, bounds activation memory
+    EMBEDDING_MAX_BATCH_SIZE: int = 128  # texts per forward pass, however short
+    EMBEDDING_BUCKET_MAX_PADDING: float = 0.2  # share of a text's batch length that may be padding
+    EMBEDDING_BACKEND: str = "torch"  # "torch" (sentence-transformers) or "onnx" (ONNX Runtime)
+    EMBEDDING_ONNX_DIR: str = "./instance/onnx"  # exported models, created on first use
+    EMBEDDING_ONNX_QUANTIZE: bool = False  # dynamic int8 weights, faster on CPU at a small accuracy cost
+    EMBEDDING_ONNX_THREADS: int = 0  # intra-op threads, 0 lets ONNX Runtime decide
+    EMBEDDING_POOL_WORKERS: int = 0  # processes with their own model copy for large ingestion batches, 0 embeds in-process
+    EMBEDDING_POOL_THREADS: int = 4  # intra-op threads per pool process
+    EMBEDDING_POOL_MIN_TEXTS: int = 64  # smaller calls (queries) stay in-process
+    EMBEDDING_MICROBATCH_MAX_SIZE: int = 32  # concurrent query embeddings combined into one call
+    EMBEDDING_MICROBATCH_MAX_WAIT_MS: float = 5.0  # how long a query waits for others to batch with
+    
+    # Embedding Cache
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MEMORY_ENTRIES: int = 50000  # vectors kept in the in-process LRU
+    EMBEDDING_CACHE_DB: str = "./instance/embedding_cache.db"  # persistent tier, empty disables it
+    EMBEDDING_CACHE_DISK_MAX_ENTRIES: int = 2000000  # oldest vectors are pruned beyond this
+    
+    # Vector Store
+    VECTOR_STORE_BACKEND: str = "chroma"  # "chroma" or "native" (memory-mapped matrices, searched in process)
+    CHROMA_DB_DIR: str = "./instance/chroma_db"
+    VECTOR_STORE_NATIVE_DIR: str = "./instance/vectors"  # collections of the native backend
+    VECTOR_STORE_NATIVE_INDEX: str = "flat"  # "flat" (exact search) or "ivf" (clustered, for large collections)
+    VECTOR_STORE_IVF_MIN_ROWS: int = 50000  # smaller collections are searched exactly even with "ivf"
+    VECTOR_STORE_IVF_LISTS: int = 0  # k-means clusters, 0 uses the square root of the row count
+    VECTOR_STORE_IVF_PROBES: int = 16  # clusters scanned per query, more is slower but closer to exact
+    VECTOR_STORE_COLLECTION_CACHE_SIZE: int = 1024  # collection handles kept open, 0 looks every collection up per call
+    TOP_K_RETRIEVAL: int = 5
+    SEARCH_MAX_QUERIES: int = 256  # questions per batched search request
+
+    # Ingestion Queue
+    INGESTION_WORKERS: int = 2
+    INGESTION_MAX_ATTEMPTS: int = 3
+    INGESTION_RETRY_BACKOFF: int = 30  # seconds, doubled on every retry
+    INGESTION_POLL_INTERVAL: float = 2.0  # seconds
+    INGESTION_HEARTBEAT_INTERVAL: float = 30.0  # seconds between heartbeats of running jobs, also how often stale jobs are swept
+    INGESTION_JOB_TIMEOUT: int = 5 * 60  # seconds without a heartbeat before a running job is requeued
+    INGESTION_STREAMING: bool = True  # parse, chunk, embed and index page by page
+    INGESTION_BATCH_SIZE: int = 64  # chunks embedded and written to the vector store together
+    INGESTION_BULK_DOCUMENTS: int = 16  # documents of a bulk upload a worker ingests together
+    
+    # Reindexing
+    REINDEX_WORKERS: int = 4  # documents rebuilt in parallel by `python -m app.cli reindex`
+    REINDEX_STATE_DIR: str = "./instance/reindex"  # progress files that let an interrupted reindex resume
+    
+    # Request Executors (blocking work done for a request, off the event loop)
+    PARSING_EXECUTOR_WORKERS: int = 2  # archive extraction and PDF checks
+    EMBEDDING_EXECUTOR_WORKERS: int = 2  # model inference and vector store writes
+    HASHING_EXECUTOR_WORKERS: int = 4  # bcrypt and upload hashing
+    UPLOAD_EXECUTOR_WORKERS: int = 4  # file writes of resumable upload ranges
+    
+    # Event Loop Monitor
+    EVENT_LOOP_MONITOR_INTERVAL_MS: float = 100.0  # how often the loop is probed
+    EVENT_LOOP_STALL_THRESHOLD_MS: float = 100.0  # lag logged as a stall
 
      # CORS
     BACKEND_CORS_ORIGINS: list = [
@@ -37,4 +126,5 @@ settings = Settings()
 
 # Create necessary directories
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
 os.makedirs("./instance", exist_ok=True)
\ No newline at end of file
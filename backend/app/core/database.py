@@ -1,7 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, Session
 from app.config import settings
-from app.models.database import Base
+from app.models.database import Base, Document
 
 # Create database engine
 engine = create_engine(
@@ -16,6 +16,42 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 def init_db():
     """Initialize database tables."""
     Base.metadata.create_all(bind=engine)
+    _upgrade_documents()
+
+
+def _upgrade_documents():
+    """
+    Add the document columns introduced after the table was first created.
+    
+    ``create_all`` only creates missing tables, so a database from an older
+    release keeps its old ``documents`` table. Missing columns are added and
+    backfilled for the existing rows, then their indexes are created.
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns("documents")}
+    
+    with engine.begin() as connection:
+        if "content_hash" not in columns:
+            # Existing documents are not hashed, so they are not found as duplicates
+            connection.execute(text("ALTER TABLE documents ADD COLUMN content_hash VARCHAR(64)"))
+        
+        if "status" not in columns:
+            connection.execute(text(
+                "ALTER TABLE documents ADD COLUMN status VARCHAR(9) NOT NULL DEFAULT 'QUEUED'"
+            ))
+            # Older releases processed documents inline; an unprocessed one is never
+            # picked up again, so mark it failed and let it be uploaded again
+            connection.execute(text(
+                "UPDATE documents SET status = CASE WHEN processed THEN 'INDEXED' ELSE 'FAILED' END"
+            ))
+    
+    _create_index("ix_documents_status")
+    _create_index("ix_documents_company_content_hash")
+
+
+def _create_index(name: str):
+    """Create one of the documents table's indexes if it does not exist yet."""
+    index = next(index for index in Document.__table__.indexes if index.name == name)
+    index.create(bind=engine, checkfirst=True)
 
 
 def get_db() -> Session:
@@ -0,0 +1,85 @@
+"""
+Dedicated thread pools for blocking work done on behalf of requests.
+
+Each kind of work has its own separately sized pool, so a burst of uploads
+cannot starve logins, and none of it runs on the event loop:
+
+- ``PARSING``: archive extraction and PDF checks
+- ``EMBEDDING``: model inference and vector store writes
+- ``HASHING``: bcrypt and hashing of uploaded files
+- ``UPLOADS``: file writes of resumable upload ranges
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+import logging
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARSING = "parsing"
+EMBEDDING = "embedding"
+HASHING = "hashing"
+UPLOADS = "uploads"
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def _pool_size(kind: str) -> int:
+    """Get the configured size of a pool."""
+    sizes = {
+        PARSING: settings.PARSING_EXECUTOR_WORKERS,
+        EMBEDDING: settings.EMBEDDING_EXECUTOR_WORKERS,
+        HASHING: settings.HASHING_EXECUTOR_WORKERS,
+        UPLOADS: settings.UPLOAD_EXECUTOR_WORKERS
+    }
+    if kind not in sizes:
+        raise ValueError(f"Unknown executor: {kind}")
+    return max(1, sizes[kind])
+
+
+def get_executor(kind: str) -> ThreadPoolExecutor:
+    """
+    Get the pool for a kind of work, creating it on first use.
+    
+    Args:
+        kind: One of PARSING, EMBEDDING, HASHING or UPLOADS
+        
+    Returns:
+        Thread pool executor
+    """
+    with _lock:
+        if kind not in _executors:
+            _executors[kind] = ThreadPoolExecutor(max_workers=_pool_size(kind), thread_name_prefix=kind)
+        return _executors[kind]
+
+
+async def run_in_executor(kind: str, func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking function on a pool and await its result.
+    
+    Args:
+        kind: One of PARSING, EMBEDDING, HASHING or UPLOADS
+        func: Function to call
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+        
+    Returns:
+        Whatever func returns
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(kind), partial(func, *args, **kwargs))
+
+
+def shutdown_executors():
+    """Shut every pool down, waiting for running work to finish."""
+    with _lock:
+        executors = list(_executors.items())
+        _executors.clear()
+    
+    for kind, executor in executors:
+        executor.shutdown(wait=True, cancel_futures=True)
+        logger.info(f"Stopped {kind} executor")
@@ -0,0 +1,69 @@
+"""
+Event loop lag monitor.
+
+A background task sleeps for a fixed interval and measures how late it
+wakes up. The delay is how long the loop was blocked by something running
+on it; it is exported as a histogram and stalls are logged.
+"""
+import asyncio
+from typing import Optional
+import logging
+from app.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+lag_seconds = metrics.histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a scheduled wake-up",
+    [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+)
+stalls = metrics.counter(
+    "event_loop_stalls_total",
+    "Wake-ups delayed by more than EVENT_LOOP_STALL_THRESHOLD_MS"
+)
+
+
+class EventLoopMonitor:
+    """Measure event loop responsiveness."""
+    
+    def __init__(self, interval: float = None, threshold: float = None):
+        """
+        Initialize event loop monitor.
+        
+        Args:
+            interval: Seconds between probes (defaults to EVENT_LOOP_MONITOR_INTERVAL_MS)
+            threshold: Lag in seconds logged as a stall (defaults to EVENT_LOOP_STALL_THRESHOLD_MS)
+        """
+        self.interval = settings.EVENT_LOOP_MONITOR_INTERVAL_MS / 1000 if interval is None else interval
+        self.threshold = settings.EVENT_LOOP_STALL_THRESHOLD_MS / 1000 if threshold is None else threshold
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """Start probing the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        """Stop probing."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+    
+    async def _run(self):
+        """Sleep, measure the wake-up delay, repeat."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            
+            lag_seconds.observe(lag)
+            if lag >= self.threshold:
+                stalls.inc()
+                logger.warning(f"Event loop stalled for {lag * 1000:.0f} ms")
@@ -0,0 +1,132 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Counters and gauges are registered at import time by the modules that own
+them and rendered by the ``/metrics`` endpoint.
+"""
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Sequence, Tuple
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+    
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1, **labels):
+        """Increase the counter for a label combination."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def get(self, **labels) -> float:
+        """Get the current value for a label combination."""
+        return self._values.get(tuple(sorted(labels.items())), 0)
+    
+    def samples(self):
+        with self._lock:
+            return list(self._values.items())
+
+
+class Gauge:
+    """Value read from a callback at render time."""
+    
+    def __init__(self, name: str, description: str, read: Callable[[], float]):
+        self.name = name
+        self.description = description
+        self.read = read
+    
+    def samples(self):
+        return [((), self.read())]
+
+
+class Histogram:
+    """Distribution of observed values over fixed buckets."""
+    
+    def __init__(self, name: str, description: str, buckets: Sequence[float]):
+        self.name = name
+        self.description = description
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float):
+        """Record one observation."""
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value)] += 1
+            self._sum += value
+    
+    def samples(self):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + [float("inf")], counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            samples.append(((("le", le),), cumulative, "_bucket"))
+        samples.append(((), total, "_sum"))
+        samples.append(((), cumulative, "_count"))
+        return samples
+
+
+class MetricsRegistry:
+    """Collection of named metrics."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+    
+    def counter(self, name: str, description: str) -> Counter:
+        """Get or create a counter."""
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, description)
+            return self._metrics[name]
+    
+    def gauge(self, name: str, description: str, read: Callable[[], float]) -> Gauge:
+        """Register (or replace) a gauge."""
+        with self._lock:
+            self._metrics[name] = Gauge(name, description, read)
+            return self._metrics[name]
+    
+    def histogram(self, name: str, description: str, buckets: Sequence[float]) -> Histogram:
+        """Get or create a histogram."""
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, description, buckets)
+            return self._metrics[name]
+    
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        
+        kinds = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {kinds[type(metric)]}")
+            try:
+                samples = metric.samples()
+            except Exception:
+                continue
+            for sample in samples:
+                labels, value = sample[0], sample[1]
+                suffix = sample[2] if len(sample) > 2 else ""
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+                name = f"{metric.name}{suffix}"
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
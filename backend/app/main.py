@@ -1,10 +1,16 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 import logging
 
 from app.config import settings
 from app.core.database import init_db
-from app.api.routes import auth
+from app.core.executors import EMBEDDING, UPLOADS, run_in_executor, shutdown_executors
+from app.core.loop_monitor import EventLoopMonitor
+from app.core.metrics import metrics
+from app.api.routes import auth, documents
+from app.utils.pdf_parser import PDFParser
 
 # Configure logging
 logging.basicConfig(
@@ -13,6 +19,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+loop_monitor = EventLoopMonitor()
+warm_up_task = None
+session_cleanup_task = None
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
@@ -31,6 +41,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(auth.router, prefix="/api")
+app.include_router(documents.router, prefix="/api")
 
 
 @app.on_event("startup")
@@ -42,9 +53,57 @@ async def startup_event():
     init_db()
     logger.info("Database initialized")
     
+    # Drop resumable uploads that were abandoned, now and then periodically
+    documents.upload_session_service.cleanup_expired_sessions()
+    global session_cleanup_task
+    session_cleanup_task = asyncio.create_task(cleanup_upload_sessions())
+    
+    # Start background ingestion workers
+    documents.ingestion_service.start()
+    
+    # Report event loop stalls
+    loop_monitor.start()
+    
+    # Load the model and vector store in the background, /ready reports when done
+    global warm_up_task
+    warm_up_task = asyncio.create_task(warm_up())
+    
     logger.info("Application startup complete")
 
 
+async def warm_up():
+    """Load and warm up the embedding model and vector store off the event loop."""
+    try:
+        await run_in_executor(EMBEDDING, documents.document_service.warm_up)
+        logger.info("Application ready")
+    except Exception as e:
+        logger.error(f"Warm-up failed: {str(e)}")
+
+
+async def cleanup_upload_sessions():
+    """Remove expired resumable upload sessions every UPLOAD_SESSION_CLEANUP_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(settings.UPLOAD_SESSION_CLEANUP_INTERVAL)
+        try:
+            await run_in_executor(UPLOADS, documents.upload_session_service.cleanup_expired_sessions)
+        except Exception as e:
+            logger.error(f"Upload session cleanup failed: {str(e)}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers on shutdown."""
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    if session_cleanup_task is not None:
+        session_cleanup_task.cancel()
+    await loop_monitor.stop()
+    documents.ingestion_service.stop()
+    documents.document_service.embedding_service.close()
+    shutdown_executors()
+    PDFParser.shutdown()
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -57,13 +116,38 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Health check endpoint, healthy as soon as the process serves requests (see /ready)."""
     return {
         "status": "healthy",
         "version": settings.APP_VERSION
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the embedding model and vector store are loaded and warmed up."""
+    if documents.document_service.ready:
+        status = "ready"
+    elif warm_up_task is not None and warm_up_task.done():
+        status = "failed"
+    else:
+        status = "starting"
+    return JSONResponse(
+        status_code=200 if status == "ready" else 503,
+        content={
+            "status": status,
+            "version": settings.APP_VERSION
+        }
+    )
+
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Metrics in the Prometheus text format."""
+    return metrics.render()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -12,6 +12,26 @@ class UserRole(str, enum.Enum):
     EMPLOYEE = "employee"
 
 
+class DocumentStatus(str, enum.Enum):
+    QUEUED = "queued"
+    PARSING = "parsing"
+    EMBEDDING = "embedding"
+    INDEXED = "indexed"
+    FAILED = "failed"
+
+
+class JobType(str, enum.Enum):
+    INGEST = "ingest"
+    REPLACE = "replace"
+
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 class Company(Base):
     __tablename__ = "companies"
     
@@ -58,10 +78,12 @@ class Document(Base):
     original_filename = Column(String(255), nullable=False)
     file_path = Column(String(512), nullable=False)
     file_size = Column(Integer, nullable=False)  # in bytes
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the file contents
     page_count = Column(Integer, nullable=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, index=True)
     uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
+    status = Column(SQLEnum(DocumentStatus), nullable=False, default=DocumentStatus.QUEUED, index=True)
     processed = Column(Boolean, default=False)
     processed_at = Column(DateTime, nullable=True)
     chunk_count = Column(Integer, default=0)
@@ -69,11 +91,51 @@ class Document(Base):
     # Relationships
     company = relationship("Company", back_populates="documents")
     uploader = relationship("User")
+    jobs = relationship("IngestionJob", back_populates="document", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index("ix_documents_company_content_hash", "company_id", "content_hash"),
+    )
     
     def __repr__(self):
         return f"<Document(id={self.id}, filename='{self.filename}', company_id={self.company_id})>"
 
 
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, index=True)
+    job_type = Column(SQLEnum(JobType), nullable=False, default=JobType.INGEST)
+    status = Column(SQLEnum(JobStatus), nullable=False, default=JobStatus.QUEUED, index=True)
+    stage = Column(SQLEnum(DocumentStatus), nullable=False, default=DocumentStatus.QUEUED)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    error = Column(Text, nullable=True)
+    worker_id = Column(String(64), nullable=True)
+    batch_id = Column(String(32), nullable=True, index=True)  # set for jobs from a bulk upload
+    
+    # Per-stage progress
+    pages_total = Column(Integer, default=0)
+    pages_processed = Column(Integer, default=0)
+    chunks_total = Column(Integer, default=0)
+    chunks_embedded = Column(Integer, default=0)
+    result = Column(Text, nullable=True)  # JSON summary written when the job completes
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    available_at = Column(DateTime, default=datetime.utcnow, index=True)  # not claimable before this (retry backoff)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    document = relationship("Document", back_populates="jobs")
+    
+    def __repr__(self):
+        return f"<IngestionJob(id={self.id}, document_id={self.document_id}, status='{self.status}')>"
+
+
 class ChatHistory(Base):
     __tablename__ = "chat_histories"
     
@@ -91,4 +153,47 @@ class ChatHistory(Base):
     company = relationship("Company", back_populates="chat_histories")
     
     def __repr__(self):
-        return f"<ChatHistory(id={self.id}, user_id={self.user_id}, created_at='{self.created_at}')>"
\ No newline at end of file
+        return f"<ChatHistory(id={self.id}, user_id={self.user_id}, created_at='{self.created_at}')>"
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+    
+    id = Column(String(32), primary_key=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, index=True)
+    uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    original_filename = Column(String(255), nullable=False)
+    file_size = Column(Integer, nullable=False)  # declared total size in bytes
+    content_hash = Column(String(64), nullable=True)  # expected SHA-256, checked on completion
+    part_path = Column(String(512), nullable=False)  # file the ranges are written into
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    completed_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    parts = relationship(
+        "UploadPart",
+        back_populates="session",
+        cascade="all, delete-orphan",
+        order_by="UploadPart.start"
+    )
+    
+    def __repr__(self):
+        return f"<UploadSession(id='{self.id}', file_size={self.file_size}, company_id={self.company_id})>"
+
+
+class UploadPart(Base):
+    __tablename__ = "upload_parts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String(32), ForeignKey("upload_sessions.id"), nullable=False, index=True)
+    start = Column(Integer, nullable=False)
+    end = Column(Integer, nullable=False)  # exclusive
+    received_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    session = relationship("UploadSession", back_populates="parts")
+    
+    def __repr__(self):
+        return f"<UploadPart(session_id='{self.session_id}', start={self.start}, end={self.end})>"
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+import json
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Annotated, Optional, List, Dict, Any
 from datetime import datetime
-from app.models.database import UserRole
+from app.models.database import UserRole, DocumentStatus, JobStatus, JobType
 
 
 # ============ Auth Schemas ============
@@ -70,7 +71,9 @@ class DocumentUploadResponse(BaseModel):
     original_filename: str
     file_size: int
     uploaded_at: datetime
+    status: DocumentStatus
     processed: bool
+    job_id: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -82,7 +85,9 @@ class DocumentResponse(BaseModel):
     original_filename: str
     file_size: int
     page_count: Optional[int]
+    content_hash: Optional[str]
     uploaded_at: datetime
+    status: DocumentStatus
     processed: bool
     processed_at: Optional[datetime]
     chunk_count: int
@@ -96,6 +101,66 @@ class DocumentListResponse(BaseModel):
     total: int
 
 
+class SkippedUpload(BaseModel):
+    filename: str
+    detail: str
+
+
+class BulkUploadResponse(BaseModel):
+    batch_id: Optional[str]
+    documents: List[DocumentUploadResponse]
+    skipped: List[SkippedUpload]
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    file_size: int = Field(..., gt=0)
+    content_hash: Optional[str] = Field(None, min_length=64, max_length=64)
+
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    original_filename: str
+    file_size: int
+    received_bytes: int
+    received_ranges: List[List[int]]  # [start, end) byte ranges stored so far
+    created_at: datetime
+    expires_at: datetime
+    completed_at: Optional[datetime]
+    document_id: Optional[int]
+
+
+class IngestionJobResponse(BaseModel):
+    id: int
+    document_id: int
+    batch_id: Optional[str]
+    job_type: JobType
+    status: JobStatus
+    stage: DocumentStatus
+    attempts: int
+    max_attempts: int
+    error: Optional[str]
+    pages_total: int
+    pages_processed: int
+    chunks_total: int
+    chunks_embedded: int
+    result: Optional[Dict[str, Any]]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    
+    @field_validator("result", mode="before")
+    @classmethod
+    def parse_result(cls, value):
+        """Jobs store their result as a JSON string."""
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
+    
+    class Config:
+        from_attributes = True
+
+
 # ============ Chat Schemas ============
 class ChatQuery(BaseModel):
     query: str = Field(..., min_length=1, max_length=1000)
@@ -109,6 +174,21 @@ class Source(BaseModel):
     relevance_score: float
 
 
+class SearchQuery(BaseModel):
+    queries: List[Annotated[str, Field(min_length=1, max_length=1000)]] = Field(..., min_length=1)
+    top_k: Optional[int] = Field(None, ge=1, le=100)
+
+
+class SearchResult(BaseModel):
+    query: str
+    sources: List[Source]
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchResult]  # one per query, in request order
+    response_time: int  # milliseconds
+
+
 class ChatResponse(BaseModel):
     query: str
     response: str
@@ -5,6 +5,7 @@ import logging
 from app.models.database import User, Company, UserRole
 from app.models.schemas import UserRegister, UserCreate
 from app.core.security import get_password_hash, verify_password, create_access_token
+from app.services.vector_store_service import VectorStoreService
 
 
 logger = logging.getLogger(__name__)
@@ -13,6 +14,9 @@ logger = logging.getLogger(__name__)
 class AuthService:
     """Handle authentication and user management."""
     
+    def __init__(self):
+        # Shares the process-wide vector store backend with the document service
+        self.vector_store = VectorStoreService()
     
     def register_company_and_admin(
         self,
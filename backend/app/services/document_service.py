@@ -1,161 +1,960 @@
 import os
-import shutil
+import zipfile
 from datetime import datetime
-from typing import List
+from typing import List, Dict, Optional, Callable, Tuple, BinaryIO, Iterator
 from fastapi import UploadFile
 from sqlalchemy.orm import Session
+import numpy as np
 import logging
 
-from app.models.database import Document
+from app.models.database import Document, DocumentStatus, IngestionJob, JobStatus, JobType
 from app.config import settings
+from app.core.executors import HASHING, run_in_executor
 from app.utils.pdf_parser import PDFParser
 from app.utils.text_chunker import TextChunker
+from app.utils.upload_writer import UploadWriter
+from app.utils.extraction_cache import ExtractionCache
 from app.services.embedding_service import EmbeddingService
 from app.services.vector_store_service import VectorStoreService
 
 logger = logging.getLogger(__name__)
 
+# Adds a document's ingestion job to the session without committing, see IngestionService.add_job
+QueueJob = Callable[[Document, Session, JobType], IngestionJob]
+
+
+class DocumentBusyError(Exception):
+    """A document cannot be changed while an ingestion job is working on it."""
+
 
 class DocumentService:
     """Handle document upload, processing, and management."""
     
     def __init__(self):
         self.pdf_parser = PDFParser()
-        self.text_chunker = TextChunker()
+        self.extraction_cache = ExtractionCache(PDFParser.PARSER_VERSION)
         self.embedding_service = EmbeddingService()
-        self.vector_store = VectorStoreService()
+        self._text_chunker = None
+        self.vector_store = VectorStoreService(self.embedding_service)
+        self.ready = False
+    
+    @property
+    def text_chunker(self) -> TextChunker:
+        """Chunker for the configured CHUNKING_MODE, created on first use (token mode loads the model)."""
+        if self._text_chunker is None:
+            self._text_chunker = self._create_chunker()
+        return self._text_chunker
+    
+    def warm_up(self):
+        """
+        Load everything document processing and search need: the embedding
+        model (with a warm-up batch), the chunker and the vector store.
+        Blocks until done, then sets ``ready``.
+        """
+        self.embedding_service.warm_up()
+        self.text_chunker
+        self.vector_store.backend
+        self.ready = True
+    
+    def _create_chunker(self) -> TextChunker:
+        """Create the chunker for the configured CHUNKING_MODE."""
+        if settings.CHUNKING_MODE == "tokens":
+            model_max_tokens = self.embedding_service.get_max_tokens()
+            max_tokens = min(settings.CHUNK_MAX_TOKENS or model_max_tokens, model_max_tokens)
+            logger.info(f"Chunking by tokens, up to {max_tokens} per chunk")
+            return TextChunker(
+                tokenizer=self.embedding_service.get_tokenizer(),
+                max_tokens=max_tokens,
+                overlap_tokens=settings.CHUNK_OVERLAP_TOKENS
+            )
+        
+        if settings.CHUNKING_MODE != "chars":
+            raise ValueError(f"Unknown CHUNKING_MODE: {settings.CHUNKING_MODE}")
+        return TextChunker()
     
     async def upload_document(
         self,
         file: UploadFile,
         company_id: int,
         user_id: int,
-        db: Session
-    ) -> Document:
+        db: Session,
+        queue_job: QueueJob
+    ) -> Tuple[Document, IngestionJob]:
         """
-        Upload and process a document.
+        Save an uploaded document and create its database record.
+        
+        Processing happens later on the ingestion queue, so the returned
+        document is still in the ``queued`` state.
         
         Args:
             file: Uploaded file
             company_id: Company ID
             user_id: User ID who uploaded
             db: Database session
+            queue_job: Adds the document's ingestion job to the transaction
             
         Returns:
-            Document database record
+            Tuple of (document database record, its ingestion job)
         """
+        file_path = None
         try:
-            # Validate file
-            if not file.filename.endswith('.pdf'):
-                raise ValueError("Only PDF files are supported")
-            
-            # Check file size
-            file.file.seek(0, 2)  # Seek to end
-            file_size = file.file.tell()
-            file.file.seek(0)  # Reset to beginning
-            
-            if file_size > settings.MAX_UPLOAD_SIZE:
-                raise ValueError(f"File size exceeds {settings.MAX_UPLOAD_SIZE / (1024*1024)}MB limit")
-            
-            # Generate unique filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{company_id}_{timestamp}_{file.filename}"
-            file_path = os.path.join(settings.UPLOAD_DIR, filename)
-            
-            # Save file
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            filename, file_path, file_size, content_hash = await self._save_upload(file, company_id)
             
-            logger.info(f"File saved: {file_path}")
-            
-            # Create database record
-            document = Document(
+            return self.create_document(
                 filename=filename,
                 original_filename=file.filename,
                 file_path=file_path,
                 file_size=file_size,
+                content_hash=content_hash,
                 company_id=company_id,
-                uploaded_by=user_id,
-                processed=False
+                user_id=user_id,
+                db=db,
+                queue_job=queue_job
+            )
+        
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error uploading document: {str(e)}")
+            # Cleanup file if it was saved
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+    
+    def create_document(
+        self,
+        filename: str,
+        original_filename: str,
+        file_path: str,
+        file_size: int,
+        content_hash: str,
+        company_id: int,
+        user_id: int,
+        db: Session,
+        queue_job: QueueJob
+    ) -> Tuple[Document, IngestionJob]:
+        """
+        Create the database record for a file saved in the upload directory.
+        
+        The document and its ingestion job are committed together.
+        
+        Args:
+            filename: Stored filename
+            original_filename: Name the file was uploaded as
+            file_path: Path of the saved file
+            file_size: File size in bytes
+            content_hash: SHA-256 hex digest of the file contents
+            company_id: Company ID
+            user_id: User ID who uploaded
+            db: Database session
+            queue_job: Adds the document's ingestion job to the transaction
+            
+        Returns:
+            Tuple of (document database record, its ingestion job)
+        """
+        # Identical files are not ingested twice
+        duplicate = self.find_duplicate(company_id, content_hash, db)
+        if duplicate:
+            raise ValueError(
+                f"This file was already uploaded as '{duplicate.original_filename}' "
+                f"(document {duplicate.id})"
             )
+        
+        document = Document(
+            filename=filename,
+            original_filename=original_filename,
+            file_path=file_path,
+            file_size=file_size,
+            content_hash=content_hash,
+            company_id=company_id,
+            uploaded_by=user_id,
+            status=DocumentStatus.QUEUED,
+            processed=False
+        )
+        
+        db.add(document)
+        db.flush()
+        job = queue_job(document, db, JobType.INGEST)
+        db.commit()
+        db.refresh(document)
+        
+        logger.info(f"Queued ingestion job {job.id} for document {document.id}")
+        return document, job
+    
+    async def replace_document(
+        self,
+        document_id: int,
+        file: UploadFile,
+        company_id: int,
+        db: Session,
+        queue_job: QueueJob
+    ) -> Tuple[Document, IngestionJob]:
+        """
+        Save a revised version of a document.
+        
+        The existing chunks stay searchable until the queued replace job
+        swaps in the changed ones, see ``reprocess_document``. The new
+        version and its replace job are committed together. A job still
+        queued for the old version is cancelled; while one is running the
+        replacement is refused, as its worker is reading the old file and
+        writing the document's chunks.
+        
+        Args:
+            document_id: Document to replace
+            file: Uploaded revision
+            company_id: Company ID
+            db: Database session
+            queue_job: Adds the document's replace job to the transaction
             
-            db.add(document)
+        Returns:
+            Tuple of (updated document database record, its replace job)
+            
+        Raises:
+            ValueError: If the document does not exist or the file is a duplicate
+            DocumentBusyError: If an ingestion job is running on the document
+        """
+        document = db.query(Document).filter(
+            Document.id == document_id,
+            Document.company_id == company_id
+        ).first()
+        
+        if not document:
+            raise ValueError("Document not found")
+        
+        file_path = None
+        try:
+            filename, file_path, file_size, content_hash = await self._save_upload(file, company_id)
+            
+            if content_hash == document.content_hash:
+                raise ValueError("The uploaded file is identical to the current version")
+            
+            duplicate = self.find_duplicate(company_id, content_hash, db)
+            if duplicate and duplicate.id != document.id:
+                raise ValueError(
+                    f"This file was already uploaded as '{duplicate.original_filename}' "
+                    f"(document {duplicate.id})"
+                )
+            
+            self._cancel_queued_jobs(document_id, db, action="replace", reason="Superseded by a newer version")
+            old_file_path = document.file_path
+            
+            document.filename = filename
+            document.original_filename = file.filename
+            document.file_path = file_path
+            document.file_size = file_size
+            document.content_hash = content_hash
+            job = queue_job(document, db, JobType.REPLACE)
             db.commit()
             db.refresh(document)
             
-            # Process document asynchronously (in production, use background task)
-            await self._process_document(document.id, file_path, company_id, db)
-            
-            return document
+            if old_file_path != file_path and os.path.exists(old_file_path):
+                os.remove(old_file_path)
             
+            logger.info(f"Document {document_id} replaced with {filename}, queued job {job.id}")
+            return document, job
+        
         except Exception as e:
-            logger.error(f"Error uploading document: {str(e)}")
-            # Cleanup file if it was saved
-            if os.path.exists(file_path):
+            db.rollback()
+            logger.error(f"Error replacing document: {str(e)}")
+            if file_path and os.path.exists(file_path):
                 os.remove(file_path)
             raise
     
-    async def _process_document(
+    def bulk_upload_documents(
+        self,
+        files: List[UploadFile],
+        company_id: int,
+        user_id: int,
+        db: Session,
+        queue_batch: Callable[[List[Document], Session], List[IngestionJob]]
+    ) -> Tuple[List[Document], List[IngestionJob], List[Dict]]:
+        """
+        Save many PDFs, or the PDFs inside one ZIP archive, in one go.
+        
+        Archive members are streamed to disk one at a time without
+        extracting the archive. Files that fail validation or duplicate an
+        existing document (or another file in the same upload) are skipped
+        and reported; all accepted files get their records and ingestion
+        jobs in a single transaction.
+        
+        Args:
+            files: Uploaded PDFs, or a single ZIP archive
+            company_id: Company ID
+            user_id: User ID who uploaded
+            db: Database session
+            queue_batch: Adds the documents' ingestion jobs to the
+                transaction as one batch, see IngestionService.add_batch
+                
+        Returns:
+            Tuple of (created documents, their ingestion jobs, skipped files
+            with a reason each)
+        """
+        documents = []
+        skipped = []
+        seen_hashes = set()
+        
+        try:
+            for original_filename, stream in self._iter_bulk_files(files):
+                if len(documents) + len(skipped) >= settings.BULK_MAX_FILES:
+                    raise ValueError(f"A bulk upload may contain at most {settings.BULK_MAX_FILES} files")
+                
+                if not original_filename.lower().endswith('.pdf'):
+                    skipped.append({"filename": original_filename, "detail": "Only PDF files are supported"})
+                    continue
+                
+                try:
+                    filename, file_path, file_size, content_hash = self._write_stream(
+                        stream, original_filename, company_id
+                    )
+                except ValueError as e:
+                    skipped.append({"filename": original_filename, "detail": str(e)})
+                    continue
+                
+                duplicate = self.find_duplicate(company_id, content_hash, db)
+                if duplicate or content_hash in seen_hashes:
+                    os.remove(file_path)
+                    detail = (
+                        f"Already uploaded as '{duplicate.original_filename}' (document {duplicate.id})"
+                        if duplicate else "Duplicate of another file in this upload"
+                    )
+                    skipped.append({"filename": original_filename, "detail": detail})
+                    continue
+                
+                seen_hashes.add(content_hash)
+                documents.append(Document(
+                    filename=filename,
+                    original_filename=original_filename,
+                    file_path=file_path,
+                    file_size=file_size,
+                    content_hash=content_hash,
+                    company_id=company_id,
+                    uploaded_by=user_id,
+                    status=DocumentStatus.QUEUED,
+                    processed=False
+                ))
+            
+            jobs = []
+            if documents:
+                db.add_all(documents)
+                db.flush()
+                jobs = queue_batch(documents, db)
+                db.commit()
+            
+            logger.info(f"Bulk upload saved {len(documents)} documents, skipped {len(skipped)}")
+            return documents, jobs, skipped
+        
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error in bulk upload: {str(e)}")
+            for document in documents:
+                if os.path.exists(document.file_path):
+                    os.remove(document.file_path)
+            raise
+    
+    def _iter_bulk_files(self, files: List[UploadFile]) -> Iterator[Tuple[str, BinaryIO]]:
+        """
+        Yield (filename, stream) for every file of a bulk upload.
+        
+        A single ZIP archive is opened in place and its members are yielded
+        as streams, so only one member is being read at a time.
+        """
+        if len(files) == 1 and files[0].filename.lower().endswith('.zip'):
+            archive = files[0]
+            if not zipfile.is_zipfile(archive.file):
+                raise ValueError("Invalid ZIP archive")
+            archive.file.seek(0)
+            
+            with zipfile.ZipFile(archive.file) as zf:
+                for info in zf.infolist():
+                    name = os.path.basename(info.filename)
+                    # Skip folders and macOS resource forks
+                    if info.is_dir() or not name or info.filename.startswith("__MACOSX/"):
+                        continue
+                    with zf.open(info) as member:
+                        yield name, member
+            return
+        
+        for file in files:
+            yield file.filename, file.file
+    
+    async def _save_upload(self, file: UploadFile, company_id: int) -> Tuple[str, str, int, str]:
+        """
+        Validate an uploaded PDF and stream it to the upload directory.
+        
+        The upload is read in UPLOAD_CHUNK_SIZE blocks and each block is
+        written and hashed on the hashing executor, so large uploads do not
+        block the event loop. Oversized and non-PDF uploads are rejected as soon as
+        the offending block arrives.
+        
+        Args:
+            file: Uploaded file
+            company_id: Company ID
+            
+        Returns:
+            Tuple of (filename, file_path, file_size, content_hash)
+        """
+        # Validate file
+        if not file.filename.lower().endswith('.pdf'):
+            raise ValueError("Only PDF files are supported")
+        
+        writer = await run_in_executor(HASHING, UploadWriter, file.filename, company_id)
+        with writer:
+            while True:
+                data = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not data:
+                    break
+                await run_in_executor(HASHING, writer.write, data)
+            return await run_in_executor(HASHING, writer.commit)
+    
+    def _write_stream(self, stream: BinaryIO, original_filename: str, company_id: int) -> Tuple[str, str, int, str]:
+        """
+        Write a file stream to the upload directory, hashing it on the way.
+        
+        Used for archive members, whose size is only declared, not known.
+        
+        Args:
+            stream: Readable binary stream positioned at the start
+            original_filename: Name the file was uploaded as
+            company_id: Company ID
+            
+        Returns:
+            Tuple of (filename, file_path, file_size, content_hash)
+        """
+        with UploadWriter(original_filename, company_id) as writer:
+            while True:
+                data = stream.read(settings.UPLOAD_CHUNK_SIZE)
+                if not data:
+                    break
+                writer.write(data)
+            return writer.commit()
+    
+    def process_document(
         self,
         document_id: int,
         file_path: str,
         company_id: int,
-        db: Session
-    ):
+        db: Session,
+        progress_callback: Optional[Callable[..., None]] = None
+    ) -> Dict:
         """
         Process document: extract text, chunk, generate embeddings, store in vector DB.
         
+        Runs synchronously; the ingestion workers call it off the request path.
+        
         Args:
             document_id: Document ID
             file_path: Path to document file
             company_id: Company ID
             db: Database session
+            progress_callback: Called as ``progress_callback(stage, **counts)``
+                whenever the document moves to a new stage
+                
+        Returns:
+            Summary with the chunk count and, when chunking by tokens, the
+            token-length distribution
         """
-        try:
-            logger.info(f"Processing document {document_id}")
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if document is None:
+            raise ValueError(f"Document {document_id} not found")
+        
+        def set_stage(stage: DocumentStatus, **counts):
+            document.status = stage
+            if progress_callback:
+                progress_callback(stage, **counts)
+            db.commit()
+        
+        logger.info(f"Processing document {document_id}")
+        set_stage(DocumentStatus.PARSING)
+        
+        if settings.INGESTION_STREAMING:
+            page_count, chunk_count, token_counts = self._index_streaming(
+                document_id, file_path, document.content_hash, company_id, set_stage
+            )
+        else:
+            page_count, chunk_count, token_counts = self._index_in_memory(
+                document_id, file_path, document.content_hash, company_id, set_stage
+            )
+        
+        # Update document record
+        document.processed = True
+        document.processed_at = datetime.utcnow()
+        document.page_count = page_count
+        document.chunk_count = chunk_count
+        set_stage(DocumentStatus.INDEXED, chunks_total=chunk_count, chunks_embedded=chunk_count)
+        
+        logger.info(f"Document {document_id} processed successfully")
+        
+        result = {"chunks_total": chunk_count}
+        result.update(self._token_length_report(document_id, token_counts))
+        return result
+    
+    def process_documents(
+        self,
+        documents: List[Document],
+        db: Session,
+        progress_callbacks: Optional[Dict[int, Callable[..., None]]] = None
+    ) -> Dict[int, object]:
+        """
+        Ingest several documents through one shared streaming pipeline.
+        
+        Chunks from all documents are pooled into the same INGESTION_BATCH_SIZE
+        embedding batches, so many small files share model calls instead of
+        each paying for its own partial batch.
+        
+        A document that fails to parse is reported on its own; a failed
+        embedding or vector store write is raised for the whole group.
+        
+        Args:
+            documents: Documents to ingest (all from the same company)
+            db: Database session
+            progress_callbacks: Optional per-document progress callbacks
+            
+        Returns:
+            Dictionary mapping document ID to its result summary, or to the
+            exception that made it fail
+        """
+        progress_callbacks = progress_callbacks or {}
+        results: Dict[int, object] = {}
+        state = {document.id: {"pages_total": 0, "pages_seen": 0, "chunks": 0, "token_counts": []} for document in documents}
+        batch: List[Tuple[Document, Dict]] = []
+        
+        def set_stage(document: Document, stage: DocumentStatus, **counts):
+            document.status = stage
+            callback = progress_callbacks.get(document.id)
+            if callback:
+                callback(stage, **counts)
+        
+        def flush():
+            embeddings = self.embedding_service.generate_embeddings([chunk['text'] for _, chunk in batch])
             
-            # Extract text from PDF
-            pdf_data = self.pdf_parser.extract_text(file_path)
+            # One embedding call for the batch, one store write per document in it
+            by_document: Dict[int, List[int]] = {}
+            for position, (document, _) in enumerate(batch):
+                by_document.setdefault(document.id, []).append(position)
             
-            # Chunk text
-            chunks = self.text_chunker.chunk_text(
-                text=pdf_data['full_text'],
-                document_id=document_id,
-                page_info=pdf_data['pages']
-            )
+            for positions in by_document.values():
+                document = batch[positions[0]][0]
+                self.vector_store.add_documents(
+                    company_id=document.company_id,
+                    document_id=document.id,
+                    chunks=[batch[i][1] for i in positions],
+                    embeddings=embeddings[positions]
+                )
+                doc_state = state[document.id]
+                doc_state["chunks"] += len(positions)
+                set_stage(
+                    document,
+                    DocumentStatus.EMBEDDING,
+                    pages_total=doc_state["pages_total"],
+                    pages_processed=doc_state["pages_seen"],
+                    chunks_total=doc_state["chunks"],
+                    chunks_embedded=doc_state["chunks"]
+                )
+            
+            batch.clear()
+            db.commit()
+        
+        def document_chunks(document: Document) -> Iterator[Dict]:
+            doc_state = state[document.id]
+            doc_state["pages_total"], pages = self._load_pages(document.file_path, document.content_hash)
+            
+            def counted_pages():
+                for page in pages:
+                    doc_state["pages_seen"] = page["page_number"]
+                    yield page
+            
+            yield from self.text_chunker.iter_chunks(counted_pages(), document_id=document.id)
+        
+        for document in documents:
+            set_stage(document, DocumentStatus.PARSING)
+            db.commit()
             
-            logger.info(f"Created {len(chunks)} chunks")
+            chunks = document_chunks(document)
+            while True:
+                try:
+                    chunk = next(chunks, None)
+                except Exception as e:
+                    logger.error(f"Error parsing document {document.id}: {str(e)}")
+                    results[document.id] = e
+                    batch[:] = [(d, c) for d, c in batch if d.id != document.id]
+                    break
+                
+                if chunk is None:
+                    break
+                
+                batch.append((document, chunk))
+                if 'token_count' in chunk:
+                    state[document.id]["token_counts"].append(chunk['token_count'])
+                if len(batch) >= settings.INGESTION_BATCH_SIZE:
+                    flush()
+        
+        if batch:
+            flush()
+        
+        for document in documents:
+            if document.id in results:
+                continue
             
-            # Generate embeddings
-            chunk_texts = [chunk['text'] for chunk in chunks]
-            embeddings = self.embedding_service.generate_embeddings(chunk_texts)
+            doc_state = state[document.id]
+            document.processed = True
+            document.processed_at = datetime.utcnow()
+            document.page_count = doc_state["pages_total"]
+            document.chunk_count = doc_state["chunks"]
+            set_stage(
+                document,
+                DocumentStatus.INDEXED,
+                chunks_total=doc_state["chunks"],
+                chunks_embedded=doc_state["chunks"]
+            )
             
-            # Store in vector database
+            result = {"chunks_total": doc_state["chunks"]}
+            result.update(self._token_length_report(document.id, doc_state["token_counts"]))
+            results[document.id] = result
+        
+        db.commit()
+        logger.info(f"Processed {len(documents)} documents in a shared pipeline")
+        return results
+    
+    def _token_length_report(self, document_id: int, token_counts: List[int]) -> Dict:
+        """Summarize chunk token lengths in token mode, for tuning the budget."""
+        if not self.text_chunker.token_mode:
+            return {}
+        
+        summary = TextChunker.summarize_token_lengths(token_counts, self.text_chunker.max_tokens)
+        logger.info(f"Token lengths for document {document_id}: {summary}")
+        return {"token_lengths": summary}
+    
+    def index_document(
+        self,
+        document_id: int,
+        file_path: str,
+        content_hash: Optional[str],
+        company_id: int,
+        collection_name: str
+    ) -> Tuple[int, int]:
+        """
+        Parse, chunk and embed a document into a given collection.
+        
+        Leaves the document's database record and live chunks untouched;
+        used to rebuild a company's collection with current settings.
+        
+        Args:
+            document_id: Document ID
+            file_path: Path to document file
+            content_hash: SHA-256 of the file, for the extraction cache
+            company_id: Company ID
+            collection_name: Collection to write the chunks to
+            
+        Returns:
+            Tuple of (page_count, chunk_count)
+        """
+        index = self._index_streaming if settings.INGESTION_STREAMING else self._index_in_memory
+        page_count, chunk_count, _ = index(
+            document_id,
+            file_path,
+            content_hash,
+            company_id,
+            lambda stage, **counts: None,
+            collection_name=collection_name
+        )
+        return page_count, chunk_count
+    
+    def _load_pages(self, file_path: str, content_hash: Optional[str]) -> Tuple[int, Iterator[Dict]]:
+        """
+        Get the page count and page texts of a document.
+        
+        Text extracted before is read from the extraction cache; otherwise
+        the PDF is parsed and the pages are cached as they stream past.
+        
+        Returns:
+            Tuple of (page_count, page iterator)
+        """
+        cached = self.extraction_cache.load(content_hash) if content_hash else None
+        if cached:
+            logger.info(f"Extraction cache hit for {file_path}")
+            return cached["page_count"], iter(cached["pages"])
+        
+        info = self.pdf_parser.get_document_info(file_path)
+        pages = self.pdf_parser.iter_pages(file_path, info["page_count"])
+        if content_hash:
+            pages = self.extraction_cache.record(content_hash, info["page_count"], info["metadata"], pages)
+        return info["page_count"], pages
+    
+    def _extract_text(self, file_path: str, content_hash: Optional[str]) -> Dict:
+        """Extract a whole document like ``PDFParser.extract_text``, using the extraction cache."""
+        try:
+            page_count, pages = self._load_pages(file_path, content_hash)
+            pages = list(pages)
+        except Exception as e:
+            logger.error(f"Error parsing PDF {file_path}: {str(e)}")
+            raise Exception(f"Failed to parse PDF: {str(e)}")
+        
+        return {
+            "full_text": PDFParser.join_pages(pages),
+            "pages": pages,
+            "page_count": page_count
+        }
+    
+    def _index_in_memory(
+        self,
+        document_id: int,
+        file_path: str,
+        content_hash: Optional[str],
+        company_id: int,
+        set_stage: Callable[..., None],
+        collection_name: Optional[str] = None
+    ) -> Tuple[int, int, List[int]]:
+        """
+        Parse the whole document, then chunk, embed and store it in one pass.
+        
+        Returns:
+            Tuple of (page_count, chunk_count, token_counts); token_counts is
+            empty unless chunking by tokens
+        """
+        # Extract text from PDF
+        pdf_data = self._extract_text(file_path, content_hash)
+        
+        # Chunk text
+        chunks = self.text_chunker.chunk_text(
+            text=pdf_data['full_text'],
+            document_id=document_id,
+            page_info=pdf_data['pages']
+        )
+        
+        logger.info(f"Created {len(chunks)} chunks")
+        set_stage(
+            DocumentStatus.EMBEDDING,
+            pages_total=pdf_data['page_count'],
+            pages_processed=pdf_data['page_count'],
+            chunks_total=len(chunks)
+        )
+        
+        # Generate embeddings
+        chunk_texts = [chunk['text'] for chunk in chunks]
+        embeddings = self.embedding_service.generate_embeddings(chunk_texts)
+        
+        # Store in vector database
+        self.vector_store.add_documents(
+            company_id=company_id,
+            document_id=document_id,
+            chunks=chunks,
+            embeddings=embeddings,
+            collection_name=collection_name
+        )
+        
+        token_counts = [chunk['token_count'] for chunk in chunks if 'token_count' in chunk]
+        return pdf_data['page_count'], len(chunks), token_counts
+    
+    def _index_streaming(
+        self,
+        document_id: int,
+        file_path: str,
+        content_hash: Optional[str],
+        company_id: int,
+        set_stage: Callable[..., None],
+        collection_name: Optional[str] = None
+    ) -> Tuple[int, int, List[int]]:
+        """
+        Stream pages through chunking, embedding and storage in fixed-size batches.
+        
+        Only the current page window and one batch of INGESTION_BATCH_SIZE
+        chunks are held at a time, and every batch is searchable as soon as
+        it is written.
+        
+        Returns:
+            Tuple of (page_count, chunk_count, token_counts); token_counts is
+            empty unless chunking by tokens
+        """
+        page_count, pages = self._load_pages(file_path, content_hash)
+        pages_seen = 0
+        
+        def counted_pages():
+            nonlocal pages_seen
+            for page in pages:
+                pages_seen = page["page_number"]
+                yield page
+        
+        chunk_count = 0
+        token_counts = []
+        batch = []
+        
+        def flush():
+            nonlocal chunk_count
+            embeddings = self.embedding_service.generate_embeddings([chunk['text'] for chunk in batch])
             self.vector_store.add_documents(
                 company_id=company_id,
                 document_id=document_id,
-                chunks=chunks,
-                embeddings=embeddings
+                chunks=batch,
+                embeddings=embeddings,
+                collection_name=collection_name
             )
+            chunk_count += len(batch)
+            batch.clear()
+            set_stage(
+                DocumentStatus.EMBEDDING,
+                pages_total=page_count,
+                pages_processed=pages_seen,
+                chunks_total=chunk_count,
+                chunks_embedded=chunk_count
+            )
+        
+        for chunk in self.text_chunker.iter_chunks(counted_pages(), document_id=document_id):
+            batch.append(chunk)
+            if 'token_count' in chunk:
+                token_counts.append(chunk['token_count'])
+            if len(batch) >= settings.INGESTION_BATCH_SIZE:
+                flush()
+        
+        if batch:
+            flush()
+        
+        logger.info(f"Streamed {chunk_count} chunks from {page_count} pages")
+        return page_count, chunk_count, token_counts
+    
+    def reprocess_document(
+        self,
+        document_id: int,
+        file_path: str,
+        company_id: int,
+        db: Session,
+        progress_callback: Optional[Callable[..., None]] = None
+    ) -> Dict:
+        """
+        Re-ingest a revised document, re-embedding only chunks that changed.
+        
+        Each new chunk's hash is compared with the ``chunk_hash`` metadata of
+        the chunks already stored for the document:
+        
+        - same ID, hash and metadata: left untouched
+        - hash stored under another ID: the stored embedding is copied over
+        - new hash: embedded with the model
+        
+        Stored chunks beyond the new chunk count are deleted.
+        
+        Args:
+            document_id: Document ID
+            file_path: Path to the revised document file
+            company_id: Company ID
+            db: Database session
+            progress_callback: Called as ``progress_callback(stage, **counts)``
             
-            # Update document record
-            document = db.query(Document).filter(Document.id == document_id).first()
-            document.processed = True
-            document.processed_at = datetime.utcnow()
-            document.page_count = pdf_data['page_count']
-            document.chunk_count = len(chunks)
+        Returns:
+            Summary with reused, recomputed and deleted chunk counts
+        """
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if document is None:
+            raise ValueError(f"Document {document_id} not found")
+        
+        def set_stage(stage: DocumentStatus, **counts):
+            document.status = stage
+            if progress_callback:
+                progress_callback(stage, **counts)
             db.commit()
+        
+        logger.info(f"Reprocessing document {document_id}")
+        set_stage(DocumentStatus.PARSING)
+        
+        pdf_data = self._extract_text(file_path, document.content_hash)
+        chunks = self.text_chunker.chunk_text(
+            text=pdf_data['full_text'],
+            document_id=document_id,
+            page_info=pdf_data['pages']
+        )
+        
+        set_stage(
+            DocumentStatus.EMBEDDING,
+            pages_total=pdf_data['page_count'],
+            pages_processed=pdf_data['page_count'],
+            chunks_total=len(chunks)
+        )
+        
+        # Diff new chunk hashes against the stored ones
+        stored = self.vector_store.get_document_chunks(company_id, document_id)
+        stored_ids_by_hash = {}
+        for chunk_id, chunk in stored.items():
+            chunk_hash = chunk["metadata"].get("chunk_hash")
+            if chunk_hash:
+                stored_ids_by_hash.setdefault(chunk_hash, chunk_id)
+        
+        unchanged, moved, changed = [], [], []
+        source_ids = []  # stored chunk to copy the embedding from, per moved chunk
+        for chunk in chunks:
+            chunk_id = self.vector_store.get_chunk_id(document_id, chunk["chunk_index"])
+            stored_chunk = stored.get(chunk_id)
+            if stored_chunk and stored_chunk["metadata"].get("chunk_hash") == chunk["chunk_hash"]:
+                if stored_chunk["metadata"] == self.vector_store.build_metadata(document_id, chunk):
+                    unchanged.append(chunk)
+                else:
+                    # Same text, only the metadata moved
+                    moved.append(chunk)
+                    source_ids.append(chunk_id)
+            elif chunk["chunk_hash"] in stored_ids_by_hash:
+                moved.append(chunk)
+                source_ids.append(stored_ids_by_hash[chunk["chunk_hash"]])
+            else:
+                changed.append(chunk)
+        
+        # Reuse stored vectors for chunks whose text already has an embedding
+        if moved:
+            stored_embeddings = self.vector_store.get_embeddings(company_id, list(set(source_ids)))
+            self.vector_store.upsert_documents(
+                company_id=company_id,
+                document_id=document_id,
+                chunks=moved,
+                embeddings=[stored_embeddings[source_id] for source_id in source_ids]
+            )
+        
+        if changed:
+            embeddings = self.embedding_service.generate_embeddings([chunk['text'] for chunk in changed])
+            self.vector_store.upsert_documents(
+                company_id=company_id,
+                document_id=document_id,
+                chunks=changed,
+                embeddings=embeddings
+            )
+        
+        # Drop stored chunks the new version no longer has
+        new_ids = {self.vector_store.get_chunk_id(document_id, chunk["chunk_index"]) for chunk in chunks}
+        stale_ids = [chunk_id for chunk_id in stored if chunk_id not in new_ids]
+        self.vector_store.delete_chunks(company_id, stale_ids)
+        
+        document.processed = True
+        document.processed_at = datetime.utcnow()
+        document.page_count = pdf_data['page_count']
+        document.chunk_count = len(chunks)
+        set_stage(DocumentStatus.INDEXED, chunks_embedded=len(chunks))
+        
+        result = {
+            "chunks_total": len(chunks),
+            "reused": len(unchanged) + len(moved),
+            "recomputed": len(changed),
+            "deleted": len(stale_ids)
+        }
+        result.update(self._token_length_report(
+            document_id, [chunk['token_count'] for chunk in chunks if 'token_count' in chunk]
+        ))
+        logger.info(f"Document {document_id} reprocessed: {result}")
+        return result
+    
+    def find_duplicate(self, company_id: int, content_hash: str, db: Session) -> Optional[Document]:
+        """
+        Find a document of the company with identical contents.
+        
+        Failed documents are ignored so that a file can be uploaded again
+        after an ingestion failure.
+        
+        Args:
+            company_id: Company ID
+            content_hash: SHA-256 hex digest of the file contents
+            db: Database session
             
-            logger.info(f"Document {document_id} processed successfully")
-            
-        except Exception as e:
-            logger.error(f"Error processing document {document_id}: {str(e)}")
-            # Mark as failed
-            document = db.query(Document).filter(Document.id == document_id).first()
-            if document:
-                document.processed = False
-                db.commit()
-            raise
+        Returns:
+            Matching document, or None
+        """
+        return db.query(Document).filter(
+            Document.company_id == company_id,
+            Document.content_hash == content_hash,
+            Document.status != DocumentStatus.FAILED
+        ).first()
     
     def get_company_documents(self, company_id: int, db: Session) -> List[Document]:
         """Get all documents for a company."""
@@ -163,8 +962,75 @@ class DocumentService:
             Document.company_id == company_id
         ).order_by(Document.uploaded_at.desc()).all()
     
+    def search_many(
+        self,
+        queries: List[str],
+        company_id: int,
+        db: Session,
+        top_k: Optional[int] = None,
+        embeddings: Optional[np.ndarray] = None
+    ) -> List[List[Dict]]:
+        """
+        Find the chunks most relevant to each of several questions.
+        
+        The questions are embedded in one call and searched in one batched
+        vector store query, so throughput grows with the batch size.
+        
+        Args:
+            queries: Questions to search for
+            company_id: Company whose documents are searched
+            db: Database session
+            top_k: Chunks returned per question
+            embeddings: Query embeddings, one row per question, when the
+                caller has already embedded them
+                
+        Returns:
+            One list of sources per question, in question order, each with
+            document_id, document_name, page_number, chunk_text and
+            relevance_score
+        """
+        if len(queries) > settings.SEARCH_MAX_QUERIES:
+            raise ValueError(f"At most {settings.SEARCH_MAX_QUERIES} questions can be searched at once")
+        
+        if embeddings is None:
+            embeddings = self.embedding_service.generate_embeddings(queries)
+        results = self.vector_store.search_many(company_id, embeddings, top_k)
+        
+        document_ids = {result["document_id"] for query_results in results for result in query_results}
+        document_names = dict(
+            db.query(Document.id, Document.original_filename).filter(
+                Document.company_id == company_id,
+                Document.id.in_(document_ids)
+            ).all()
+        ) if document_ids else {}
+        
+        return [
+            [
+                {
+                    "document_id": result["document_id"],
+                    "document_name": document_names[result["document_id"]],
+                    "page_number": int(result["page_number"]) if str(result["page_number"]).isdigit() else None,
+                    "chunk_text": result["text"],
+                    "relevance_score": result["score"]
+                }
+                for result in query_results
+                # Chunks of a document deleted while the search ran
+                if result["document_id"] in document_names
+            ]
+            for query_results in results
+        ]
+    
     def delete_document(self, document_id: int, company_id: int, db: Session):
-        """Delete a document and its embeddings."""
+        """
+        Delete a document and its embeddings.
+        
+        Queued ingestion jobs are cancelled with it. While a job is running,
+        its worker is still writing chunks, so the delete is refused.
+        
+        Raises:
+            ValueError: If the document does not exist
+            DocumentBusyError: If an ingestion job is running on the document
+        """
         try:
             document = db.query(Document).filter(
                 Document.id == document_id,
@@ -174,6 +1040,8 @@ class DocumentService:
             if not document:
                 raise ValueError("Document not found")
             
+            self._cancel_queued_jobs(document_id, db, action="delete", reason="Document deleted")
+            
             # Delete from vector store
             self.vector_store.delete_document(company_id, document_id)
             
@@ -186,7 +1054,43 @@ class DocumentService:
             db.commit()
             
             logger.info(f"Document {document_id} deleted successfully")
-            
+        
         except Exception as e:
+            db.rollback()
             logger.error(f"Error deleting document: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+    
+    def _cancel_queued_jobs(self, document_id: int, db: Session, action: str, reason: str):
+        """
+        Cancel a document's queued ingestion jobs and check that none is running.
+        
+        The cancel is a compare-and-set like a worker's claim, so no worker
+        can take one of the jobs afterwards. It is not committed: the caller
+        commits it with its own change to the document, or rolls it back.
+        
+        Args:
+            document_id: Document ID
+            db: Database session
+            action: What the caller does to the document, for the error
+            reason: Error recorded on the cancelled jobs
+            
+        Raises:
+            DocumentBusyError: If an ingestion job is running on the document
+        """
+        db.query(IngestionJob).filter(
+            IngestionJob.document_id == document_id,
+            IngestionJob.status == JobStatus.QUEUED
+        ).update(
+            {
+                IngestionJob.status: JobStatus.FAILED,
+                IngestionJob.error: reason,
+                IngestionJob.finished_at: datetime.utcnow()
+            },
+            synchronize_session=False
+        )
+        running = db.query(IngestionJob).filter(
+            IngestionJob.document_id == document_id,
+            IngestionJob.status == JobStatus.RUNNING
+        ).count()
+        if running:
+            raise DocumentBusyError(f"The document is being ingested, {action} it once its job has finished")
\ No newline at end of file
@@ -1,35 +1,134 @@
-from sentence_transformers import SentenceTransformer
-from typing import List
+import threading
+import time
+from typing import List, Optional
+import numpy as np
 import logging
 from app.config import settings
+from app.core.metrics import metrics
+from app.utils.embedding_backends import EmbeddingBackend, create_backend
+from app.utils.embedding_cache import EmbeddingCache
+from app.utils.embedding_pool import EmbeddingPool
+from app.utils.dimension_reduction import DimensionReducer, PCAProjection, create_reducer, projection_path
+from app.utils.length_buckets import padding_totals, plan_batches
+from app.utils.micro_batcher import MicroBatcher
 
 logger = logging.getLogger(__name__)
 
+batch_sizes = metrics.histogram(
+    "embedding_query_batch_size",
+    "Texts per batched query embedding call",
+    [1, 2, 4, 8, 16, 32, 64, 128]
+)
+queue_waits = metrics.histogram(
+    "embedding_query_queue_wait_seconds",
+    "Time a query embedding waited to be batched",
+    [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5]
+)
+model_tokens = metrics.counter(
+    "embedding_model_tokens_total",
+    "Tokens fed to the model by length-bucketed encoding, by kind (content or padding)"
+)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale every row of a float matrix to unit length, in place."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.maximum(norms, 1e-12, out=norms)
+    matrix /= norms
+    return matrix
+
 
 class EmbeddingService:
-    """Generate embeddings for text using HuggingFace models."""
+    """
+    Generate embeddings for text using HuggingFace models.
+    
+    The model is loaded on first use, or ahead of time by ``warm_up`` at
+    application startup, so importing the service stays cheap.
+    """
     
     _instance = None
-    _model = None
+    _backend: EmbeddingBackend = None
+    _cache = None
+    _batcher = None
+    _pool: EmbeddingPool = None
+    _reducer: DimensionReducer = None
+    _load_lock = threading.Lock()
+    warmed_up = False
     
     def __new__(cls):
         """Singleton pattern to load model only once."""
         if cls._instance is None:
             cls._instance = super(EmbeddingService, cls).__new__(cls)
-            cls._instance._initialize_model()
+            cls._instance._batcher = MicroBatcher(
+                cls._instance.generate_embeddings,
+                max_batch_size=settings.EMBEDDING_MICROBATCH_MAX_SIZE,
+                max_wait=settings.EMBEDDING_MICROBATCH_MAX_WAIT_MS / 1000,
+                name="embedding-batcher",
+                batch_size_histogram=batch_sizes,
+                queue_wait_histogram=queue_waits
+            )
         return cls._instance
     
+    @property
+    def backend(self) -> EmbeddingBackend:
+        """The embedding model backend, loaded on first access."""
+        self.load()
+        return self._backend
+    
+    def load(self):
+        """Load the embedding model and its cache, once. Blocks while loading."""
+        if self._backend is not None:
+            return
+        with self._load_lock:
+            if self._backend is None:
+                self._initialize_model()
+    
     def _initialize_model(self):
         """Load the embedding model."""
         try:
-            logger.info(f"Loading embedding model: {settings.EMBEDDING_MODEL}")
-            self._model = SentenceTransformer(settings.EMBEDDING_MODEL)
-            logger.info("Embedding model loaded successfully")
+            logger.info(f"Loading embedding model: {settings.EMBEDDING_MODEL} ({settings.EMBEDDING_BACKEND} backend)")
+            started = time.perf_counter()
+            backend = create_backend(settings.EMBEDDING_MODEL)
+            logger.info(f"Embedding model loaded successfully in {time.perf_counter() - started:.2f}s")
+            if settings.EMBEDDING_CACHE_ENABLED:
+                # Quantized backends produce slightly different vectors, keep them apart
+                self._cache = EmbeddingCache(backend.name, normalize=settings.EMBEDDING_NORMALIZE)
+            if settings.EMBEDDING_POOL_WORKERS > 0:
+                # Created after the in-process backend, which makes any ONNX export the workers load
+                self._pool = EmbeddingPool(
+                    settings.EMBEDDING_MODEL,
+                    settings.EMBEDDING_BACKEND,
+                    settings.EMBEDDING_POOL_WORKERS,
+                    settings.EMBEDDING_POOL_THREADS
+                )
+            # Published last: other threads only check the backend to skip loading
+            self._backend = backend
         except Exception as e:
             logger.error(f"Failed to load embedding model: {str(e)}")
             raise
     
-    def generate_embedding(self, text: str) -> List[float]:
+    def warm_up(self):
+        """
+        Load the model and run a dummy batch through it.
+        
+        The first forward passes allocate buffers and pick kernels, which
+        would otherwise slow down the first real requests. The warm-up batch
+        bypasses the embedding cache.
+        """
+        self.load()
+        if settings.EMBEDDING_WARMUP_TEXTS > 0:
+            started = time.perf_counter()
+            # Varied lengths, so more than one input shape is exercised
+            texts = [" ".join(["warm up"] * (2 ** (index % 6))) for index in range(settings.EMBEDDING_WARMUP_TEXTS)]
+            self._encode(texts)
+            # Fail here rather than on the first request when the reduction is misconfigured
+            self.get_reducer()
+            if self._pool is not None:
+                self._pool.warm_up()
+            logger.info(f"Embedding model warmed up in {time.perf_counter() - started:.2f}s")
+        self.warmed_up = True
+    
+    def generate_embedding(self, text: str) -> np.ndarray:
         """
         Generate embedding for a single text.
         
@@ -37,32 +136,223 @@ class EmbeddingService:
             text: Input text
             
         Returns:
-            Embedding vector as list of floats
+            Embedding vector as a 1-D float32 array
         """
-        try:
-            embedding = self._model.encode(text, convert_to_tensor=False)
-            return embedding.tolist()
-        except Exception as e:
-            logger.error(f"Error generating embedding: {str(e)}")
-            raise
+        return self.generate_embeddings([text])[0]
+    
+    async def generate_embedding_async(self, text: str) -> np.ndarray:
+        """
+        Generate embedding for a single text from async code.
+        
+        Concurrent calls are collected for up to EMBEDDING_MICROBATCH_MAX_WAIT_MS
+        (or EMBEDDING_MICROBATCH_MAX_SIZE texts) and embedded in one model
+        call on the batcher's own thread, instead of one forward pass per
+        query. Batches do not wait behind ingestion and search work queued on
+        the shared embedding executor.
+        
+        Args:
+            text: Input text
+            
+        Returns:
+            Embedding vector as a 1-D float32 array
+        """
+        return await self._batcher.submit(text)
+    
+    def close(self):
+        """Stop batching queries and the embedding pool's processes."""
+        if self._batcher is not None:
+            self._batcher.close()
+        if self._pool is not None:
+            self._pool.close()
     
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def generate_embeddings(
+        self,
+        texts: List[str],
+        batch_size: int = None,
+        show_progress_bar: bool = False
+    ) -> np.ndarray:
         """
         Generate embeddings for multiple texts (batch processing).
         
+        Only texts missing from the embedding cache are sent to the model,
+        each distinct text once; results are merged back in input order.
+        The cache holds full-width vectors, the result is reduced to
+        EMBEDDING_DIMENSION when that is set.
+        
         Args:
             texts: List of input texts
+            batch_size: Texts per forward pass; by default batches are sized
+                per length bucket (EMBEDDING_LENGTH_BUCKETING) or fixed at
+                EMBEDDING_BATCH_SIZE
+            show_progress_bar: Show the model's progress bar
             
         Returns:
-            List of embedding vectors
+            Contiguous float32 array of shape (len(texts), dimension)
         """
         try:
-            embeddings = self._model.encode(texts, convert_to_tensor=False, show_progress_bar=True)
-            return [emb.tolist() for emb in embeddings]
+            return self._reduce(self._generate_full(texts, batch_size, show_progress_bar))
         except Exception as e:
             logger.error(f"Error generating batch embeddings: {str(e)}")
             raise
     
+    def _generate_full(self, texts: List[str], batch_size: int = None, show_progress_bar: bool = False) -> np.ndarray:
+        """Get full-width embeddings from the cache or the model."""
+        self.load()
+        if self._cache is None:
+            return self._encode(texts, batch_size, show_progress_bar)
+        
+        embeddings = np.empty((len(texts), self.backend.get_dimension()), dtype=np.float32)
+        
+        # Deduplicate misses by cache key, boilerplate chunks often repeat within a batch
+        positions_by_key = {}
+        for position, cached in enumerate(self._cache.get_many(texts)):
+            if cached is None:
+                positions_by_key.setdefault(self._cache.key(texts[position]), []).append(position)
+            else:
+                embeddings[position] = cached
+        
+        if positions_by_key:
+            missing = [texts[positions[0]] for positions in positions_by_key.values()]
+            computed = self._encode(missing, batch_size, show_progress_bar)
+            self._cache.put_many(missing, computed)
+            for positions, embedding in zip(positions_by_key.values(), computed):
+                embeddings[positions] = embedding
+        
+        return embeddings
+    
+    def _reduce(self, embeddings: np.ndarray) -> np.ndarray:
+        """Reduce full-width vectors to EMBEDDING_DIMENSION, re-normalized, if configured."""
+        reducer = self.get_reducer()
+        if reducer is None:
+            return embeddings
+        embeddings = reducer.reduce(embeddings)
+        if settings.EMBEDDING_NORMALIZE:
+            normalize_rows(embeddings)
+        return embeddings
+    
+    def _encode(self, texts: List[str], batch_size: int = None, show_progress_bar: bool = False) -> np.ndarray:
+        """Run the model over texts, returning a contiguous float32 matrix of full-width vectors."""
+        if not texts:
+            return np.zeros((0, self.backend.get_dimension()), dtype=np.float32)
+        
+        bucketing = batch_size is None and settings.EMBEDDING_LENGTH_BUCKETING and len(texts) > 1
+        if self._pool is not None and len(texts) >= settings.EMBEDDING_POOL_MIN_TEXTS:
+            if bucketing:
+                batches = self._plan_buckets(texts)
+            else:
+                batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+                batches = [
+                    list(range(start, min(start + batch_size, len(texts))))
+                    for start in range(0, len(texts), batch_size)
+                ]
+            embeddings = self._pool.encode(texts, batches, self.backend.get_dimension())
+        elif bucketing:
+            embeddings = self._encode_bucketed(texts)
+        else:
+            embeddings = self.backend.encode(texts, batch_size or settings.EMBEDDING_BATCH_SIZE, show_progress_bar)
+        
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if settings.EMBEDDING_NORMALIZE:
+            normalize_rows(embeddings)
+        return embeddings
+    
+    def _plan_buckets(self, texts: List[str]) -> List[List[int]]:
+        """
+        Group texts into batches by token length.
+        
+        Texts of similar length share a batch, so little compute goes to
+        padding, and each batch holds as many texts as fit into
+        EMBEDDING_TOKEN_BUDGET padded tokens.
+        """
+        lengths = self.get_token_lengths(texts)
+        batches = plan_batches(
+            lengths,
+            settings.EMBEDDING_TOKEN_BUDGET,
+            settings.EMBEDDING_MAX_BATCH_SIZE,
+            settings.EMBEDDING_BUCKET_MAX_PADDING
+        )
+        
+        content, padded = padding_totals(lengths, batches)
+        model_tokens.inc(content, kind="content")
+        model_tokens.inc(padded - content, kind="padding")
+        logger.debug(
+            f"Embedding {len(texts)} texts in {len(batches)} length buckets, "
+            f"padding waste {(padded - content) / max(padded, 1):.1%}"
+        )
+        return batches
+    
+    def _encode_bucketed(self, texts: List[str]) -> np.ndarray:
+        """Run the model over texts grouped by token length (see ``_plan_buckets``), in input order."""
+        embeddings = np.zeros((len(texts), self.backend.get_dimension()), dtype=np.float32)
+        for batch in self._plan_buckets(texts):
+            embeddings[batch] = self.backend.encode([texts[index] for index in batch], len(batch))
+        return embeddings
+    
+    def get_token_lengths(self, texts: List[str]) -> List[int]:
+        """Get how many tokens (special tokens included) the model sees per text."""
+        encoded = self.backend.tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=self.backend.max_seq_length
+        )
+        return [len(input_ids) for input_ids in encoded["input_ids"]]
+    
+    def get_backend_name(self) -> str:
+        """Identify the model and backend that produce this service's vectors."""
+        return self.backend.name
+    
+    def get_tokenizer(self):
+        """Get the model's (fast) tokenizer."""
+        return self.backend.tokenizer
+    
+    def get_max_tokens(self) -> int:
+        """
+        Get how many content tokens fit in one model input.
+        
+        This is the model's max sequence length minus the special tokens the
+        tokenizer adds; anything beyond it is truncated by the model.
+        """
+        special_tokens = self.backend.tokenizer.num_special_tokens_to_add(pair=False)
+        return self.backend.max_seq_length - special_tokens
+    
+    def get_reducer(self) -> Optional[DimensionReducer]:
+        """
+        Get the configured dimension reducer, created on first use.
+        
+        Raises:
+            ValueError: If EMBEDDING_DIMENSION or EMBEDDING_REDUCTION is
+                invalid, or the PCA projection has not been fitted
+        """
+        if self._reducer is None and settings.EMBEDDING_DIMENSION > 0:
+            self._reducer = create_reducer(self.backend.name, self.backend.get_dimension())
+        return self._reducer
+    
+    def get_reduction_name(self) -> str:
+        """Identify the dimension reduction applied to this service's vectors ("none" for full width)."""
+        reducer = self.get_reducer()
+        return reducer.name if reducer is not None else "none"
+    
+    def fit_projection(self, texts: List[str]) -> str:
+        """
+        Fit the PCA projection for this model to a sample of texts and save it.
+        
+        Takes effect for new vectors after a restart; reindex existing
+        collections afterwards.
+        
+        Args:
+            texts: Sample of chunk texts, preferably a few thousand
+            
+        Returns:
+            Path of the saved projection
+        """
+        projection = PCAProjection.fit(self._encode(texts))
+        path = projection_path(self.backend.name)
+        projection.save(path)
+        logger.info(f"Fitted PCA projection to {len(texts)} texts, saved to {path}")
+        return path
+    
     def get_embedding_dimension(self) -> int:
-        """Get the dimension of the embedding vectors."""
-        return self._model.get_sentence_embedding_dimension()
\ No newline at end of file
+        """Get the dimension of the embedding vectors this service returns."""
+        reducer = self.get_reducer()
+        return reducer.dimension if reducer is not None else self.backend.get_dimension()
\ No newline at end of file
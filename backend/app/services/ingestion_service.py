@@ -0,0 +1,471 @@
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy.orm import Session
+import logging
+
+from app.config import settings
+from app.core.database import SessionLocal
+from app.models.database import Document, DocumentStatus, IngestionJob, JobStatus, JobType
+from app.services.document_service import DocumentService
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionService:
+    """
+    Durable document ingestion queue.
+    
+    Jobs live in the ``ingestion_jobs`` table, so queued work survives a
+    restart. A pool of worker threads claims jobs with a compare-and-set
+    update, runs them through ``DocumentService`` and retries failures
+    with exponential backoff.
+    
+    A heartbeat thread touches this service's running jobs every
+    INGESTION_HEARTBEAT_INTERVAL, however long a single stage takes. The
+    workers periodically requeue running jobs whose heartbeat is older than
+    INGESTION_JOB_TIMEOUT, which is how the jobs of a crashed process
+    (this one before a restart, or another one) get picked up again.
+    """
+    
+    def __init__(self, document_service: DocumentService, workers: int = None):
+        """
+        Initialize ingestion service.
+        
+        Args:
+            document_service: Service used to process claimed documents
+            workers: Number of worker threads (defaults to INGESTION_WORKERS)
+        """
+        self.document_service = document_service
+        self.worker_count = workers or settings.INGESTION_WORKERS
+        self._threads: List[threading.Thread] = []
+        self._worker_ids: List[str] = []
+        self._stop_event = threading.Event()
+        self._condition = threading.Condition()
+        self._sweep_lock = threading.Lock()
+        self._last_sweep = 0.0
+    
+    def start(self):
+        """Start the worker threads and their heartbeat thread."""
+        if self._threads:
+            return
+        
+        self._stop_event.clear()
+        self._worker_ids = [f"{uuid.uuid4().hex[:8]}-{i}" for i in range(self.worker_count)]
+        
+        for i, worker_id in enumerate(self._worker_ids):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                args=(worker_id,),
+                name=f"ingestion-worker-{i}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="ingestion-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        
+        logger.info(f"Started {self.worker_count} ingestion workers")
+    
+    def stop(self, timeout: float = 10.0):
+        """Signal the workers to stop and wait for them to exit."""
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        
+        self._threads = []
+        logger.info("Ingestion workers stopped")
+    
+    def add_job(self, document: Document, db: Session, job_type: JobType = JobType.INGEST) -> IngestionJob:
+        """
+        Add an ingestion job for a document to the session, without committing.
+        
+        The caller commits it together with the document change it belongs
+        to, so a document is never left queued without a job, and then calls
+        ``notify``.
+        
+        Args:
+            document: Document to process, flushed so it has an ID
+            db: Database session
+            job_type: INGEST for new documents, REPLACE for revised ones
+            
+        Returns:
+            Pending ingestion job
+        """
+        job = IngestionJob(
+            document_id=document.id,
+            company_id=document.company_id,
+            job_type=job_type,
+            status=JobStatus.QUEUED,
+            stage=DocumentStatus.QUEUED,
+            max_attempts=settings.INGESTION_MAX_ATTEMPTS
+        )
+        document.status = DocumentStatus.QUEUED
+        db.add(job)
+        return job
+    
+    def add_batch(self, documents: List[Document], db: Session) -> List[IngestionJob]:
+        """
+        Add the jobs of a bulk upload to the session as one batch, without committing.
+        
+        Jobs share a batch ID, which lets a worker claim several of them at
+        once and embed their chunks together.
+        
+        Args:
+            documents: Documents to process, flushed so they have IDs
+            db: Database session
+            
+        Returns:
+            Pending jobs in document order
+        """
+        batch_id = uuid.uuid4().hex
+        jobs = [
+            IngestionJob(
+                document_id=document.id,
+                company_id=document.company_id,
+                job_type=JobType.INGEST,
+                status=JobStatus.QUEUED,
+                stage=DocumentStatus.QUEUED,
+                max_attempts=settings.INGESTION_MAX_ATTEMPTS,
+                batch_id=batch_id
+            )
+            for document in documents
+        ]
+        db.add_all(jobs)
+        return jobs
+    
+    def notify(self):
+        """Wake the workers after new jobs were committed."""
+        with self._condition:
+            self._condition.notify_all()
+    
+    def get_job(self, job_id: int, company_id: int, db: Session) -> IngestionJob:
+        """Get an ingestion job belonging to a company."""
+        job = db.query(IngestionJob).filter(
+            IngestionJob.id == job_id,
+            IngestionJob.company_id == company_id
+        ).first()
+        
+        if not job:
+            raise ValueError("Job not found")
+        
+        return job
+    
+    def _worker_loop(self, worker_id: str):
+        """Claim and run jobs until the service is stopped."""
+        while not self._stop_event.is_set():
+            try:
+                self._sweep_if_due()
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed to requeue stale jobs: {str(e)}")
+            
+            try:
+                job_id = self._claim_next_job(worker_id)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed to claim a job: {str(e)}")
+                job_id = None
+            
+            if job_id is None:
+                with self._condition:
+                    self._condition.wait(timeout=settings.INGESTION_POLL_INTERVAL)
+                continue
+            
+            self._run_job(job_id, worker_id)
+    
+    def _claim_next_job(self, worker_id: str) -> Optional[int]:
+        """
+        Atomically claim the oldest claimable job.
+        
+        The status check in the UPDATE makes the claim safe across threads
+        and processes sharing the same database.
+        
+        Returns:
+            Claimed job ID, or None if no job is available
+        """
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            candidates = db.query(IngestionJob.id).filter(
+                IngestionJob.status == JobStatus.QUEUED,
+                IngestionJob.available_at <= now
+            ).order_by(IngestionJob.id).limit(5).all()
+            
+            for (job_id,) in candidates:
+                if self._try_claim(db, job_id, worker_id):
+                    return job_id
+            
+            return None
+        finally:
+            db.close()
+    
+    def _try_claim(self, db: Session, job_id: int, worker_id: str) -> bool:
+        """Claim a single queued job with a compare-and-set update."""
+        now = datetime.utcnow()
+        claimed = db.query(IngestionJob).filter(
+            IngestionJob.id == job_id,
+            IngestionJob.status == JobStatus.QUEUED
+        ).update(
+            {
+                IngestionJob.status: JobStatus.RUNNING,
+                IngestionJob.worker_id: worker_id,
+                IngestionJob.attempts: IngestionJob.attempts + 1,
+                IngestionJob.started_at: now,
+                IngestionJob.heartbeat_at: now,
+                IngestionJob.error: None
+            },
+            synchronize_session=False
+        )
+        db.commit()
+        return bool(claimed)
+    
+    def _claim_batch_siblings(
+        self,
+        db: Session,
+        job: IngestionJob,
+        worker_id: str,
+        claimed_ids: List[int]
+    ) -> List[IngestionJob]:
+        """
+        Claim more queued jobs from the same bulk upload as ``job``.
+        
+        Each claimed ID is appended to ``claimed_ids`` right away, so the
+        caller can release the jobs even if a later step fails.
+        """
+        limit = settings.INGESTION_BULK_DOCUMENTS - 1
+        if limit <= 0:
+            return []
+        
+        candidates = db.query(IngestionJob.id).filter(
+            IngestionJob.batch_id == job.batch_id,
+            IngestionJob.status == JobStatus.QUEUED,
+            IngestionJob.available_at <= datetime.utcnow()
+        ).order_by(IngestionJob.id).limit(limit).all()
+        
+        sibling_ids = []
+        for (job_id,) in candidates:
+            if self._try_claim(db, job_id, worker_id):
+                claimed_ids.append(job_id)
+                sibling_ids.append(job_id)
+        if not sibling_ids:
+            return []
+        
+        return db.query(IngestionJob).filter(IngestionJob.id.in_(sibling_ids)).order_by(IngestionJob.id).all()
+    
+    def _run_job(self, job_id: int, worker_id: str = None):
+        """Process a claimed job and record the outcome."""
+        db = SessionLocal()
+        try:
+            job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+            
+            if job.batch_id and job.job_type == JobType.INGEST and job.document is not None:
+                self._run_batch(db, job, worker_id)
+                return
+            
+            document = job.document
+            
+            if document is None:
+                self._finish_job(db, job, JobStatus.FAILED, error="Document no longer exists")
+                return
+            
+            # A replace job must keep the stored chunks it diffs against
+            if job.attempts > 1 and job.job_type == JobType.INGEST:
+                self._discard_partial_chunks(document)
+            
+            def on_progress(stage: DocumentStatus, **counts):
+                job.stage = stage
+                job.heartbeat_at = datetime.utcnow()
+                for field, value in counts.items():
+                    setattr(job, field, value)
+            
+            if job.job_type == JobType.REPLACE:
+                result = self.document_service.reprocess_document(
+                    document_id=document.id,
+                    file_path=document.file_path,
+                    company_id=document.company_id,
+                    db=db,
+                    progress_callback=on_progress
+                )
+            else:
+                result = self.document_service.process_document(
+                    document_id=document.id,
+                    file_path=document.file_path,
+                    company_id=document.company_id,
+                    db=db,
+                    progress_callback=on_progress
+                )
+            
+            if result:
+                job.result = json.dumps(result)
+            self._finish_job(db, job, JobStatus.COMPLETED)
+            logger.info(f"Ingestion job {job_id} completed")
+        
+        except Exception as e:
+            db.rollback()
+            self._handle_failure(db, job_id, e)
+        finally:
+            db.close()
+    
+    def _run_batch(self, db: Session, job: IngestionJob, worker_id: str):
+        """
+        Process a claimed bulk-upload job together with queued jobs from the
+        same batch, sharing embedding batches across their documents.
+        
+        Any error, including one before processing starts, is recorded on
+        every job this call claimed that has not finished, so none of them
+        is left running.
+        """
+        claimed_ids = [job.id]
+        try:
+            jobs = [job] + self._claim_batch_siblings(db, job, worker_id, claimed_ids)
+            
+            runnable = []
+            for batch_job in jobs:
+                if batch_job.document is None:
+                    self._finish_job(db, batch_job, JobStatus.FAILED, error="Document no longer exists")
+                    continue
+                if batch_job.attempts > 1:
+                    self._discard_partial_chunks(batch_job.document)
+                runnable.append(batch_job)
+            
+            def progress_for(batch_job: IngestionJob):
+                def on_progress(stage: DocumentStatus, **counts):
+                    batch_job.stage = stage
+                    batch_job.heartbeat_at = datetime.utcnow()
+                    for field, value in counts.items():
+                        setattr(batch_job, field, value)
+                return on_progress
+            
+            results = self.document_service.process_documents(
+                documents=[batch_job.document for batch_job in runnable],
+                db=db,
+                progress_callbacks={batch_job.document_id: progress_for(batch_job) for batch_job in runnable}
+            )
+            
+            for batch_job in runnable:
+                result = results.get(batch_job.document_id)
+                if isinstance(result, Exception):
+                    self._handle_failure(db, batch_job.id, result)
+                    continue
+                
+                if result:
+                    batch_job.result = json.dumps(result)
+                self._finish_job(db, batch_job, JobStatus.COMPLETED)
+        
+        except Exception as e:
+            db.rollback()
+            for job_id in claimed_ids:
+                self._handle_failure(db, job_id, e)
+            return
+        
+        logger.info(f"Ingestion batch {job.batch_id}: processed {len(runnable)} jobs together")
+    
+    def _handle_failure(self, db: Session, job_id: int, error: Exception):
+        """Requeue a failed job with backoff, or mark it failed for good."""
+        job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+        # Jobs of a batch may have finished before the error
+        if job is None or job.status != JobStatus.RUNNING:
+            return
+        
+        if job.attempts < job.max_attempts:
+            delay = settings.INGESTION_RETRY_BACKOFF * (2 ** (job.attempts - 1))
+            job.status = JobStatus.QUEUED
+            job.stage = DocumentStatus.QUEUED
+            job.error = str(error)
+            job.available_at = datetime.utcnow() + timedelta(seconds=delay)
+            if job.document:
+                job.document.status = DocumentStatus.QUEUED
+            db.commit()
+            
+            logger.warning(
+                f"Ingestion job {job_id} failed (attempt {job.attempts}/{job.max_attempts}), "
+                f"retrying in {delay}s: {str(error)}"
+            )
+        else:
+            self._finish_job(db, job, JobStatus.FAILED, error=str(error))
+            logger.error(f"Ingestion job {job_id} failed permanently: {str(error)}")
+    
+    def _finish_job(self, db: Session, job: IngestionJob, status: JobStatus, error: str = None):
+        """
+        Mark a job as finished.
+        
+        A failed ingest job may have left chunks behind (streaming ingestion
+        makes them searchable as they are written), which are removed. A
+        failed replace job keeps the previous version's chunks.
+        """
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        
+        if status == JobStatus.FAILED:
+            job.stage = DocumentStatus.FAILED
+            if job.document:
+                if job.job_type == JobType.INGEST:
+                    self._discard_partial_chunks(job.document)
+                job.document.status = DocumentStatus.FAILED
+                job.document.processed = False
+        
+        db.commit()
+    
+    def _discard_partial_chunks(self, document: Document):
+        """Remove chunks a previous failed attempt may have written."""
+        try:
+            self.document_service.vector_store.delete_document(document.company_id, document.id)
+        except Exception as e:
+            logger.warning(f"Could not clear partial chunks for document {document.id}: {str(e)}")
+    
+    def _heartbeat_loop(self):
+        """Refresh the heartbeat of this service's running jobs until it is stopped."""
+        while not self._stop_event.wait(settings.INGESTION_HEARTBEAT_INTERVAL):
+            db = SessionLocal()
+            try:
+                db.query(IngestionJob).filter(
+                    IngestionJob.status == JobStatus.RUNNING,
+                    IngestionJob.worker_id.in_(self._worker_ids)
+                ).update({IngestionJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to record ingestion heartbeats: {str(e)}")
+            finally:
+                db.close()
+    
+    def _sweep_if_due(self):
+        """Requeue stale jobs, at most once per heartbeat interval across the workers."""
+        with self._sweep_lock:
+            now = time.monotonic()
+            if self._last_sweep and now - self._last_sweep < settings.INGESTION_HEARTBEAT_INTERVAL:
+                return
+            self._last_sweep = now
+        self._requeue_stale_jobs()
+    
+    def _requeue_stale_jobs(self):
+        """Requeue running jobs whose worker stopped sending heartbeats."""
+        db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=settings.INGESTION_JOB_TIMEOUT)
+            stale = db.query(IngestionJob).filter(
+                IngestionJob.status == JobStatus.RUNNING,
+                IngestionJob.heartbeat_at < cutoff
+            ).all()
+            
+            for job in stale:
+                job.status = JobStatus.QUEUED
+                job.stage = DocumentStatus.QUEUED
+                job.available_at = datetime.utcnow()
+                if job.document:
+                    job.document.status = DocumentStatus.QUEUED
+            
+            db.commit()
+            
+            if stale:
+                logger.info(f"Requeued {len(stale)} abandoned ingestion jobs")
+        finally:
+            db.close()
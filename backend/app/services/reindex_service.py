@@ -0,0 +1,358 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+from app.config import settings
+from app.core.database import SessionLocal
+from app.models.database import Company, Document, DocumentStatus, IngestionJob, JobStatus, JobType
+from app.services.document_service import DocumentService
+from app.services.ingestion_service import IngestionService
+from app.utils.pdf_parser import PDFParser
+
+logger = logging.getLogger(__name__)
+
+
+class ReindexService:
+    """
+    Rebuild a company's vector collection with the current settings.
+    
+    Every indexed document is parsed, chunked and embedded again into a
+    shadow collection, which then replaces the live collection in one swap,
+    so searches keep working from the old index until the new one is done.
+    
+    Progress is saved to a state file after every document, with the
+    content hash it was indexed from, so a document replaced during the
+    rebuild is indexed again. Running the reindex again with the same
+    settings resumes where it stopped; changed settings start a fresh
+    rebuild.
+    
+    The reindex only writes to the shadow collection. Documents that change
+    around the swap are queued for the API server's ingestion workers,
+    which own the live collection.
+    """
+    
+    def __init__(self, document_service: DocumentService, workers: int = None):
+        """
+        Initialize reindex service.
+        
+        Args:
+            document_service: Service used to index documents
+            workers: Documents processed in parallel (defaults to REINDEX_WORKERS)
+        """
+        self.document_service = document_service
+        self.vector_store = document_service.vector_store
+        # Only queues jobs, the API server's workers run them
+        self.ingestion_service = IngestionService(document_service)
+        self.workers = workers or settings.REINDEX_WORKERS
+        self._state_lock = threading.Lock()
+    
+    def reindex_company(
+        self,
+        company_id: int,
+        restart: bool = False,
+        progress_callback: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Rebuild a company's collection and swap it in.
+        
+        The swap only happens once every document was indexed; after
+        failures the shadow collection and progress are kept so that a rerun
+        only retries the failed documents.
+        
+        Args:
+            company_id: Company ID
+            restart: Discard saved progress and rebuild from scratch
+            progress_callback: Called with throughput stats after each document
+            
+        Returns:
+            Summary with document, page and chunk counts, failures, whether
+            the new collection was swapped in and the documents queued for
+            ingestion after the swap
+        """
+        db = SessionLocal()
+        try:
+            if not db.query(Company).filter(Company.id == company_id).first():
+                raise ValueError(f"Company {company_id} not found")
+            
+            active_jobs = db.query(IngestionJob).filter(
+                IngestionJob.company_id == company_id,
+                IngestionJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING])
+            ).count()
+            if active_jobs:
+                raise ValueError(
+                    f"Company {company_id} has {active_jobs} ingestion jobs in progress, "
+                    f"wait for them to finish"
+                )
+            
+            shadow_name = self.vector_store.get_shadow_collection_name(company_id)
+            state = self._start_or_resume(company_id, shadow_name, restart)
+            
+            started = time.perf_counter()
+            stats = {"documents_done": 0, "pages": 0, "chunks": 0}
+            failures: Dict[int, str] = {}
+            
+            # Documents indexed or replaced by the live system while we work are picked up on the next pass
+            while True:
+                pending = [
+                    document for document in self._pending_documents(company_id, state, db)
+                    if document[0] not in failures
+                ]
+                if not pending:
+                    break
+                
+                total = len(state["completed"]) + len(pending)
+                self._index_pending(
+                    company_id, shadow_name, pending, state, stats, failures, total, started, progress_callback
+                )
+            
+            summary = {
+                "company_id": company_id,
+                "documents": len(state["completed"]),
+                "pages": sum(done["page_count"] for done in state["completed"].values()),
+                "chunks": sum(done["chunk_count"] for done in state["completed"].values()),
+                "failed": {str(document_id): error for document_id, error in failures.items()},
+                "seconds": round(time.perf_counter() - started, 2),
+                "swapped": False,
+                "queued": []
+            }
+            
+            if failures:
+                logger.warning(f"Reindex of company {company_id} left {len(failures)} documents failed, not swapping")
+                return summary
+            
+            queued = self._finish(company_id, shadow_name, state, db)
+            # Documents deleted before the swap are no longer counted
+            summary.update(
+                documents=len(state["completed"]),
+                pages=sum(done["page_count"] for done in state["completed"].values()),
+                chunks=sum(done["chunk_count"] for done in state["completed"].values()),
+                swapped=True,
+                queued=queued
+            )
+            return summary
+        finally:
+            db.close()
+    
+    def _start_or_resume(self, company_id: int, shadow_name: str, restart: bool) -> Dict:
+        """Load saved progress, or reset the shadow collection for a fresh rebuild."""
+        fingerprint = self._fingerprint()
+        state = None if restart else self._load_state(company_id)
+        
+        if state and state.get("fingerprint") == fingerprint and self.vector_store.collection_exists(shadow_name):
+            logger.info(f"Resuming reindex of company {company_id}, {len(state['completed'])} documents already done")
+            # A document interrupted mid-way may have left partial chunks
+            state["resumed"] = True
+            return state
+        
+        self.vector_store.reset_collection(company_id, shadow_name)
+        state = {
+            "fingerprint": fingerprint,
+            "started_at": datetime.utcnow().isoformat(),
+            "completed": {}
+        }
+        self._save_state(company_id, state)
+        return state
+    
+    def _index_pending(
+        self,
+        company_id: int,
+        shadow_name: str,
+        pending: List[Tuple[int, str, Optional[str]]],
+        state: Dict,
+        stats: Dict,
+        failures: Dict[int, str],
+        total: int,
+        started: float,
+        progress_callback: Optional[Callable[[Dict], None]]
+    ):
+        """Index documents into the shadow collection on the worker pool."""
+        # Replaced since they were indexed, their old chunks must go first
+        changed = {document_id for document_id, _, _ in pending if str(document_id) in state["completed"]}
+        
+        def index(document_id: int, file_path: str, content_hash: Optional[str]) -> Tuple[int, int]:
+            if state.get("resumed") or document_id in changed:
+                self.vector_store.delete_document(company_id, document_id, collection_name=shadow_name)
+            return self.document_service.index_document(
+                document_id, file_path, content_hash, company_id, shadow_name
+            )
+        
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="reindex") as executor:
+            futures = {
+                executor.submit(index, document_id, file_path, content_hash): (document_id, content_hash)
+                for document_id, file_path, content_hash in pending
+            }
+            
+            for future in as_completed(futures):
+                document_id, content_hash = futures[future]
+                try:
+                    page_count, chunk_count = future.result()
+                except Exception as e:
+                    logger.error(f"Reindexing document {document_id} failed: {str(e)}")
+                    failures[document_id] = str(e)
+                    continue
+                
+                with self._state_lock:
+                    state["completed"][str(document_id)] = {
+                        "page_count": page_count,
+                        "chunk_count": chunk_count,
+                        "content_hash": content_hash
+                    }
+                    self._save_state(company_id, state)
+                
+                stats["documents_done"] += 1
+                stats["pages"] += page_count
+                stats["chunks"] += chunk_count
+                
+                if progress_callback:
+                    elapsed = max(time.perf_counter() - started, 1e-9)
+                    progress_callback({
+                        "document_id": document_id,
+                        "completed": len(state["completed"]),
+                        "total": total,
+                        "failed": len(failures),
+                        "elapsed": elapsed,
+                        "documents_per_second": stats["documents_done"] / elapsed,
+                        "pages_per_second": stats["pages"] / elapsed,
+                        "chunks_per_second": stats["chunks"] / elapsed
+                    })
+    
+    def _finish(self, company_id: int, shadow_name: str, state: Dict, db) -> List[int]:
+        """
+        Swap the rebuilt collection in and record the new chunk counts.
+        
+        Ingestion keeps running during the swap. A job that finishes between
+        the last pass and the swap wrote its chunks to the old collection,
+        which the swap drops. Once running jobs are done, every document that
+        changed in the meantime gets a REPLACE job. The API server's workers
+        run it against the new live collection, so this process never writes
+        to a collection they write to.
+        
+        Returns:
+            IDs of the documents queued for ingestion
+        """
+        def drop_deleted():
+            # Documents deleted during the rebuild must not come back
+            current_ids = {document_id for document_id, _, _ in self._indexed_documents(company_id, db)}
+            for document_id in [int(key) for key in state["completed"] if int(key) not in current_ids]:
+                self.vector_store.delete_document(company_id, document_id, collection_name=shadow_name)
+                del state["completed"][str(document_id)]
+        
+        # With writes held off, so no delete slips in between the check and the swap
+        self.vector_store.swap_collection(company_id, shadow_name, before_swap=drop_deleted)
+        # The progress file belongs to the shadow collection, which is gone
+        os.remove(self._state_path(company_id))
+        
+        self._wait_for_running_jobs(company_id, db)
+        queued = self._queue_changed_documents(company_id, state, db)
+        
+        for document in db.query(Document).filter(Document.company_id == company_id).all():
+            done = state["completed"].get(str(document.id))
+            # A document replaced since gets the counts of its own ingestion
+            if done and done.get("content_hash") == document.content_hash:
+                document.page_count = done["page_count"]
+                document.chunk_count = done["chunk_count"]
+        db.commit()
+        
+        logger.info(f"Reindexed {len(state['completed'])} documents for company {company_id}")
+        return queued
+    
+    def _queue_changed_documents(self, company_id: int, state: Dict, db) -> List[int]:
+        """
+        Queue a REPLACE job for each document that changed since its shadow copy was built.
+        
+        A REPLACE job re-embeds only the chunks that differ from those stored
+        in the live collection. Documents that already have a queued or
+        running job are left to it.
+        """
+        busy = {
+            document_id for (document_id,) in db.query(IngestionJob.document_id).filter(
+                IngestionJob.company_id == company_id,
+                IngestionJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING])
+            )
+        }
+        
+        queued = []
+        for document_id, _, _ in self._pending_documents(company_id, state, db):
+            if document_id in busy:
+                continue
+            document = db.query(Document).filter(Document.id == document_id).first()
+            self.ingestion_service.add_job(document, db, JobType.REPLACE)
+            queued.append(document_id)
+        db.commit()
+        
+        if queued:
+            logger.info(f"Queued {len(queued)} documents of company {company_id} that changed during the swap")
+        return queued
+    
+    def _wait_for_running_jobs(self, company_id: int, db):
+        """Block until no ingestion job of the company is running."""
+        while True:
+            db.expire_all()
+            running = db.query(IngestionJob).filter(
+                IngestionJob.company_id == company_id,
+                IngestionJob.status == JobStatus.RUNNING
+            ).count()
+            if not running:
+                return
+            logger.info(f"Waiting for {running} running ingestion jobs of company {company_id}")
+            time.sleep(settings.INGESTION_POLL_INTERVAL)
+    
+    def _pending_documents(self, company_id: int, state: Dict, db) -> List[Tuple[int, str, Optional[str]]]:
+        """List indexed documents not rebuilt yet, or rebuilt from content that has since been replaced."""
+        return [
+            document for document in self._indexed_documents(company_id, db)
+            if str(document[0]) not in state["completed"]
+            or state["completed"][str(document[0])].get("content_hash") != document[2]
+        ]
+    
+    def _indexed_documents(self, company_id: int, db) -> List[Tuple[int, str, Optional[str]]]:
+        """List (id, file_path, content_hash) of the company's indexed documents."""
+        db.expire_all()
+        return db.query(Document.id, Document.file_path, Document.content_hash).filter(
+            Document.company_id == company_id,
+            Document.status == DocumentStatus.INDEXED
+        ).order_by(Document.id).all()
+    
+    def _fingerprint(self) -> Dict:
+        """Settings that determine the contents of a rebuilt collection."""
+        return {
+            "embedding_model": settings.EMBEDDING_MODEL,
+            "embedding_backend": self.document_service.embedding_service.get_backend_name(),
+            "embedding_normalize": settings.EMBEDDING_NORMALIZE,
+            "embedding_reduction": self.document_service.embedding_service.get_reduction_name(),
+            "chunking_mode": settings.CHUNKING_MODE,
+            "chunk_size": settings.CHUNK_SIZE,
+            "chunk_overlap": settings.CHUNK_OVERLAP,
+            "chunk_max_tokens": settings.CHUNK_MAX_TOKENS,
+            "chunk_overlap_tokens": settings.CHUNK_OVERLAP_TOKENS,
+            "parser_version": PDFParser.PARSER_VERSION
+        }
+    
+    def _state_path(self, company_id: int) -> str:
+        """Get the progress file of a company's reindex."""
+        return os.path.join(settings.REINDEX_STATE_DIR, f"company_{company_id}.json")
+    
+    def _load_state(self, company_id: int) -> Optional[Dict]:
+        """Load saved progress, if any."""
+        try:
+            with open(self._state_path(company_id)) as state_file:
+                return json.load(state_file)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning(f"Ignoring unreadable reindex state for company {company_id}")
+            return None
+    
+    def _save_state(self, company_id: int, state: Dict):
+        """Write progress atomically, so an interruption never corrupts it."""
+        os.makedirs(settings.REINDEX_STATE_DIR, exist_ok=True)
+        path = self._state_path(company_id)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as state_file:
+            json.dump({key: value for key, value in state.items() if key != "resumed"}, state_file)
+        os.replace(temp_path, path)
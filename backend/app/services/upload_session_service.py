@@ -0,0 +1,394 @@
+import os
+import re
+import fcntl
+import uuid
+import hashlib
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+import logging
+
+from app.config import settings
+from app.core.database import SessionLocal
+from app.core.executors import HASHING, UPLOADS, run_in_executor
+from app.models.database import Document, IngestionJob, UploadPart, UploadSession
+from app.services.document_service import DocumentService, QueueJob
+from app.utils.upload_writer import PDF_MAGIC, UploadWriter
+
+logger = logging.getLogger(__name__)
+
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+class UploadSessionConflictError(Exception):
+    """An upload session is being completed while ranges are still being written to it."""
+
+
+class UploadSessionService:
+    """
+    Resumable uploads for large documents.
+    
+    A session reserves a file of the declared size under UPLOAD_SESSION_DIR.
+    Clients then PUT byte ranges in any order, possibly in parallel, and
+    re-send whatever is missing after a dropped connection. Each received
+    range is recorded in the database once it is fully written, so the
+    upload state survives a restart. Completing the session verifies the
+    file and turns it into a regular document.
+    """
+    
+    def __init__(self, document_service: DocumentService):
+        """
+        Initialize upload session service.
+        
+        Args:
+            document_service: Service used to create the finished document
+        """
+        self.document_service = document_service
+    
+    def create_session(
+        self,
+        filename: str,
+        file_size: int,
+        content_hash: Optional[str],
+        company_id: int,
+        user_id: int,
+        db: Session
+    ) -> UploadSession:
+        """
+        Start a resumable upload.
+        
+        Args:
+            filename: Name of the file being uploaded
+            file_size: Total file size in bytes
+            content_hash: Optional expected SHA-256 hex digest
+            company_id: Company ID
+            user_id: User ID who uploads
+            db: Database session
+            
+        Returns:
+            Created upload session
+        """
+        if not filename.lower().endswith('.pdf'):
+            raise ValueError("Only PDF files are supported")
+        
+        if file_size > settings.RESUMABLE_MAX_UPLOAD_SIZE:
+            raise ValueError(f"File size exceeds {settings.RESUMABLE_MAX_UPLOAD_SIZE / (1024*1024)}MB limit")
+        
+        session_id = uuid.uuid4().hex
+        part_path = os.path.join(settings.UPLOAD_SESSION_DIR, f"{session_id}.part")
+        
+        # Reserve the full size up front; ranges are written in place
+        with open(part_path, "wb") as part_file:
+            part_file.truncate(file_size)
+        
+        session = UploadSession(
+            id=session_id,
+            company_id=company_id,
+            uploaded_by=user_id,
+            original_filename=os.path.basename(filename),
+            file_size=file_size,
+            content_hash=content_hash.lower() if content_hash else None,
+            part_path=part_path,
+            expires_at=datetime.utcnow() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+        )
+        
+        try:
+            db.add(session)
+            db.commit()
+            db.refresh(session)
+        except Exception:
+            db.rollback()
+            os.remove(part_path)
+            raise
+        
+        logger.info(f"Created upload session {session_id} for {file_size} bytes")
+        return session
+    
+    def get_session(self, session_id: str, company_id: int, db: Session) -> UploadSession:
+        """Get an upload session belonging to a company."""
+        session = db.query(UploadSession).filter(
+            UploadSession.id == session_id,
+            UploadSession.company_id == company_id
+        ).first()
+        
+        if not session:
+            raise ValueError("Upload session not found")
+        
+        return session
+    
+    async def write_range(
+        self,
+        session_id: str,
+        company_id: int,
+        content_range: str,
+        body: AsyncIterator[bytes],
+        db: Session
+    ) -> UploadSession:
+        """
+        Store one byte range of an upload.
+        
+        The range is streamed into place without buffering it in memory. It
+        is only recorded as received once every byte has been written, so an
+        interrupted request simply has to be sent again.
+        
+        Args:
+            session_id: Upload session ID
+            company_id: Company ID
+            content_range: Content-Range header, e.g. ``bytes 0-1048575/5242880``
+            body: Request body stream
+            db: Database session
+            
+        Returns:
+            Updated upload session
+            
+        Raises:
+            UploadSessionConflictError: If the session is being completed
+        """
+        session = self._get_open_session(session_id, company_id, db)
+        start, end = self._parse_content_range(content_range, session.file_size)
+        
+        # The shared lock is held until the range is recorded, so the session
+        # cannot be completed in the middle of it
+        part_file = await run_in_executor(UPLOADS, self._open_part, session.part_path, fcntl.LOCK_SH)
+        received = 0
+        try:
+            await run_in_executor(UPLOADS, part_file.seek, start)
+            async for data in body:
+                received += len(data)
+                if received > end - start:
+                    raise ValueError("Request body is longer than the Content-Range")
+                await run_in_executor(UPLOADS, part_file.write, data)
+            
+            if received != end - start:
+                raise ValueError(f"Expected {end - start} bytes for the Content-Range, received {received}")
+            
+            await run_in_executor(UPLOADS, part_file.flush)
+            db.add(UploadPart(session_id=session.id, start=start, end=end))
+            db.commit()
+        finally:
+            await run_in_executor(UPLOADS, part_file.close)
+        
+        db.refresh(session)
+        return session
+    
+    async def complete_session(
+        self,
+        session_id: str,
+        company_id: int,
+        db: Session,
+        queue_job: QueueJob
+    ) -> Tuple[Document, IngestionJob]:
+        """
+        Finish an upload and create its document.
+        
+        Args:
+            session_id: Upload session ID
+            company_id: Company ID
+            db: Database session
+            queue_job: Adds the document's ingestion job to the transaction
+            
+        Returns:
+            Tuple of (created document, its ingestion job)
+            
+        Raises:
+            UploadSessionConflictError: If ranges are still being written
+        """
+        session = self._get_open_session(session_id, company_id, db)
+        
+        # Held until the file is moved away; later range writes find it gone
+        part_file = await run_in_executor(UPLOADS, self._open_part, session.part_path, fcntl.LOCK_EX)
+        try:
+            missing = session.file_size - self.received_bytes(session)
+            if missing:
+                raise ValueError(f"Upload is incomplete, {missing} bytes are missing")
+            
+            content_hash = await run_in_executor(HASHING, self._hash_pdf, session.part_path)
+            if content_hash is None or (session.content_hash and session.content_hash != content_hash):
+                # The assembled file is unusable, so the session cannot be resumed
+                self._discard_session(session, db)
+                raise ValueError(
+                    "File is not a valid PDF" if content_hash is None
+                    else "Uploaded file does not match the declared content hash"
+                )
+            
+            filename = UploadWriter.stored_filename(session.original_filename, company_id)
+            file_path = os.path.join(settings.UPLOAD_DIR, filename)
+            os.replace(session.part_path, file_path)
+        finally:
+            part_file.close()
+        
+        try:
+            document, job = self.document_service.create_document(
+                filename=filename,
+                original_filename=session.original_filename,
+                file_path=file_path,
+                file_size=session.file_size,
+                content_hash=content_hash,
+                company_id=company_id,
+                user_id=session.uploaded_by,
+                db=db,
+                queue_job=queue_job
+            )
+        except Exception:
+            db.rollback()
+            os.remove(file_path)
+            self._discard_session(session, db)
+            raise
+        
+        session.document_id = document.id
+        session.completed_at = datetime.utcnow()
+        db.commit()
+        
+        logger.info(f"Upload session {session_id} completed as document {document.id}")
+        return document, job
+    
+    def cancel_session(self, session_id: str, company_id: int, db: Session):
+        """Abort an upload and delete the received data."""
+        session = self.get_session(session_id, company_id, db)
+        self._discard_session(session, db)
+    
+    def cleanup_expired_sessions(self):
+        """
+        Delete expired sessions and the data received for them.
+        
+        A session whose partial file is still locked by a range write or a
+        completion is left for the next run.
+        """
+        db = SessionLocal()
+        try:
+            expired = db.query(UploadSession).filter(
+                UploadSession.expires_at < datetime.utcnow()
+            ).all()
+            
+            removed = 0
+            for session in expired:
+                part_file = None
+                if os.path.exists(session.part_path):
+                    try:
+                        part_file = self._open_part(session.part_path, fcntl.LOCK_EX)
+                    except UploadSessionConflictError:
+                        continue
+                try:
+                    self._discard_session(session, db)
+                    removed += 1
+                finally:
+                    if part_file:
+                        part_file.close()
+            
+            if removed:
+                logger.info(f"Removed {removed} expired upload sessions")
+        finally:
+            db.close()
+    
+    @staticmethod
+    def received_ranges(session: UploadSession) -> List[Tuple[int, int]]:
+        """
+        Merge the received parts of a session.
+        
+        Returns:
+            Sorted, non-overlapping ``(start, end)`` byte ranges, end exclusive
+        """
+        merged: List[Tuple[int, int]] = []
+        for part in sorted(session.parts, key=lambda part: part.start):
+            if merged and part.start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], part.end))
+            else:
+                merged.append((part.start, part.end))
+        return merged
+    
+    @staticmethod
+    def received_bytes(session: UploadSession) -> int:
+        """Count the distinct bytes received for a session."""
+        return sum(end - start for start, end in UploadSessionService.received_ranges(session))
+    
+    def _get_open_session(self, session_id: str, company_id: int, db: Session) -> UploadSession:
+        """Get a session that still accepts data."""
+        session = self.get_session(session_id, company_id, db)
+        
+        if session.completed_at:
+            raise ValueError("Upload session is already completed")
+        
+        if session.expires_at < datetime.utcnow():
+            raise ValueError("Upload session has expired")
+        
+        return session
+    
+    @staticmethod
+    def _open_part(part_path: str, operation: int):
+        """
+        Open and lock a session's partial file.
+        
+        Range writes share the lock while completion takes it exclusively.
+        Neither waits for the other: a request that finds the lock taken, or
+        the file already moved into place, fails with a conflict instead.
+        
+        Args:
+            part_path: Path of the partial file
+            operation: ``fcntl.LOCK_SH`` to write a range, ``fcntl.LOCK_EX`` to complete
+            
+        Returns:
+            Open file holding the lock until it is closed
+        """
+        part_file = None
+        try:
+            part_file = open(part_path, "r+b")
+            fcntl.flock(part_file, operation | fcntl.LOCK_NB)
+            # The file may have been moved away between the open and the lock
+            if os.stat(part_path).st_ino != os.fstat(part_file.fileno()).st_ino:
+                raise FileNotFoundError(part_path)
+            return part_file
+        except FileNotFoundError:
+            if part_file:
+                part_file.close()
+            raise UploadSessionConflictError("Upload session was completed or cancelled")
+        except BlockingIOError:
+            part_file.close()
+            if operation == fcntl.LOCK_EX:
+                raise UploadSessionConflictError("Ranges of this upload are still being written")
+            raise UploadSessionConflictError("Upload session is being completed")
+    
+    @staticmethod
+    def _parse_content_range(content_range: str, file_size: int) -> Tuple[int, int]:
+        """
+        Parse a Content-Range header into a ``(start, end)`` range, end exclusive.
+        """
+        match = _CONTENT_RANGE.match((content_range or "").strip())
+        if not match:
+            raise ValueError("Content-Range must look like 'bytes <start>-<end>/<total>'")
+        
+        start, last, total = (int(value) for value in match.groups())
+        if total != file_size:
+            raise ValueError(f"Content-Range total {total} does not match the session size {file_size}")
+        if start > last or last >= file_size:
+            raise ValueError("Content-Range is outside the file")
+        
+        return start, last + 1
+    
+    @staticmethod
+    def _hash_pdf(file_path: str) -> Optional[str]:
+        """
+        Hash an assembled upload.
+        
+        Returns:
+            SHA-256 hex digest, or None if the file is not a PDF
+        """
+        hasher = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            head = file.read(len(PDF_MAGIC))
+            if head != PDF_MAGIC:
+                return None
+            hasher.update(head)
+            while True:
+                data = file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not data:
+                    break
+                hasher.update(data)
+        return hasher.hexdigest()
+    
+    def _discard_session(self, session: UploadSession, db: Session):
+        """Delete a session record and its partial file."""
+        if os.path.exists(session.part_path):
+            os.remove(session.part_path)
+        
+        db.delete(session)
+        db.commit()
@@ -1,27 +1,335 @@
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from typing import List, Dict, Optional
+import os
+import re
+import time
+import fcntl
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Dict, Optional, Tuple
+import numpy as np
 import logging
 from app.config import settings
+from app.core.metrics import metrics
+from app.services.embedding_service import EmbeddingService
+from app.utils.vector_backends import VectorBackend, create_vector_backend
 
 logger = logging.getLogger(__name__)
 
+collection_lookups = metrics.counter(
+    "vector_store_collection_lookups_total",
+    "Collection handle lookups by result (hit or miss)"
+)
+
+# The two names a company's collection alternates between, see swap_collection
+_COMPANY_COLLECTION = re.compile(r"^company_(\d+)_documents(?:_reindex)?$")
+
+# Collection metadata describing its vectors, and the setting that changes each
+EMBEDDING_SPACE_SETTINGS = {
+    "embedding_dimension": "EMBEDDING_DIMENSION",
+    "embedding_model": "EMBEDDING_MODEL",
+    "embedding_reduction": "EMBEDDING_REDUCTION",
+}
+
 
 class VectorStoreService:
-    """Manage document embeddings in ChromaDB with multi-tenant isolation."""
+    """
+    Manage document embeddings with multi-tenant isolation.
     
-    def __init__(self):
-        """Initialize ChromaDB client."""
-        self.client = chromadb.PersistentClient(
-            path=settings.CHROMA_DB_DIR,
-            settings=ChromaSettings(anonymized_telemetry=False)
-        )
-        logger.info("ChromaDB client initialized")
+    Collections live in the backend selected by VECTOR_STORE_BACKEND
+    (ChromaDB or the native memory-mapped store, see
+    ``app.utils.vector_backends``). All instances share one process-wide
+    backend and a bounded LRU of collection handles, so most calls skip
+    the catalog lookup. Dropping, renaming or recreating a collection
+    replaces a generation file in the backend's directory; every process
+    clears its handles when that changes, so a reindex run from the CLI is
+    picked up by the API server.
     
-    def _get_collection_name(self, company_id: int) -> str:
-        """Generate collection name for a company."""
+    Which collection is a company's live one is recorded in a pointer file
+    next to the backend's data, so a reindex swaps it in with one atomic
+    rename (see ``swap_collection``).
+    """
+    
+    _backend: Optional[VectorBackend] = None
+    _backend_lock = threading.Lock()
+    _collections: "OrderedDict[str, Any]" = OrderedDict()
+    _collections_lock = threading.Lock()
+    # Company ID -> name of its live collection, read from the pointer files
+    _live_names: Dict[int, str] = {}
+    _generation = None
+    
+    def __init__(self, embedding_service: Optional[EmbeddingService] = None):
+        """
+        Initialize vector store service.
+        
+        Args:
+            embedding_service: Service producing the vectors stored and
+                queried, whose model and dimension reduction are recorded on
+                collections. Without one only the dimension is checked.
+        """
+        self.embedding_service = embedding_service
+    
+    @property
+    def backend(self) -> VectorBackend:
+        """Process-wide vector store backend, opened on first access."""
+        if VectorStoreService._backend is None:
+            with VectorStoreService._backend_lock:
+                if VectorStoreService._backend is None:
+                    VectorStoreService._backend = create_vector_backend()
+                    logger.info(f"Vector store backend {VectorStoreService._backend.name} initialized")
+        return VectorStoreService._backend
+    
+    def _get_collection(self, collection_name: str, create: bool = False) -> Tuple[Any, bool]:
+        """
+        Get a collection handle, from the LRU when possible.
+        
+        Args:
+            collection_name: Collection to open
+            create: Create the collection if it does not exist
+            
+        Returns:
+            Tuple of (collection, whether it came from the LRU)
+        """
+        self._sync_generation()
+        with self._collections_lock:
+            collection = self._collections.get(collection_name)
+            if collection is not None:
+                self._collections.move_to_end(collection_name)
+        if collection is not None:
+            collection_lookups.inc(result="hit")
+            return collection, True
+        
+        collection_lookups.inc(result="miss")
+        if create:
+            collection = self.backend.get_or_create_collection(collection_name)
+        else:
+            collection = self.backend.get_collection(collection_name)
+        self._remember(collection)
+        return collection, False
+    
+    def _remember(self, collection):
+        """Put a collection handle in the LRU, evicting the least recently used."""
+        if settings.VECTOR_STORE_COLLECTION_CACHE_SIZE <= 0:
+            return
+        with self._collections_lock:
+            self._collections[collection.name] = collection
+            self._collections.move_to_end(collection.name)
+            while len(self._collections) > settings.VECTOR_STORE_COLLECTION_CACHE_SIZE:
+                self._collections.popitem(last=False)
+    
+    def _generation_path(self) -> str:
+        return os.path.join(self.backend.directory, "collections.generation")
+    
+    def _read_generation(self) -> Optional[Tuple[int, int]]:
+        """Identify the current generation file, which is replaced (new inode) on every change."""
+        try:
+            stat = os.stat(self._generation_path())
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+    
+    def _sync_generation(self) -> Optional[Tuple[int, int]]:
+        """Drop handles and live collection names if any process recorded a change since they were cached."""
+        generation = self._read_generation()
+        with self._collections_lock:
+            if generation != VectorStoreService._generation:
+                self._collections.clear()
+                self._live_names.clear()
+                VectorStoreService._generation = generation
+        return generation
+    
+    def _collections_changed(self):
+        """Invalidate collection handles in every process, after collections were dropped, renamed, recreated or swapped."""
+        path = self._generation_path()
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as generation_file:
+            generation_file.write(str(time.time_ns()))
+        os.replace(temp_path, path)
+        with self._collections_lock:
+            self._collections.clear()
+            self._live_names.clear()
+    
+    def _forget(self, *collection_names: str):
+        """Drop collection handles, after the collections were deleted, renamed or recreated."""
+        with self._collections_lock:
+            for collection_name in collection_names:
+                self._collections.pop(collection_name, None)
+    
+    def _with_collection(
+        self,
+        company_id: int,
+        operation: Callable[[Any], Any],
+        create: bool = False,
+        collection_name: Optional[str] = None
+    ) -> Any:
+        """
+        Run ``operation(collection)`` on a (cached) handle of a company's collection.
+        
+        A cached handle goes stale when another process, such as a reindex
+        run from the CLI, swaps or drops the collection. The backend then
+        fails the operation with its missing collection error, and only
+        that error is retried, once, on a fresh handle of the collection
+        that is live now. Any other error is raised at once.
+        
+        Args:
+            company_id: Company identifier
+            operation: Called with the collection handle
+            create: Create the collection if it does not exist
+            collection_name: Collection to use instead of the company's live
+                collection
+        """
+        name = collection_name or self._get_collection_name(company_id)
+        try:
+            collection, _ = self._get_collection(name, create)
+            return operation(collection)
+        except Exception as e:
+            if not self.backend.is_missing_collection_error(e):
+                raise
+            self._forget(name)
+        
+        logger.info(f"Collection {name} was dropped or replaced, reopening")
+        if collection_name is None:
+            with self._collections_lock:
+                self._live_names.pop(company_id, None)
+            name = self._get_collection_name(company_id)
+        collection, _ = self._get_collection(name, create)
+        return operation(collection)
+    
+    def _company_path(self, company_id: int, extension: str) -> str:
+        """Get a company's live collection pointer (``live``) or write lock (``lock``) file."""
+        directory = os.path.join(self.backend.directory, "companies")
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"company_{company_id}.{extension}")
+    
+    @contextmanager
+    def _company_write_lock(self, company_id: int, exclusive: bool = False) -> Iterator[None]:
+        """
+        Hold a company's write lock.
+        
+        Writes to the live collection share it, a swap holds it exclusively.
+        It is an ``flock``, so it also keeps out writers of other processes.
+        """
+        with open(self._company_path(company_id, "lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+    
+    @contextmanager
+    def _writing(self, company_id: int, collection_name: Optional[str] = None) -> Iterator[None]:
+        """Hold the company's write lock around a write to its live collection; other collections need none."""
+        if collection_name is not None:
+            yield
+            return
+        with self._company_write_lock(company_id):
+            yield
+    
+    def _base_collection_name(self, company_id: int) -> str:
+        """Generate the name of a company's collection before its first reindex."""
         return f"company_{company_id}_documents"
     
+    def _get_collection_name(self, company_id: int) -> str:
+        """Get the name of a company's live collection, from its pointer file."""
+        generation = self._sync_generation()
+        with self._collections_lock:
+            name = self._live_names.get(company_id)
+        if name is not None:
+            return name
+        
+        try:
+            with open(self._company_path(company_id, "live")) as pointer_file:
+                name = pointer_file.read().strip()
+        except FileNotFoundError:
+            name = self._base_collection_name(company_id)
+        with self._collections_lock:
+            # A swap since the generation was read may have moved the pointer
+            if generation == VectorStoreService._generation:
+                self._live_names[company_id] = name
+        return name
+    
+    def get_shadow_collection_name(self, company_id: int) -> str:
+        """
+        Get the name of the collection a company is rebuilt into.
+        
+        A company's collection alternates between two names, each reindex
+        builds under the one that is not live.
+        """
+        base_name = self._base_collection_name(company_id)
+        reindex_name = f"{base_name}_reindex"
+        return base_name if self._get_collection_name(company_id) == reindex_name else reindex_name
+    
+    @staticmethod
+    def get_chunk_id(document_id: int, chunk_index: int) -> str:
+        """Generate the vector store ID of a document chunk."""
+        return f"doc_{document_id}_chunk_{chunk_index}"
+    
+    @staticmethod
+    def build_metadata(document_id: int, chunk: Dict) -> Dict:
+        """Build the stored metadata of a chunk."""
+        metadata = {
+            "document_id": str(document_id),
+            "chunk_index": chunk['chunk_index'],
+            "page_number": str(chunk.get('page_number', 'unknown')),
+            "char_count": chunk['char_count']
+        }
+        for key in ("start_offset", "end_offset", "chunk_hash"):
+            if chunk.get(key) is not None:
+                metadata[key] = chunk[key]
+        return metadata
+    
+    def _build_records(self, document_id: int, chunks: List[Dict]) -> tuple:
+        """Build vector store ids, documents and metadatas for chunks."""
+        ids = [self.get_chunk_id(document_id, chunk['chunk_index']) for chunk in chunks]
+        documents = [chunk['text'] for chunk in chunks]
+        metadatas = [self.build_metadata(document_id, chunk) for chunk in chunks]
+        return ids, documents, metadatas
+    
+    @staticmethod
+    def _as_matrix(embeddings) -> np.ndarray:
+        """
+        Stack vectors into one contiguous float32 matrix.
+        
+        ChromaDB turns a matrix into lists in a single ``tolist`` call, much
+        cheaper than building one list per vector on our side; the native
+        backend writes it as is.
+        """
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+    
+    def _embedding_space(self, embeddings: np.ndarray) -> Dict[str, Any]:
+        """Describe the vectors being written or queried, as recorded in collection metadata."""
+        space = {"embedding_dimension": embeddings.shape[1]}
+        if self.embedding_service is not None:
+            space["embedding_model"] = self.embedding_service.get_backend_name()
+            # Includes the digest of a fitted PCA projection
+            space["embedding_reduction"] = self.embedding_service.get_reduction_name()
+        return space
+    
+    def _check_embedding_space(self, collection, embeddings: np.ndarray, record: bool = False):
+        """
+        Reject vectors that do not match those recorded on a collection.
+        
+        The first write records the vectors' dimension, model and dimension
+        reduction in the collection's metadata. Vectors of another
+        EMBEDDING_DIMENSION, EMBEDDING_MODEL or EMBEDDING_REDUCTION (or of a
+        refitted PCA projection) then fail with a clear error instead of
+        returning meaningless neighbours or mixing into the collection.
+        
+        Args:
+            collection: Backend collection
+            embeddings: float32 matrix about to be written or queried
+            record: Record whatever the collection does not describe yet
+        """
+        metadata = collection.metadata or {}
+        space = self._embedding_space(embeddings)
+        for key, value in space.items():
+            expected = metadata.get(key)
+            if expected is not None and expected != value:
+                raise ValueError(
+                    f"Collection {collection.name} holds embeddings with {key} {expected!r}, got {value!r}; "
+                    f"reindex the company after changing {EMBEDDING_SPACE_SETTINGS[key]}"
+                )
+        
+        missing = {key: value for key, value in space.items() if key not in metadata}
+        if record and missing:
+            collection.modify(metadata={**metadata, **missing})
+    
     def create_collection(self, company_id: int):
         """
         Create a collection for a company.
@@ -31,21 +339,107 @@ class VectorStoreService:
         """
         try:
             collection_name = self._get_collection_name(company_id)
-            self.client.get_or_create_collection(
+            collection = self.backend.get_or_create_collection(
                 name=collection_name,
                 metadata={"company_id": company_id}
             )
+            self._remember(collection)
             logger.info(f"Collection created for company {company_id}")
         except Exception as e:
             logger.error(f"Error creating collection: {str(e)}")
             raise
     
+    def reset_collection(self, company_id: int, collection_name: str):
+        """
+        Create an empty collection, dropping any existing one of that name.
+        
+        Args:
+            company_id: Company identifier
+            collection_name: Collection to (re)create
+        """
+        if collection_name == self._get_collection_name(company_id):
+            raise ValueError("Refusing to reset a company's live collection")
+        
+        try:
+            if self.collection_exists(collection_name):
+                self.backend.delete_collection(collection_name)
+            self.backend.create_collection(
+                name=collection_name,
+                metadata={"company_id": company_id}
+            )
+            self._collections_changed()
+            logger.info(f"Collection {collection_name} reset for company {company_id}")
+        except Exception as e:
+            logger.error(f"Error resetting collection: {str(e)}")
+            raise
+    
+    def swap_collection(
+        self,
+        company_id: int,
+        collection_name: str,
+        before_swap: Optional[Callable[[], None]] = None
+    ):
+        """
+        Make a rebuilt collection the company's live collection.
+        
+        The swap replaces the company's pointer file, a single atomic rename,
+        so searches and writes see either the old or the new collection and
+        never a company without one. Until then nothing has changed, so a
+        failure leaves the old collection live. The swap holds the company's
+        write lock, which makes writes to the live collection, from this or
+        another process, wait and then go to the new collection. The old
+        collection is dropped once the lock is released.
+        
+        Args:
+            company_id: Company identifier
+            collection_name: Rebuilt collection to put live
+            before_swap: Called with writes held off, right before the swap,
+                e.g. to drop chunks of documents deleted in the meantime
+        """
+        try:
+            with self._company_write_lock(company_id, exclusive=True):
+                old_name = self._get_collection_name(company_id)
+                if collection_name == old_name:
+                    raise ValueError(f"Collection {collection_name} is already live")
+                if not self.collection_exists(collection_name):
+                    raise ValueError(f"Collection {collection_name} does not exist")
+                
+                if before_swap:
+                    before_swap()
+                # Our writes to it are done, let the API server's ingestion write to it once live
+                self.backend.release_collection(collection_name)
+                
+                path = self._company_path(company_id, "live")
+                temp_path = f"{path}.{os.getpid()}.tmp"
+                with open(temp_path, "w") as pointer_file:
+                    pointer_file.write(collection_name)
+                os.replace(temp_path, path)
+                self._collections_changed()
+            
+            logger.info(f"Collection {collection_name} is now live for company {company_id}")
+        except Exception as e:
+            logger.error(f"Error swapping collections: {str(e)}")
+            raise
+        
+        try:
+            if self.collection_exists(old_name):
+                self.backend.delete_collection(old_name)
+                self._collections_changed()
+        except Exception as e:
+            # Harmless, the next reindex of the company resets it as its shadow
+            logger.warning(f"Could not drop the replaced collection {old_name}: {str(e)}")
+    
+    def collection_exists(self, collection_name: str) -> bool:
+        """Check whether a collection exists."""
+        return collection_name in self.backend.list_collection_names()
+    
     def add_documents(
         self,
         company_id: int,
         document_id: int,
         chunks: List[Dict],
-        embeddings: List[List[float]]
+        embeddings: np.ndarray,
+        collection_name: Optional[str] = None
     ):
         """
         Add document chunks and embeddings to vector store.
@@ -54,43 +448,144 @@ class VectorStoreService:
             company_id: Company identifier
             document_id: Document identifier
             chunks: List of chunk dictionaries with text and metadata
-            embeddings: List of embedding vectors
+            embeddings: float32 matrix with one row per chunk
+            collection_name: Collection to write to instead of the company's
+                live collection
         """
         try:
-            collection_name = self._get_collection_name(company_id)
-            collection = self.client.get_or_create_collection(collection_name)
-            
-            # Prepare data for ChromaDB
-            ids = [f"doc_{document_id}_chunk_{chunk['chunk_index']}" for chunk in chunks]
-            documents = [chunk['text'] for chunk in chunks]
-            metadatas = [
-                {
-                    "document_id": str(document_id),
-                    "chunk_index": chunk['chunk_index'],
-                    "page_number": str(chunk.get('page_number', 'unknown')),
-                    "char_count": chunk['char_count']
-                }
-                for chunk in chunks
-            ]
+            # Prepare data for the vector store
+            ids, documents, metadatas = self._build_records(document_id, chunks)
+            embeddings = self._as_matrix(embeddings)
+            
+            def add(collection):
+                self._check_embedding_space(collection, embeddings, record=True)
+                collection.add(
+                    ids=ids,
+                    embeddings=embeddings,
+                    documents=documents,
+                    metadatas=metadatas
+                )
             
             # Add to collection
-            collection.add(
-                ids=ids,
-                embeddings=embeddings,
-                documents=documents,
-                metadatas=metadatas
-            )
+            with self._writing(company_id, collection_name):
+                self._with_collection(company_id, add, create=True, collection_name=collection_name)
             
             logger.info(f"Added {len(chunks)} chunks for document {document_id} to company {company_id}")
-            
+        
         except Exception as e:
             logger.error(f"Error adding documents: {str(e)}")
             raise
     
+    def upsert_documents(
+        self,
+        company_id: int,
+        document_id: int,
+        chunks: List[Dict],
+        embeddings: np.ndarray
+    ):
+        """
+        Insert or overwrite document chunks by chunk ID.
+        
+        Args:
+            company_id: Company identifier
+            document_id: Document identifier
+            chunks: List of chunk dictionaries with text and metadata
+            embeddings: float32 matrix (or list of vectors) with one row per chunk
+        """
+        if not chunks:
+            return
+        
+        try:
+            ids, documents, metadatas = self._build_records(document_id, chunks)
+            embeddings = self._as_matrix(embeddings)
+            
+            def upsert(collection):
+                self._check_embedding_space(collection, embeddings, record=True)
+                collection.upsert(
+                    ids=ids,
+                    embeddings=embeddings,
+                    documents=documents,
+                    metadatas=metadatas
+                )
+            
+            with self._writing(company_id):
+                self._with_collection(company_id, upsert, create=True)
+            
+            logger.info(f"Upserted {len(chunks)} chunks for document {document_id} in company {company_id}")
+        
+        except Exception as e:
+            logger.error(f"Error upserting documents: {str(e)}")
+            raise
+    
+    def get_document_chunks(
+        self,
+        company_id: int,
+        document_id: int,
+        include_embeddings: bool = False
+    ) -> Dict[str, Dict]:
+        """
+        Get the stored chunks of a document.
+        
+        Args:
+            company_id: Company identifier
+            document_id: Document identifier
+            include_embeddings: Also return each chunk's embedding vector
+            
+        Returns:
+            Dictionary mapping chunk ID to a dict with metadata (and embedding)
+        """
+        try:
+            include = ["metadatas", "embeddings"] if include_embeddings else ["metadatas"]
+            results = self._with_collection(
+                company_id,
+                lambda collection: collection.get(where={"document_id": str(document_id)}, include=include),
+                create=True
+            )
+            
+            embeddings = self._as_matrix(results['embeddings']) if include_embeddings else None
+            chunks = {}
+            for i, chunk_id in enumerate(results['ids']):
+                chunks[chunk_id] = {"metadata": results['metadatas'][i]}
+                if include_embeddings:
+                    chunks[chunk_id]["embedding"] = embeddings[i]
+            return chunks
+        
+        except Exception as e:
+            logger.error(f"Error getting document chunks: {str(e)}")
+            raise
+    
+    def get_embeddings(self, company_id: int, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Get stored embedding vectors (float32 arrays) by chunk ID."""
+        if not ids:
+            return {}
+        
+        try:
+            results = self._with_collection(
+                company_id,
+                lambda collection: collection.get(ids=ids, include=["embeddings"])
+            )
+            return dict(zip(results['ids'], self._as_matrix(results['embeddings'])))
+        except Exception as e:
+            logger.error(f"Error getting embeddings: {str(e)}")
+            raise
+    
+    def delete_chunks(self, company_id: int, ids: List[str]):
+        """Delete chunks by chunk ID."""
+        if not ids:
+            return
+        
+        try:
+            with self._writing(company_id):
+                self._with_collection(company_id, lambda collection: collection.delete(ids=ids))
+            logger.info(f"Deleted {len(ids)} chunks from company {company_id}")
+        except Exception as e:
+            logger.error(f"Error deleting chunks: {str(e)}")
+            raise
+    
     def search(
         self,
         company_id: int,
-        query_embedding: List[float],
+        query_embedding: np.ndarray,
         top_k: int = None
     ) -> List[Dict]:
         """
@@ -98,73 +593,129 @@ class VectorStoreService:
         
         Args:
             company_id: Company identifier
-            query_embedding: Query embedding vector
+            query_embedding: Query embedding vector (1-D float32 array)
             top_k: Number of results to return
             
         Returns:
             List of search results with text, metadata, and scores
         """
-        try:
-            collection_name = self._get_collection_name(company_id)
-            collection = self.client.get_collection(collection_name)
+        return self.search_many(company_id, self._as_matrix([query_embedding]), top_k)[0]
+    
+    def search_many(
+        self,
+        company_id: int,
+        query_embeddings: np.ndarray,
+        top_k: int = None
+    ) -> List[List[Dict]]:
+        """
+        Search for the documents similar to each of several queries.
+        
+        All queries go to the vector store in one batched query, which
+        scores them together instead of paying a round trip per query.
+        
+        Args:
+            company_id: Company identifier
+            query_embeddings: float32 matrix with one query vector per row
+            top_k: Number of results to return per query
             
+        Returns:
+            One list of search results (text, metadata, and scores) per query,
+            in query order
+        """
+        if len(query_embeddings) == 0:
+            return []
+        
+        try:
             k = top_k or settings.TOP_K_RETRIEVAL
+            query_embeddings = self._as_matrix(query_embeddings)
             
-            results = collection.query(
-                query_embeddings=[query_embedding],
-                n_results=k,
-                include=["documents", "metadatas", "distances"]
-            )
+            def query(collection):
+                self._check_embedding_space(collection, query_embeddings)
+                return collection.query(
+                    query_embeddings=query_embeddings,
+                    n_results=k,
+                    include=["documents", "metadatas", "distances"]
+                )
+            
+            results = self._with_collection(company_id, query)
             
             # Format results
-            search_results = []
-            if results and results['ids'] and len(results['ids']) > 0:
-                for i in range(len(results['ids'][0])):
-                    search_results.append({
-                        "text": results['documents'][0][i],
-                        "metadata": results['metadatas'][0][i],
-                        "score": 1 - results['distances'][0][i],  # Convert distance to similarity
-                        "document_id": int(results['metadatas'][0][i]['document_id']),
-                        "page_number": results['metadatas'][0][i].get('page_number', 'unknown')
+            search_results = [[] for _ in range(len(query_embeddings))]
+            for query_index, ids in enumerate(results['ids'] if results else []):
+                for i in range(len(ids)):
+                    metadata = results['metadatas'][query_index][i]
+                    search_results[query_index].append({
+                        "text": results['documents'][query_index][i],
+                        "metadata": metadata,
+                        "score": 1 - results['distances'][query_index][i],  # Convert distance to similarity
+                        "document_id": int(metadata['document_id']),
+                        "page_number": metadata.get('page_number', 'unknown')
                     })
             
-            logger.info(f"Retrieved {len(search_results)} results for company {company_id}")
+            logger.info(
+                f"Retrieved {sum(len(query_results) for query_results in search_results)} results "
+                f"for {len(search_results)} queries of company {company_id}"
+            )
             return search_results
-            
+        
         except Exception as e:
             logger.error(f"Error searching documents: {str(e)}")
             raise
     
-    def delete_document(self, company_id: int, document_id: int):
+    def delete_document(self, company_id: int, document_id: int, collection_name: Optional[str] = None):
         """
         Delete all chunks of a document.
         
         Args:
             company_id: Company identifier
             document_id: Document identifier
+            collection_name: Collection to delete from instead of the
+                company's live collection
         """
         try:
-            collection_name = self._get_collection_name(company_id)
-            collection = self.client.get_collection(collection_name)
-            
-            # Query all chunks for this document
-            results = collection.get(
-                where={"document_id": str(document_id)}
-            )
+            def delete(collection):
+                # Query all chunks for this document
+                results = collection.get(
+                    where={"document_id": str(document_id)}
+                )
+                if results and results['ids']:
+                    collection.delete(ids=results['ids'])
+                return results
             
+            with self._writing(company_id, collection_name):
+                results = self._with_collection(company_id, delete, collection_name=collection_name)
             if results and results['ids']:
-                collection.delete(ids=results['ids'])
                 logger.info(f"Deleted document {document_id} from company {company_id}")
-                
+        
         except Exception as e:
             logger.error(f"Error deleting document: {str(e)}")
             raise
     
+    def sample_texts(self, limit: int) -> List[str]:
+        """
+        Get up to ``limit`` stored chunk texts, spread over all companies' live collections.
+        
+        Args:
+            limit: Most texts to return
+            
+        Returns:
+            Chunk texts
+        """
+        names = self.backend.list_collection_names()
+        company_ids = sorted({int(match.group(1)) for match in map(_COMPANY_COLLECTION.match, names) if match})
+        company_ids = [company_id for company_id in company_ids if self._get_collection_name(company_id) in names]
+        texts = []
+        for position, company_id in enumerate(company_ids):
+            # Share what is left between the remaining collections
+            share = (limit - len(texts)) // (len(company_ids) - position)
+            if share > 0:
+                results = self._with_collection(company_id, lambda collection: collection.get(limit=share, include=["documents"]))
+                texts.extend(results["documents"])
+        return texts
+    
     def get_collection_count(self, company_id: int) -> int:
         """Get number of documents in company collection."""
         try:
-            collection_name = self._get_collection_name(company_id)
-            collection = self.client.get_collection(collection_name)
-            return collection.count()
+            return self._with_collection(company_id, lambda collection: collection.count())
         except:
             return 0
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Reduced-dimension embeddings.
+
+Two ways to shorten the model's vectors to EMBEDDING_DIMENSION:
+
+- ``truncate`` keeps the leading components. Only models trained with a
+  Matryoshka loss put most of the information there; for other models it
+  loses far more recall than PCA.
+- ``pca`` projects onto the principal components of a sample of the
+  model's vectors. The sample is not centered: retrieval compares vectors
+  by dot product, which the leading components of the raw vectors
+  preserve best. The projection is fitted once per model (see
+  ``python -m app.cli fit-pca``) and stored with all components, so any
+  smaller dimension can be used without refitting.
+
+Reduced vectors are re-normalized by the embedding service.
+"""
+import os
+import re
+import hashlib
+from typing import Optional
+import numpy as np
+import logging
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+REDUCTION_METHODS = ("truncate", "pca")
+
+
+class PCAProjection:
+    """Principal components of a sample of embedding vectors."""
+    
+    def __init__(self, components: np.ndarray, explained_variance: np.ndarray):
+        """
+        Initialize projection.
+        
+        Args:
+            components: Principal axes by decreasing variance, shape (k, dimension)
+            explained_variance: Mean squared length along each axis, shape (k,)
+        """
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+        self.explained_variance = np.asarray(explained_variance, dtype=np.float64)
+    
+    @classmethod
+    def fit(cls, embeddings: np.ndarray) -> "PCAProjection":
+        """Fit a projection to a (samples, dimension) matrix."""
+        sample = np.asarray(embeddings, dtype=np.float64)
+        _, singular_values, components = np.linalg.svd(sample, full_matrices=False)
+        return cls(components, singular_values ** 2 / len(sample))
+    
+    @classmethod
+    def load(cls, path: str) -> "PCAProjection":
+        """Load a projection saved with ``save``."""
+        with np.load(path) as data:
+            return cls(data["components"], data["explained_variance"])
+    
+    def save(self, path: str):
+        """Write the projection to an .npz file, atomically."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as projection_file:
+            np.savez(
+                projection_file,
+                components=self.components,
+                explained_variance=self.explained_variance
+            )
+        os.replace(temp_path, path)
+    
+    def retained_variance(self, dimension: int) -> float:
+        """Share of the sample's squared length kept by the first ``dimension`` components."""
+        return float(self.explained_variance[:dimension].sum() / self.explained_variance.sum())
+    
+    def digest(self) -> str:
+        """Short hash identifying the fitted projection."""
+        return hashlib.sha256(self.components.tobytes()).hexdigest()[:12]
+
+
+class DimensionReducer:
+    """Map full-width embedding matrices to EMBEDDING_DIMENSION columns."""
+    
+    def __init__(self, dimension: int, projection: Optional[PCAProjection] = None):
+        """
+        Initialize reducer.
+        
+        Args:
+            dimension: Output dimension
+            projection: PCA projection to apply, or None to truncate
+        """
+        self.dimension = dimension
+        self.projection = projection
+        if projection is None:
+            self.name = f"truncate-{dimension}"
+        else:
+            self.name = f"pca-{dimension}-{projection.digest()}"
+            self._weights = np.ascontiguousarray(projection.components[:dimension].T)
+    
+    def reduce(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Reduce a matrix of full-width vectors.
+        
+        Args:
+            embeddings: float32 matrix of shape (n, full dimension)
+            
+        Returns:
+            New contiguous float32 matrix of shape (n, dimension), not normalized
+        """
+        if self.projection is None:
+            return np.ascontiguousarray(embeddings[:, :self.dimension])
+        return embeddings @ self._weights
+
+
+def projection_path(model_name: str) -> str:
+    """Get the file a model's PCA projection is stored in."""
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name.strip("/\\."))
+    return os.path.join(settings.EMBEDDING_PCA_DIR, f"{safe_name}.npz")
+
+
+def create_reducer(model_name: str, full_dimension: int) -> Optional[DimensionReducer]:
+    """
+    Create the reducer configured by EMBEDDING_DIMENSION and EMBEDDING_REDUCTION.
+    
+    Args:
+        model_name: Name of the backend producing the vectors
+        full_dimension: Dimension of the model's vectors
+        
+    Returns:
+        Reducer, or None when EMBEDDING_DIMENSION keeps full-width vectors
+    """
+    dimension = settings.EMBEDDING_DIMENSION
+    if dimension <= 0 or dimension == full_dimension:
+        return None
+    if dimension > full_dimension:
+        raise ValueError(f"EMBEDDING_DIMENSION {dimension} exceeds the model's {full_dimension} dimensions")
+    
+    method = settings.EMBEDDING_REDUCTION
+    if method == "truncate":
+        logger.info(f"Truncating embeddings to {dimension} dimensions")
+        return DimensionReducer(dimension)
+    if method != "pca":
+        raise ValueError(f"Unknown EMBEDDING_REDUCTION '{method}', expected one of {', '.join(REDUCTION_METHODS)}")
+    
+    path = projection_path(model_name)
+    if not os.path.exists(path):
+        raise ValueError(f"No PCA projection for {model_name} at {path}, fit one with: python -m app.cli fit-pca")
+    projection = PCAProjection.load(path)
+    if projection.components.shape[1] != full_dimension or len(projection.components) < dimension:
+        raise ValueError(f"PCA projection at {path} does not match the model, fit it again")
+    
+    logger.info(
+        f"Projecting embeddings to {dimension} dimensions with PCA, "
+        f"{projection.retained_variance(dimension):.1%} of variance retained"
+    )
+    return DimensionReducer(dimension, projection)
@@ -0,0 +1,261 @@
+"""
+Embedding model backends.
+
+``TorchBackend`` runs the model with sentence-transformers and PyTorch.
+``OnnxBackend`` exports the same model (transformer, pooling and
+normalization) to ONNX once, caches it on disk and runs it with ONNX
+Runtime, optionally with dynamically int8-quantized weights, which is
+considerably faster on CPU-only nodes.
+
+Select one with the EMBEDDING_BACKEND setting.
+"""
+import os
+import re
+import json
+import inspect
+from typing import List
+import numpy as np
+import logging
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ("torch", "onnx")
+
+# Bump when the export below changes, so cached exports are rebuilt
+ONNX_EXPORT_VERSION = 1
+ONNX_OPSET = 14
+
+
+class EmbeddingBackend:
+    """Interface of an embedding model backend."""
+    
+    # Identifies the vectors a backend produces, for caches and reindexing
+    name = ""
+    tokenizer = None
+    max_seq_length = 0
+    
+    def encode(self, texts: List[str], batch_size: int, show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Embed texts.
+        
+        Args:
+            texts: Input texts
+            batch_size: Texts per forward pass
+            show_progress_bar: Show a progress bar, where supported
+            
+        Returns:
+            Array of shape (len(texts), dimension)
+        """
+        raise NotImplementedError
+    
+    def get_dimension(self) -> int:
+        """Get the dimension of the embedding vectors."""
+        raise NotImplementedError
+
+
+class TorchBackend(EmbeddingBackend):
+    """Run the model with sentence-transformers on PyTorch."""
+    
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        
+        self.name = model_name
+        self.model = SentenceTransformer(model_name)
+    
+    @property
+    def tokenizer(self):
+        return self.model.tokenizer
+    
+    @property
+    def max_seq_length(self) -> int:
+        return self.model.max_seq_length
+    
+    def encode(self, texts: List[str], batch_size: int, show_progress_bar: bool = False) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_tensor=False,
+            show_progress_bar=show_progress_bar
+        )
+    
+    def get_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    Run an ONNX export of the model with ONNX Runtime.
+    
+    The export lives in EMBEDDING_ONNX_DIR, one directory per model, and is
+    only created (which needs PyTorch) when missing. Loading an existing
+    export needs onnxruntime and transformers only.
+    """
+    
+    def __init__(self, model_name: str, quantize: bool = None, export_dir: str = None):
+        """
+        Initialize ONNX backend.
+        
+        Args:
+            model_name: sentence-transformers model name or path
+            quantize: Use int8 dynamically quantized weights (defaults to EMBEDDING_ONNX_QUANTIZE)
+            export_dir: Root of the export cache (defaults to EMBEDDING_ONNX_DIR)
+        """
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("EMBEDDING_BACKEND=onnx requires the onnxruntime package")
+        from transformers import AutoTokenizer
+        
+        self.quantize = settings.EMBEDDING_ONNX_QUANTIZE if quantize is None else quantize
+        self.name = f"{model_name}@onnx-int8" if self.quantize else model_name
+        self.directory = os.path.join(
+            export_dir or settings.EMBEDDING_ONNX_DIR,
+            re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name.strip("/\\."))
+        )
+        
+        if not self._export_is_current(model_name):
+            self._export(model_name)
+        if self.quantize and not os.path.exists(self._path("model.int8.onnx")):
+            self._quantize()
+        
+        with open(self._path("export.json")) as info_file:
+            info = json.load(info_file)
+        self.max_seq_length = info["max_seq_length"]
+        self.dimension = info["dimension"]
+        self.tokenizer = AutoTokenizer.from_pretrained(self.directory)
+        
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if settings.EMBEDDING_ONNX_THREADS > 0:
+            options.intra_op_num_threads = settings.EMBEDDING_ONNX_THREADS
+        model_file = "model.int8.onnx" if self.quantize else "model.onnx"
+        self.session = onnxruntime.InferenceSession(
+            self._path(model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        logger.info(f"Loaded ONNX embedding model from {self._path(model_file)}")
+    
+    def encode(self, texts: List[str], batch_size: int, show_progress_bar: bool = False) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        # Batch texts of similar length together to limit padding, as sentence-transformers does
+        order = sorted(range(len(texts)), key=lambda index: -len(texts[index]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            encoded = self.tokenizer(
+                [texts[index] for index in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feed = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            embeddings[batch] = self.session.run(None, feed)[0]
+        return embeddings
+    
+    def get_dimension(self) -> int:
+        return self.dimension
+    
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+    
+    def _export_is_current(self, model_name: str) -> bool:
+        """Check for a complete export of this model made by this exporter."""
+        try:
+            with open(self._path("export.json")) as info_file:
+                info = json.load(info_file)
+        except (FileNotFoundError, ValueError):
+            return False
+        return (
+            info.get("model_name") == model_name
+            and info.get("export_version") == ONNX_EXPORT_VERSION
+            and os.path.exists(self._path("model.onnx"))
+        )
+    
+    def _export(self, model_name: str):
+        """Export the full sentence-transformers pipeline to ONNX."""
+        import torch
+        from sentence_transformers import SentenceTransformer
+        
+        logger.info(f"Exporting {model_name} to ONNX in {self.directory}")
+        os.makedirs(self.directory, exist_ok=True)
+        
+        model = SentenceTransformer(model_name, device="cpu")
+        model.eval()
+        input_names = list(model.tokenizer.model_input_names)
+        
+        class Pipeline(torch.nn.Module):
+            """Transformer, pooling and normalization as one traceable module."""
+            
+            def __init__(self):
+                super().__init__()
+                self.model = model
+            
+            def forward(self, *inputs):
+                return self.model(dict(zip(input_names, inputs)))["sentence_embedding"]
+        
+        sample = model.tokenizer(["export sample", "a longer export sample text"], padding=True, return_tensors="pt")
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["sentence_embedding"] = {0: "batch"}
+        
+        options = {}
+        if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+            # Newer PyTorch defaults to the dynamo exporter, which needs extra packages
+            options["dynamo"] = False
+        
+        temp_path = self._path("model.onnx.tmp")
+        with torch.no_grad():
+            torch.onnx.export(
+                Pipeline(),
+                tuple(sample[name] for name in input_names),
+                temp_path,
+                input_names=input_names,
+                output_names=["sentence_embedding"],
+                dynamic_axes=dynamic_axes,
+                opset_version=ONNX_OPSET,
+                **options
+            )
+        os.replace(temp_path, self._path("model.onnx"))
+        if os.path.exists(self._path("model.int8.onnx")):
+            os.remove(self._path("model.int8.onnx"))
+        
+        model.tokenizer.save_pretrained(self.directory)
+        info = {
+            "model_name": model_name,
+            "export_version": ONNX_EXPORT_VERSION,
+            "max_seq_length": model.max_seq_length,
+            "dimension": model.get_sentence_embedding_dimension()
+        }
+        with open(self._path("export.json"), "w") as info_file:
+            json.dump(info, info_file)
+    
+    def _quantize(self):
+        """Write an int8 copy of the export with dynamically quantized weights."""
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError:
+            raise ImportError("EMBEDDING_ONNX_QUANTIZE requires the onnx package")
+        
+        logger.info(f"Quantizing {self._path('model.onnx')} to int8")
+        temp_path = self._path("model.int8.onnx.tmp")
+        quantize_dynamic(self._path("model.onnx"), temp_path, weight_type=QuantType.QInt8)
+        os.replace(temp_path, self._path("model.int8.onnx"))
+
+
+def create_backend(model_name: str, backend: str = None) -> EmbeddingBackend:
+    """
+    Create an embedding backend.
+    
+    Args:
+        model_name: sentence-transformers model name or path
+        backend: "torch" or "onnx" (defaults to EMBEDDING_BACKEND)
+        
+    Returns:
+        Embedding backend
+    """
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend == "torch":
+        return TorchBackend(model_name)
+    if backend == "onnx":
+        return OnnxBackend(model_name)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}', expected one of {', '.join(EMBEDDING_BACKENDS)}")
@@ -0,0 +1,186 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+import logging
+from app.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+lookups = metrics.counter(
+    "embedding_cache_lookups_total",
+    "Embedding cache lookups by result (memory_hit, disk_hit or miss)"
+)
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+# Writes between checks of the persistent tier's size
+_PRUNE_INTERVAL = 100
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of embedding vectors.
+    
+    Keys are a hash of the model name, whether vectors are unit-normalized
+    and the normalized text, so vectors produced with different models or
+    EMBEDDING_NORMALIZE never mix. Vectors are cached at full width, before
+    any dimension reduction, so the reduction settings are not part of the
+    key. The first tier is a bounded in-process LRU of float32 arrays; the
+    second is a SQLite file that survives restarts. Vectors found on disk
+    are promoted to memory.
+    """
+    
+    def __init__(
+        self,
+        model_name: str,
+        memory_entries: int = None,
+        db_path: str = None,
+        normalize: bool = None
+    ):
+        """
+        Initialize embedding cache.
+        
+        Args:
+            model_name: Embedding model the vectors belong to
+            memory_entries: LRU size (defaults to EMBEDDING_CACHE_MEMORY_ENTRIES)
+            db_path: SQLite file (defaults to EMBEDDING_CACHE_DB, empty disables disk)
+            normalize: Whether cached vectors are unit-normalized (defaults to EMBEDDING_NORMALIZE)
+        """
+        self.model_name = model_name
+        self.normalize = settings.EMBEDDING_NORMALIZE if normalize is None else normalize
+        self.memory_entries = settings.EMBEDDING_CACHE_MEMORY_ENTRIES if memory_entries is None else memory_entries
+        self.db_path = settings.EMBEDDING_CACHE_DB if db_path is None else db_path
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writes = 0
+        
+        if self.db_path:
+            self._open_db()
+        
+        metrics.gauge(
+            "embedding_cache_memory_entries",
+            "Vectors held in the in-process embedding cache",
+            lambda: len(self._memory)
+        )
+    
+    def _open_db(self):
+        """Open the persistent tier."""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)")
+        self._db.commit()
+    
+    def key(self, text: str) -> bytes:
+        """Cache key of a text for this cache's model and normalization."""
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        variant = "normalized" if self.normalize else "raw"
+        return hashlib.sha256(f"{self.model_name}\0{variant}\0{normalized}".encode("utf-8")).digest()
+    
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up vectors for texts.
+        
+        Returns:
+            One float32 array per text, or None where the text is not cached
+        """
+        keys = [self.key(text) for text in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        
+        with self._memory_lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+        in_memory = set(found)
+        
+        missing = list({key for key in keys if key not in found})
+        if missing and self._db is not None:
+            from_disk = self._read_disk(missing)
+            if from_disk:
+                self._remember(from_disk)
+                found.update(from_disk)
+        
+        results = [found.get(key) for key in keys]
+        memory_hits = sum(1 for key in keys if key in in_memory)
+        misses = sum(1 for vector in results if vector is None)
+        lookups.inc(memory_hits, result="memory_hit")
+        lookups.inc(len(keys) - memory_hits - misses, result="disk_hit")
+        lookups.inc(misses, result="miss")
+        return results
+    
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """Store vectors (rows of a matrix or a list of arrays) for texts in both tiers."""
+        items = {}
+        for text, vector in zip(texts, vectors):
+            # Copy, so the cache holds no view into a caller's batch matrix
+            vector = np.array(vector, dtype=np.float32)
+            vector.setflags(write=False)
+            items[self.key(text)] = vector
+        self._remember(items)
+        
+        if self._db is not None:
+            try:
+                self._write_disk(items)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not persist embeddings: {str(e)}")
+    
+    def _remember(self, items: Dict[bytes, np.ndarray]):
+        """Add vectors to the LRU, evicting the least recently used ones."""
+        if self.memory_entries <= 0:
+            return
+        
+        with self._memory_lock:
+            for key, vector in items.items():
+                self._memory[key] = vector
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+    
+    def _read_disk(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Read vectors from the persistent tier."""
+        found = {}
+        with self._db_lock:
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, vector in rows:
+                    found[bytes(key)] = np.frombuffer(vector, dtype=np.float32)
+        return found
+    
+    def _write_disk(self, items: Dict[bytes, np.ndarray]):
+        """Write vectors to the persistent tier, pruning the oldest beyond its bound."""
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in items.items()]
+            )
+            
+            self._writes += 1
+            max_entries = settings.EMBEDDING_CACHE_DISK_MAX_ENTRIES
+            if max_entries > 0 and self._writes % _PRUNE_INTERVAL == 1:
+                (count,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+                if count > max_entries:
+                    # Rowids grow with every write, so the lowest are the oldest
+                    self._db.execute(
+                        "DELETE FROM embeddings WHERE rowid IN "
+                        "(SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+                        (count - max_entries,)
+                    )
+            self._db.commit()
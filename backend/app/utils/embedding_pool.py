@@ -0,0 +1,171 @@
+"""
+Multi-process embedding pool for ingestion.
+
+One model in one process does not use a many-core node well: intra-op
+threading stops scaling after a few threads. The pool runs several worker
+processes, each holding its own copy of the model limited to a few
+threads, and hands them the batches of a large embedding call. Workers
+write vectors straight into a shared-memory matrix owned by the caller, so
+only texts are pickled, never vectors.
+"""
+import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Tuple
+import numpy as np
+from threadpoolctl import threadpool_limits
+import logging
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# The model of a worker process, loaded by its initializer
+_worker_backend = None
+
+
+def _init_worker(model_name: str, backend: str, threads: int):
+    """Limit the worker's threads and load its model."""
+    global _worker_backend
+    
+    # Read by the libraries loaded below (torch's OpenMP) when they start
+    # their thread pools. numpy came in with this module, so its BLAS pool
+    # already exists and is limited directly.
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    threadpool_limits(limits=threads)
+    settings.EMBEDDING_ONNX_THREADS = threads
+    
+    from app.utils.embedding_backends import create_backend
+    
+    if backend == "torch":
+        import torch
+        torch.set_num_threads(threads)
+    _worker_backend = create_backend(model_name, backend)
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to the caller's shared-memory block without tracking it.
+    
+    Before Python 3.13 every attach registers the block with the resource
+    tracker, as if this process owned it, so the tracker warns about a leak
+    or unlinks it a second time. Unregistering afterwards is no better:
+    spawned workers share the caller's tracker, which would then forget the
+    caller's own registration. The caller creates and unlinks the block.
+    """
+    register = resource_tracker.register
+    
+    def register_others(resource: str, rtype: str):
+        if rtype != "shared_memory":
+            register(resource, rtype)
+    
+    resource_tracker.register = register_others
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _encode_into(buffer_name: str, shape: Tuple[int, int], indices: List[int], texts: List[str]) -> int:
+    """Embed one batch in a worker, writing its rows of the shared matrix."""
+    buffer = _attach_shared_memory(buffer_name)
+    try:
+        embeddings = np.ndarray(shape, dtype=np.float32, buffer=buffer.buf)
+        embeddings[indices] = _worker_backend.encode(texts, len(texts))
+        # Views must be gone before the buffer can be closed
+        del embeddings
+    finally:
+        buffer.close()
+    return len(texts)
+
+
+def _ping() -> bool:
+    """Trivial task, completes once a worker has loaded its model."""
+    return _worker_backend is not None
+
+
+class EmbeddingPool:
+    """Embed batches on a pool of worker processes, each with its own model."""
+    
+    def __init__(self, model_name: str, backend: str, workers: int, threads_per_worker: int):
+        """
+        Initialize embedding pool. Processes start on first use.
+        
+        Args:
+            model_name: sentence-transformers model name or path
+            backend: Embedding backend the workers run ("torch" or "onnx")
+            workers: Number of worker processes
+            threads_per_worker: Intra-op threads per worker
+        """
+        self.model_name = model_name
+        self.backend = backend
+        self.workers = max(1, workers)
+        self.threads_per_worker = max(1, threads_per_worker)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Lazily create the worker processes."""
+        with self._executor_lock:
+            if self._executor is None:
+                # Spawn rather than fork: the caller runs threaded ingestion workers
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, self.backend, self.threads_per_worker)
+                )
+                logger.info(
+                    f"Started embedding pool with {self.workers} processes "
+                    f"of {self.threads_per_worker} threads"
+                )
+            return self._executor
+    
+    def warm_up(self):
+        """Start the worker processes and wait until they have loaded the model."""
+        executor = self._get_executor()
+        for future in [executor.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+    
+    def encode(self, texts: List[str], batches: List[List[int]], dimension: int) -> np.ndarray:
+        """
+        Embed texts, one task per batch, spread over the workers.
+        
+        Args:
+            texts: Input texts
+            batches: Indices into texts forming one forward pass each,
+                covering every text once
+            dimension: Dimension of the embedding vectors
+            
+        Returns:
+            Array of shape (len(texts), dimension) in input order
+        """
+        shape = (len(texts), dimension)
+        buffer = shared_memory.SharedMemory(create=True, size=max(1, len(texts) * dimension * 4))
+        try:
+            executor = self._get_executor()
+            futures = [
+                executor.submit(_encode_into, buffer.name, shape, batch, [texts[index] for index in batch])
+                for batch in batches
+            ]
+            # Wait for every task, a failed one must not free the buffer under the others
+            wait(futures)
+            for future in futures:
+                future.result()
+            
+            shared = np.ndarray(shape, dtype=np.float32, buffer=buffer.buf)
+            embeddings = shared.copy()
+            del shared
+            return embeddings
+        finally:
+            buffer.close()
+            buffer.unlink()
+    
+    def close(self):
+        """Stop the worker processes."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
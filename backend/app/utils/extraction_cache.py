@@ -0,0 +1,188 @@
+import os
+import gzip
+import json
+import tempfile
+import threading
+from typing import Dict, Iterable, Iterator, Optional
+import logging
+from app.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+lookups = metrics.counter(
+    "extraction_cache_lookups_total",
+    "Extraction cache lookups by result (hit or miss)"
+)
+
+
+class ExtractionCache:
+    """
+    On-disk cache of extracted PDF text.
+    
+    Entries are keyed by the file's content hash and the parser version, so
+    re-chunking or re-indexing a document does not have to parse the PDF
+    again, while a parser upgrade never serves stale text. Each entry is a
+    gzip-compressed JSON-lines file: a header with the page count and
+    metadata, then one line per page.
+    
+    The directory is kept under EXTRACTION_CACHE_MAX_BYTES by evicting the
+    least recently used entries; reads refresh an entry's modification time.
+    """
+    
+    def __init__(self, parser_version: str, cache_dir: str = None, max_bytes: int = None):
+        """
+        Initialize extraction cache.
+        
+        Args:
+            parser_version: Version of the extraction that produced the entries
+            cache_dir: Cache directory (defaults to EXTRACTION_CACHE_DIR)
+            max_bytes: Size bound in bytes (defaults to EXTRACTION_CACHE_MAX_BYTES)
+        """
+        self.parser_version = parser_version
+        self.cache_dir = cache_dir or settings.EXTRACTION_CACHE_DIR
+        self.max_bytes = settings.EXTRACTION_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.enabled = settings.EXTRACTION_CACHE_ENABLED and self.max_bytes > 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+    
+    def load(self, content_hash: str) -> Optional[Dict]:
+        """
+        Get the cached extraction of a file.
+        
+        Args:
+            content_hash: SHA-256 hex digest of the file contents
+            
+        Returns:
+            Dictionary with page_count, metadata and pages, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        
+        path = self._path(content_hash)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as entry:
+                header = json.loads(entry.readline())
+                pages = [json.loads(line) for line in entry]
+            os.utime(path)
+        except FileNotFoundError:
+            self._count(hit=False)
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable extraction cache entry {path}: {str(e)}")
+            self._remove(path)
+            self._count(hit=False)
+            return None
+        
+        self._count(hit=True)
+        return {
+            "page_count": header["page_count"],
+            "metadata": header.get("metadata") or {},
+            "pages": pages
+        }
+    
+    def record(
+        self,
+        content_hash: str,
+        page_count: int,
+        metadata: Dict,
+        pages: Iterable[Dict]
+    ) -> Iterator[Dict]:
+        """
+        Pass pages through while writing them to the cache.
+        
+        The entry is only published once every page has been consumed, so
+        an interrupted extraction never leaves a partial entry behind.
+        
+        Args:
+            content_hash: SHA-256 hex digest of the file contents
+            page_count: Number of pages in the file
+            metadata: Document metadata
+            pages: Page dictionaries as produced by the parser
+            
+        Yields:
+            The same page dictionaries
+        """
+        if not self.enabled:
+            yield from pages
+            return
+        
+        fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".part", dir=self.cache_dir)
+        os.close(fd)
+        committed = False
+        try:
+            with gzip.open(temp_path, "wt", encoding="utf-8", compresslevel=settings.EXTRACTION_CACHE_COMPRESSION) as entry:
+                # Metadata may hold PDF objects; store their string form
+                entry.write(json.dumps({"page_count": page_count, "metadata": metadata}, default=str) + "\n")
+                for page in pages:
+                    entry.write(json.dumps(page) + "\n")
+                    yield page
+            
+            os.replace(temp_path, self._path(content_hash))
+            committed = True
+            self._evict()
+        finally:
+            if not committed:
+                self._remove(temp_path)
+    
+    def stats(self) -> Dict[str, int]:
+        """Get hit and miss counts and the current cache size."""
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries)
+        }
+    
+    def _path(self, content_hash: str) -> str:
+        """Get the entry path for a content hash under the current parser version."""
+        return os.path.join(self.cache_dir, f"{content_hash}.{self.parser_version}.jsonl.gz")
+    
+    def _count(self, hit: bool):
+        """Update the hit or miss counter."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        lookups.inc(result="hit" if hit else "miss")
+    
+    def _entries(self):
+        """List (path, size, mtime) for every published entry."""
+        entries = []
+        with os.scandir(self.cache_dir) as scan:
+            for item in scan:
+                if item.is_file() and item.name.endswith(".jsonl.gz"):
+                    stat = item.stat()
+                    entries.append((item.path, stat.st_size, stat.st_mtime))
+        return entries
+    
+    def _evict(self):
+        """Delete least recently used entries until the cache fits its bound."""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            
+            evicted = 0
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                evicted += 1
+            
+            if evicted:
+                logger.info(f"Evicted {evicted} extraction cache entries")
+    
+    @staticmethod
+    def _remove(path: str):
+        """Delete a file if it still exists."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
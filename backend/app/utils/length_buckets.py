@@ -0,0 +1,56 @@
+from typing import List, Tuple
+
+
+def plan_batches(
+    lengths: List[int],
+    token_budget: int,
+    max_batch_size: int,
+    max_padding: float = 1.0
+) -> List[List[int]]:
+    """
+    Group texts into batches of similar token length.
+    
+    Texts are sorted longest first and cut into consecutive batches. Each
+    batch is padded to its first (longest) member, so a batch may hold as
+    many texts as fit into ``token_budget`` padded tokens: few long texts or
+    many short ones. A batch also ends at the first text whose padding
+    would exceed ``max_padding`` of its padded length, i.e. one shorter
+    than ``(1 - max_padding)`` times the batch's longest text. The default
+    of 1.0 never ends a batch early; the embedding service passes
+    EMBEDDING_BUCKET_MAX_PADDING (0.2 unless configured).
+    
+    Args:
+        lengths: Token length of every text
+        token_budget: Most padded tokens per batch
+        max_batch_size: Most texts per batch
+        max_padding: Largest share of a text's padded length that may be padding
+        
+    Returns:
+        Batches as lists of indexes into ``lengths``
+    """
+    order = sorted(range(len(lengths)), key=lambda index: -lengths[index])
+    batches = []
+    start = 0
+    while start < len(order):
+        longest = max(1, lengths[order[start]])
+        size = max(1, min(max_batch_size, token_budget // longest))
+        shortest = longest * (1 - max_padding)
+        
+        end = start + 1
+        while end < len(order) and end - start < size and lengths[order[end]] >= shortest:
+            end += 1
+        batches.append(order[start:end])
+        start = end
+    return batches
+
+
+def padding_totals(lengths: List[int], batches: List[List[int]]) -> Tuple[int, int]:
+    """
+    Count the tokens a batch plan feeds the model.
+    
+    Returns:
+        Tuple of (content tokens, padded tokens); their difference is padding
+    """
+    content = sum(lengths)
+    padded = sum(max(lengths[index] for index in batch) * len(batch) for batch in batches if batch)
+    return content, padded
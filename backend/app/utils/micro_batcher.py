@@ -0,0 +1,120 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+import logging
+from app.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-item async calls into batched calls.
+    
+    Callers ``await submit(item)``. The first queued item opens a batch that
+    collects further items for up to ``max_wait`` seconds or until
+    ``max_batch_size`` items are queued; the batch function then runs once
+    on a dedicated executor thread and every caller gets its own result.
+    Items arriving while a batch runs are collected for the next one.
+    """
+    
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int,
+        max_wait: float,
+        name: str,
+        batch_size_histogram: Optional[Histogram] = None,
+        queue_wait_histogram: Optional[Histogram] = None,
+        executor: Optional[Executor] = None
+    ):
+        """
+        Initialize micro-batcher.
+        
+        Args:
+            process_batch: Blocking function mapping a list of items to a
+                list of results in the same order
+            max_batch_size: Most items per batch
+            max_wait: Seconds a batch waits for more items after the first
+            name: Name of the executor thread
+            batch_size_histogram: Records the size of each batch
+            queue_wait_histogram: Records each item's wait before its batch runs
+            executor: Where batches run (defaults to a private single thread)
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.name = name
+        self.batch_size_histogram = batch_size_histogram
+        self.queue_wait_histogram = queue_wait_histogram
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            # Queues and tasks belong to one event loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(self._queue))
+        
+        future = loop.create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+    
+    def close(self):
+        """Stop the collector task and the executor thread, if private."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        if self._owns_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    async def _run(self, queue: asyncio.Queue):
+        """Collect batches from the queue and run them one at a time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            
+            while len(batch) < self.max_batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            await self._process(loop, batch)
+    
+    async def _process(self, loop: asyncio.AbstractEventLoop, batch: List[tuple]):
+        """Run one batch on the executor and resolve its callers' futures."""
+        started = time.perf_counter()
+        if self.batch_size_histogram:
+            self.batch_size_histogram.observe(len(batch))
+        if self.queue_wait_histogram:
+            for _, _, queued_at in batch:
+                self.queue_wait_histogram.observe(started - queued_at)
+        
+        try:
+            results = await loop.run_in_executor(self._executor, self.process_batch, [item for item, _, _ in batch])
+        except Exception as e:
+            logger.error(f"{self.name} batch of {len(batch)} failed: {str(e)}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future, _), result in zip(batch, results):
+            # The caller may have been cancelled while the batch ran
+            if not future.done():
+                future.set_result(result)
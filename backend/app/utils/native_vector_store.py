@@ -0,0 +1,718 @@
+"""
+Native vector store backend.
+
+Each collection is a directory under VECTOR_STORE_NATIVE_DIR:
+
+- ``vectors.f32``: one contiguous float32 matrix, appended row by row and
+  read through a memory map
+- ``records.jsonl``: the id, text and metadata of each row
+- ``deleted.i64``: numbers of the rows deleted or overwritten
+- ``collection.json``: collection metadata and the vector dimension
+- ``writer.lock``: locked by the process writing the collection
+
+Writes only append. An upsert appends a new row and tombstones the old
+one. A delete only tombstones. Readers detect appended rows and
+tombstones from file sizes, so another process's writes show up without
+reopening the collection.
+
+Each collection has a single writer process. Its first write takes an
+exclusive ``flock`` on ``writer.lock``, held until the backend releases
+the collection or the process exits. A write from any other process then
+fails at once with ``CollectionLockedError``. In practice the API server
+writes the live collections and a reindex its shadow collection, which it
+releases before swapping it in. Run a single API server process with this
+backend.
+
+Search is exact: a matrix product over the mapped rows with partial top-k
+selection, in blocks so memory stays bounded. With
+VECTOR_STORE_NATIVE_INDEX=ivf, collections of at least
+VECTOR_STORE_IVF_MIN_ROWS rows use an inverted file index instead. Rows
+are clustered around k-means centroids, and a query scans only the
+VECTOR_STORE_IVF_PROBES nearest clusters plus the rows added since the
+index was built.
+
+Distances are squared L2, ChromaDB's default space, so scores are the
+same with either backend.
+"""
+import os
+import re
+import json
+import time
+import fcntl
+import shutil
+import threading
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import logging
+from app.config import settings
+from app.utils.vector_backends import CollectionNotFoundError, VectorBackend
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf")
+
+_INFO_FILE = "collection.json"
+_VECTORS_FILE = "vectors.f32"
+_RECORDS_FILE = "records.jsonl"
+_DELETED_FILE = "deleted.i64"
+_IVF_FILE = "ivf.npz"
+_WRITER_LOCK_FILE = "writer.lock"
+
+# Rows scored per matrix product, bounds the (queries x rows) distance matrix
+_BLOCK_ROWS = 65536
+_KMEANS_ITERATIONS = 10
+# k-means trains on at most this many sampled rows per cluster
+_KMEANS_SAMPLE_PER_LIST = 64
+
+_COLLECTION_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{1,61}[A-Za-z0-9]$")
+
+
+class CollectionLockedError(Exception):
+    """A collection cannot be written while another process holds its writer lock."""
+
+
+def _write_json(path: str, data: Dict):
+    """Write a JSON file atomically."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as json_file:
+        json.dump(data, json_file)
+    os.replace(temp_path, path)
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def _squared_norms(vectors: np.ndarray) -> np.ndarray:
+    return np.einsum("ij,ij->i", vectors, vectors)
+
+
+def _squared_distances(queries: np.ndarray, query_norms: np.ndarray, rows: np.ndarray, row_norms: np.ndarray) -> np.ndarray:
+    """Squared L2 distances between queries and rows, shape (queries, rows)."""
+    distances = queries @ rows.T
+    distances *= -2
+    distances += query_norms[:, None]
+    distances += row_norms[None, :]
+    return np.maximum(distances, 0, out=distances)
+
+
+def _smallest(distances: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of the k smallest distances of each row, unordered."""
+    if distances.shape[1] <= k:
+        return np.broadcast_to(np.arange(distances.shape[1]), distances.shape)
+    return np.argpartition(distances, k - 1, axis=1)[:, :k]
+
+
+def _nearest_centroids(vectors: np.ndarray, centroids: np.ndarray, count: int = 1) -> np.ndarray:
+    """Indices of each vector's ``count`` nearest centroids, shape (vectors, count)."""
+    centroid_norms = _squared_norms(centroids)
+    nearest = [np.empty((0, count), dtype=np.int64)]
+    for start in range(0, len(vectors), _BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + _BLOCK_ROWS], dtype=np.float32)
+        # The vector's own norm is the same for every centroid
+        scores = centroid_norms[None, :] - 2 * (block @ centroids.T)
+        nearest.append(_smallest(scores, count))
+    return np.concatenate(nearest)
+
+
+class IVFIndex:
+    """Inverted file index: the rows of a collection grouped by nearest k-means centroid."""
+    
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray, rows: int):
+        """
+        Initialize index.
+        
+        Args:
+            centroids: Cluster centroids, shape (lists, dimension)
+            order: Row numbers sorted by cluster
+            offsets: Start of each cluster in order, plus the end, shape (lists + 1,)
+            rows: Number of leading rows covered by the index
+        """
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.order = order
+        self.offsets = offsets
+        self.rows = rows
+    
+    @classmethod
+    def build(cls, vectors: np.ndarray, lists: int) -> "IVFIndex":
+        """Cluster all rows of a (rows, dimension) matrix with k-means."""
+        rows = len(vectors)
+        lists = max(1, min(lists, rows))
+        rng = np.random.default_rng(0)
+        sample_size = min(rows, lists * _KMEANS_SAMPLE_PER_LIST)
+        sample = np.asarray(vectors[np.sort(rng.choice(rows, sample_size, replace=False))], dtype=np.float32)
+        
+        centroids = sample[rng.choice(sample_size, lists, replace=False)].copy()
+        for _ in range(_KMEANS_ITERATIONS):
+            assignments = _nearest_centroids(sample, centroids)[:, 0]
+            counts = np.bincount(assignments, minlength=lists)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            # Empty clusters keep their previous centroid
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+        
+        assignments = _nearest_centroids(vectors, centroids)[:, 0]
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=lists))])
+        return cls(centroids, order, offsets, rows)
+    
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        with np.load(path) as data:
+            return cls(data["centroids"], data["order"], data["offsets"], int(data["rows"]))
+    
+    def save(self, path: str):
+        """Write the index to an .npz file, atomically."""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as index_file:
+            np.savez(index_file, centroids=self.centroids, order=self.order, offsets=self.offsets, rows=self.rows)
+        os.replace(temp_path, path)
+    
+    def candidates(self, query: np.ndarray, probes: int) -> np.ndarray:
+        """Rows in the ``probes`` clusters nearest to a query vector."""
+        lists = _nearest_centroids(query[None, :], self.centroids, min(probes, len(self.centroids)))[0]
+        return np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+
+
+class NativeCollection:
+    """
+    One collection of the native backend.
+    
+    Offers the subset of ChromaDB's ``Collection`` API the vector store
+    uses. Ids, the positions of their records and a document_id index are
+    kept in memory; texts and metadata are read from the records file when
+    returned.
+    """
+    
+    def __init__(self, backend: "NativeBackend", name: str):
+        """
+        Open a collection.
+        
+        Args:
+            backend: Backend the collection belongs to
+            name: Collection name
+        """
+        self._backend = backend
+        self.name = name
+        self.directory = backend.collection_path(name)
+        self._write_lock = backend.write_lock(name)
+        self._lock = threading.Lock()
+        self._ivf_lock = threading.Lock()
+        
+        # A swap in another process puts a different directory at this path
+        self._inode = os.stat(self.directory).st_ino
+        with open(os.path.join(self.directory, _INFO_FILE)) as info_file:
+            info = json.load(info_file)
+        self.metadata = info.get("metadata")
+        self.dimension = info.get("dimension")
+        
+        self._rows = 0
+        self._ids: List[str] = []
+        # Byte offset of each row's record, plus the end of the last one
+        self._offsets: List[int] = [0]
+        # Id -> row holding its current version
+        self._live: Dict[str, int] = {}
+        self._document_rows: Dict[str, List[int]] = {}
+        self._deleted_bytes = 0
+        self._deleted = np.zeros(0, dtype=bool)
+        self._vectors = np.zeros((0, self.dimension or 0), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._records_file = None
+        self._ivf: Optional[IVFIndex] = None
+        self.refresh()
+    
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.directory, file_name)
+    
+    def refresh(self):
+        """Load rows and tombstones appended since the last refresh, by this or another process."""
+        with self._lock:
+            if os.stat(self.directory).st_ino != self._inode:
+                raise CollectionNotFoundError(f"Collection {self.name} was replaced, reopen it")
+            if self.dimension is None:
+                with open(self._path(_INFO_FILE)) as info_file:
+                    self.dimension = json.load(info_file).get("dimension")
+                if self.dimension is None:
+                    return
+            
+            # Tombstones are written after the rows they delete, so sizing
+            # them first never sees a tombstone for a row not loaded below
+            deleted_bytes = _file_size(self._path(_DELETED_FILE)) // 8 * 8
+            rows = _file_size(self._path(_VECTORS_FILE)) // (4 * self.dimension)
+            if rows > self._rows:
+                self._load_rows(rows)
+            if deleted_bytes > self._deleted_bytes:
+                self._load_tombstones(deleted_bytes)
+    
+    def _load_rows(self, rows: int):
+        """Read the records of rows appended to the files and map the grown matrix."""
+        if self._records_file is None:
+            self._records_file = open(self._path(_RECORDS_FILE), "rb", buffering=0)
+        
+        with open(self._path(_RECORDS_FILE), "rb") as records_file:
+            records_file.seek(self._offsets[-1])
+            for row in range(self._rows, rows):
+                line = records_file.readline()
+                record = json.loads(line)
+                self._ids.append(record["id"])
+                self._offsets.append(self._offsets[-1] + len(line))
+                self._live[record["id"]] = row
+                document_id = (record.get("metadata") or {}).get("document_id")
+                if document_id is not None:
+                    self._document_rows.setdefault(document_id, []).append(row)
+        
+        vectors = np.memmap(self._path(_VECTORS_FILE), dtype=np.float32, mode="r", shape=(rows, self.dimension))
+        # New arrays rather than in-place updates, searches may hold the old ones
+        self._norms = np.concatenate([self._norms, _squared_norms(vectors[self._rows:rows])])
+        self._deleted = np.concatenate([self._deleted, np.zeros(rows - self._rows, dtype=bool)])
+        self._vectors = vectors
+        self._rows = rows
+    
+    def _load_tombstones(self, deleted_bytes: int):
+        with open(self._path(_DELETED_FILE), "rb") as deleted_file:
+            deleted_file.seek(self._deleted_bytes)
+            rows = np.frombuffer(deleted_file.read(deleted_bytes - self._deleted_bytes), dtype=np.int64)
+        
+        deleted = self._deleted.copy()
+        deleted[rows] = True
+        for row in rows.tolist():
+            row_id = self._ids[row]
+            if self._live.get(row_id) == row:
+                del self._live[row_id]
+        self._deleted = deleted
+        self._deleted_bytes = deleted_bytes
+    
+    def _read_record(self, row: int) -> Dict:
+        start, end = self._offsets[row], self._offsets[row + 1]
+        return json.loads(os.pread(self._records_file.fileno(), end - start, start))
+    
+    def _claim(self):
+        """Make this process the collection's writer, see ``NativeBackend.claim_writer``."""
+        self._backend.claim_writer(self.name, self.directory, self._inode)
+    
+    def _truncate_partial_writes(self):
+        """
+        Drop the tail of a write interrupted by a crash, before appending.
+        
+        Only called while this process holds the writer lock, so no other
+        process is writing: bytes past the loaded rows are what an
+        interrupted write of this process, or of a writer that died, left.
+        """
+        for file_name, size in (
+            (_RECORDS_FILE, self._offsets[-1]),
+            (_VECTORS_FILE, self._rows * self.dimension * 4),
+            (_DELETED_FILE, self._deleted_bytes)
+        ):
+            path = self._path(file_name)
+            if _file_size(path) > size:
+                logger.warning(f"Truncating partial write to {path}")
+                os.truncate(path, size)
+    
+    def _append(self, ids: List[str], embeddings, documents: Optional[List[str]], metadatas: Optional[List[Dict]], replace: bool):
+        """Append rows; with ``replace`` tombstone the rows they supersede, otherwise skip existing ids."""
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if len(set(ids)) != len(ids):
+            raise ValueError(f"Duplicate ids in write to collection {self.name}")
+        if embeddings.ndim != 2 or len(embeddings) != len(ids):
+            raise ValueError("Expected one embedding per id")
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        
+        with self._write_lock:
+            self._claim()
+            self.refresh()
+            if self.dimension is None:
+                self.dimension = embeddings.shape[1]
+                self._vectors = np.zeros((0, self.dimension), dtype=np.float32)
+                _write_json(self._path(_INFO_FILE), {"metadata": self.metadata, "dimension": self.dimension})
+            elif embeddings.shape[1] != self.dimension:
+                raise ValueError(
+                    f"Embedding dimension {embeddings.shape[1]} does not match "
+                    f"collection {self.name} dimension {self.dimension}"
+                )
+            
+            superseded = [self._live[row_id] for row_id in ids if row_id in self._live]
+            if not replace:
+                keep = [position for position, row_id in enumerate(ids) if row_id not in self._live]
+                if len(keep) < len(ids):
+                    logger.warning(f"Skipping {len(ids) - len(keep)} existing ids in add to collection {self.name}")
+                ids = [ids[position] for position in keep]
+                documents = [documents[position] for position in keep]
+                metadatas = [metadatas[position] for position in keep]
+                embeddings = embeddings[keep]
+                superseded = []
+            if not ids:
+                return
+            
+            self._truncate_partial_writes()
+            records = b"".join(
+                json.dumps({"id": row_id, "document": document, "metadata": metadata}, ensure_ascii=False).encode() + b"\n"
+                for row_id, document, metadata in zip(ids, documents, metadatas)
+            )
+            # Records before vectors: readers count rows by the vectors file
+            with open(self._path(_RECORDS_FILE), "ab") as records_file:
+                records_file.write(records)
+            with open(self._path(_VECTORS_FILE), "ab") as vectors_file:
+                vectors_file.write(embeddings.tobytes())
+            if superseded:
+                with open(self._path(_DELETED_FILE), "ab") as deleted_file:
+                    deleted_file.write(np.asarray(superseded, dtype=np.int64).tobytes())
+            self.refresh()
+    
+    def add(self, ids: List[str], embeddings, documents: List[str] = None, metadatas: List[Dict] = None):
+        """Add rows, skipping ids that already exist (like ChromaDB)."""
+        self._append(ids, embeddings, documents, metadatas, replace=False)
+    
+    def upsert(self, ids: List[str], embeddings, documents: List[str] = None, metadatas: List[Dict] = None):
+        """Add rows, overwriting ids that already exist."""
+        self._append(ids, embeddings, documents, metadatas, replace=True)
+    
+    def _rows_where(self, where: Dict) -> List[int]:
+        """Live rows whose metadata matches a single ``{key: value}`` equality filter."""
+        if len(where) != 1:
+            raise ValueError("Native vector store filters support exactly one metadata key")
+        (key, value), = where.items()
+        if isinstance(value, dict):
+            if list(value) != ["$eq"]:
+                raise ValueError("Native vector store filters only support equality")
+            value = value["$eq"]
+        
+        if key == "document_id":
+            rows = self._document_rows.get(value, [])
+            return [row for row in rows if self._live.get(self._ids[row]) == row]
+        return [
+            row for row in sorted(self._live.values())
+            if (self._read_record(row).get("metadata") or {}).get(key) == value
+        ]
+    
+    def _results(self, rows: Sequence[int], include: Sequence[str], vectors: np.ndarray) -> Dict:
+        """Build a ChromaDB-shaped result for rows."""
+        records = [self._read_record(row) for row in rows] if {"documents", "metadatas"} & set(include) else []
+        return {
+            "ids": [self._ids[row] for row in rows],
+            "embeddings": vectors[np.asarray(rows, dtype=np.int64)] if "embeddings" in include else None,
+            "documents": [record["document"] for record in records] if "documents" in include else None,
+            "metadatas": [record["metadata"] for record in records] if "metadatas" in include else None
+        }
+    
+    def get(
+        self,
+        ids: List[str] = None,
+        where: Dict = None,
+        limit: int = None,
+        include: Sequence[str] = ("metadatas", "documents")
+    ) -> Dict:
+        """Get rows by id, by metadata filter, or all of them."""
+        self.refresh()
+        with self._lock:
+            if ids is not None:
+                rows = [self._live[row_id] for row_id in ids if row_id in self._live]
+            elif where is not None:
+                rows = self._rows_where(where)
+            else:
+                rows = sorted(self._live.values())
+            if limit is not None:
+                rows = rows[:limit]
+            return self._results(rows, include, self._vectors)
+    
+    def delete(self, ids: List[str] = None, where: Dict = None):
+        """Tombstone rows by id or metadata filter."""
+        with self._write_lock:
+            self._claim()
+            self.refresh()
+            with self._lock:
+                if ids is not None:
+                    rows = [self._live[row_id] for row_id in ids if row_id in self._live]
+                else:
+                    rows = self._rows_where(where or {})
+            if not rows:
+                return
+            self._truncate_partial_writes()
+            with open(self._path(_DELETED_FILE), "ab") as deleted_file:
+                deleted_file.write(np.asarray(rows, dtype=np.int64).tobytes())
+            self.refresh()
+    
+    def count(self) -> int:
+        self.refresh()
+        return len(self._live)
+    
+    def modify(self, name: str = None, metadata: Dict = None):
+        """Rename the collection or replace its metadata."""
+        with self._write_lock:
+            if metadata is not None:
+                self._claim()
+                _write_json(self._path(_INFO_FILE), {"metadata": metadata, "dimension": self.dimension})
+                self.metadata = metadata
+            if name is not None and name != self.name:
+                self._backend.rename_collection(self.name, name)
+                self.name = name
+                self.directory = self._backend.collection_path(name)
+    
+    def query(
+        self,
+        query_embeddings,
+        n_results: int = 10,
+        include: Sequence[str] = ("metadatas", "documents", "distances")
+    ) -> Dict:
+        """
+        Find the nearest rows of each query vector.
+        
+        Args:
+            query_embeddings: Matrix of query vectors, one per row
+            n_results: Results per query (fewer if the collection is smaller)
+            include: Fields to return besides ids
+            
+        Returns:
+            ChromaDB-shaped results with one list per query, nearest first
+        """
+        self.refresh()
+        queries = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        with self._lock:
+            vectors, norms, deleted, live = self._vectors, self._norms, self._deleted, len(self._live)
+        if live and queries.shape[1] != self.dimension:
+            raise ValueError(f"Query dimension {queries.shape[1]} does not match collection {self.name} dimension {self.dimension}")
+        
+        k = min(n_results, live)
+        if k == 0:
+            rows, distances = [[] for _ in queries], [[] for _ in queries]
+        else:
+            index = self._get_ivf(vectors, live)
+            if index is None:
+                rows, distances = self._search_exact(queries, k, vectors, norms, deleted)
+            else:
+                rows, distances = self._search_ivf(queries, k, vectors, norms, deleted, index)
+        
+        results = {"ids": [], "embeddings": None, "documents": None, "metadatas": None, "distances": None}
+        per_query = [self._results(query_rows, include, vectors) for query_rows in rows]
+        results["ids"] = [result["ids"] for result in per_query]
+        for field in ("embeddings", "documents", "metadatas"):
+            if field in include:
+                results[field] = [result[field] for result in per_query]
+        if "distances" in include:
+            results["distances"] = distances
+        return results
+    
+    @staticmethod
+    def _search_exact(queries: np.ndarray, k: int, vectors: np.ndarray, norms: np.ndarray, deleted: np.ndarray):
+        """Score every row, block by block, keeping the k nearest per query."""
+        query_norms = _squared_norms(queries)
+        best_distances = np.empty((len(queries), 0), dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(vectors), _BLOCK_ROWS):
+            end = min(start + _BLOCK_ROWS, len(vectors))
+            distances = _squared_distances(queries, query_norms, vectors[start:end], norms[start:end])
+            distances[:, deleted[start:end]] = np.inf
+            nearest = _smallest(distances, k)
+            best_distances = np.concatenate([best_distances, np.take_along_axis(distances, nearest, axis=1)], axis=1)
+            best_rows = np.concatenate([best_rows, nearest + start], axis=1)
+            nearest = _smallest(best_distances, k)
+            best_distances = np.take_along_axis(best_distances, nearest, axis=1)
+            best_rows = np.take_along_axis(best_rows, nearest, axis=1)
+        
+        order = np.argsort(best_distances, axis=1, kind="stable")
+        best_distances = np.take_along_axis(best_distances, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        rows, distances = [], []
+        for query_rows, query_distances in zip(best_rows, best_distances):
+            found = np.isfinite(query_distances)
+            rows.append(query_rows[found].tolist())
+            distances.append(query_distances[found].tolist())
+        return rows, distances
+    
+    @staticmethod
+    def _search_ivf(queries: np.ndarray, k: int, vectors: np.ndarray, norms: np.ndarray, deleted: np.ndarray, index: IVFIndex):
+        """Score the rows in each query's nearest clusters, plus rows added since the index was built."""
+        recent = np.arange(index.rows, len(vectors))
+        rows, distances = [], []
+        for query in queries:
+            candidates = np.sort(np.concatenate([index.candidates(query, settings.VECTOR_STORE_IVF_PROBES), recent]))
+            candidates = candidates[~deleted[candidates]]
+            if len(candidates) < k:
+                # Too few rows near the query, fall back to a full scan
+                query_rows, query_distances = NativeCollection._search_exact(query[None, :], k, vectors, norms, deleted)
+                rows.append(query_rows[0])
+                distances.append(query_distances[0])
+                continue
+            candidate_distances = _squared_distances(query[None, :], _squared_norms(query[None, :]), vectors[candidates], norms[candidates])[0]
+            nearest = _smallest(candidate_distances[None, :], k)[0]
+            nearest = nearest[np.argsort(candidate_distances[nearest], kind="stable")]
+            rows.append(candidates[nearest].tolist())
+            distances.append(candidate_distances[nearest].tolist())
+        return rows, distances
+    
+    def _get_ivf(self, vectors: np.ndarray, live: int) -> Optional[IVFIndex]:
+        """
+        Get the IVF index when VECTOR_STORE_NATIVE_INDEX enables it and the collection is large enough.
+        
+        The index is loaded from the collection directory, or built and saved
+        there. It is rebuilt once the collection has doubled since it was
+        built, as unindexed rows are scanned in full by every query.
+        """
+        if settings.VECTOR_STORE_NATIVE_INDEX != "ivf" or live < settings.VECTOR_STORE_IVF_MIN_ROWS:
+            return None
+        with self._ivf_lock:
+            path = self._path(_IVF_FILE)
+            if self._ivf is None and os.path.exists(path):
+                index = IVFIndex.load(path)
+                if index.rows <= len(vectors) and index.centroids.shape[1] == self.dimension:
+                    self._ivf = index
+            if self._ivf is None or len(vectors) >= 2 * self._ivf.rows:
+                lists = settings.VECTOR_STORE_IVF_LISTS or int(np.sqrt(len(vectors)))
+                started = time.perf_counter()
+                self._ivf = IVFIndex.build(vectors, lists)
+                logger.info(
+                    f"Built IVF index of {lists} lists over {len(vectors)} rows of {self.name} "
+                    f"in {time.perf_counter() - started:.1f}s"
+                )
+                try:
+                    self._ivf.save(path)
+                except OSError as e:
+                    logger.warning(f"Could not save IVF index of {self.name}: {str(e)}")
+            return self._ivf
+
+
+class NativeBackend(VectorBackend):
+    """Keep collections as memory-mapped float32 matrices under VECTOR_STORE_NATIVE_DIR."""
+    
+    name = "native"
+    
+    def __init__(self, directory: str = None):
+        """
+        Initialize native backend.
+        
+        Args:
+            directory: Data directory (defaults to VECTOR_STORE_NATIVE_DIR)
+        """
+        if settings.VECTOR_STORE_NATIVE_INDEX not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown VECTOR_STORE_NATIVE_INDEX '{settings.VECTOR_STORE_NATIVE_INDEX}', "
+                f"expected one of {', '.join(INDEX_TYPES)}"
+            )
+        self.directory = directory or settings.VECTOR_STORE_NATIVE_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self._write_locks: Dict[str, threading.Lock] = {}
+        self._write_locks_lock = threading.Lock()
+        # Directory inode of each collection this process writes -> its locked writer.lock
+        self._writer_fds: Dict[int, int] = {}
+        self._writers_lock = threading.Lock()
+        # Serializes creating, dropping and renaming collections
+        self._catalog_lock = threading.Lock()
+    
+    def collection_path(self, name: str) -> str:
+        if not _COLLECTION_NAME.match(name):
+            raise ValueError(f"Invalid collection name '{name}'")
+        return os.path.join(self.directory, name)
+    
+    def write_lock(self, name: str) -> threading.Lock:
+        """Lock serializing this process's writes to a collection, shared by all its handles."""
+        with self._write_locks_lock:
+            return self._write_locks.setdefault(name, threading.Lock())
+    
+    def claim_writer(self, name: str, directory: str, inode: int):
+        """
+        Make this process the only writer of a collection, until it is released or the process exits.
+        
+        Args:
+            name: Collection name, for errors
+            directory: Collection directory
+            inode: Inode of the directory the caller's handle was opened on
+            
+        Raises:
+            CollectionLockedError: If another process holds the collection's writer lock
+        """
+        lock_path = os.path.join(directory, _WRITER_LOCK_FILE)
+        with self._writers_lock:
+            fd = self._writer_fds.get(inode)
+            if fd is not None:
+                try:
+                    if os.fstat(fd).st_ino == os.stat(lock_path).st_ino:
+                        return
+                except FileNotFoundError:
+                    pass
+                # The collection we held was dropped and its inode reused
+                del self._writer_fds[inode]
+                os.close(fd)
+            
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                holder = os.pread(fd, 32, 0).decode(errors="replace").strip() or "unknown"
+                os.close(fd)
+                raise CollectionLockedError(
+                    f"Collection {name} is being written by another process (pid {holder})"
+                )
+            
+            if os.stat(directory).st_ino != inode:
+                os.close(fd)
+                raise CollectionNotFoundError(f"Collection {name} was replaced, reopen it")
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, str(os.getpid()).encode(), 0)
+            self._writer_fds[inode] = fd
+    
+    def release_collection(self, name: str):
+        """Give up this process's writer lock on a collection, so another process can write to it."""
+        try:
+            inode = os.stat(self.collection_path(name)).st_ino
+        except FileNotFoundError:
+            return
+        with self._writers_lock:
+            fd = self._writer_fds.pop(inode, None)
+        if fd is not None:
+            os.close(fd)
+    
+    def _exists(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.collection_path(name), _INFO_FILE))
+    
+    def get_collection(self, name: str) -> NativeCollection:
+        if not self._exists(name):
+            raise CollectionNotFoundError(f"Collection {name} does not exist.")
+        return NativeCollection(self, name)
+    
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict] = None) -> NativeCollection:
+        with self._catalog_lock:
+            if not self._exists(name):
+                self._create(name, metadata)
+        return self.get_collection(name)
+    
+    def create_collection(self, name: str, metadata: Optional[Dict] = None) -> NativeCollection:
+        with self._catalog_lock:
+            if self._exists(name):
+                raise ValueError(f"Collection {name} already exists.")
+            self._create(name, metadata)
+        return self.get_collection(name)
+    
+    def _create(self, name: str, metadata: Optional[Dict]):
+        path = self.collection_path(name)
+        # Leftovers of a collection whose creation or deletion was interrupted
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        _write_json(os.path.join(path, _INFO_FILE), {"metadata": metadata, "dimension": None})
+    
+    def delete_collection(self, name: str):
+        with self._catalog_lock:
+            if not self._exists(name):
+                raise CollectionNotFoundError(f"Collection {name} does not exist.")
+            self.release_collection(name)
+            # Rename first so the collection disappears at once, then free the space
+            trash = os.path.join(self.directory, f".deleted-{name}-{time.time_ns()}")
+            os.rename(self.collection_path(name), trash)
+            shutil.rmtree(trash, ignore_errors=True)
+    
+    def rename_collection(self, name: str, new_name: str):
+        """Rename a collection's directory, failing if the new name is taken."""
+        with self._catalog_lock:
+            if self._exists(new_name):
+                raise ValueError(f"Collection {new_name} already exists.")
+            shutil.rmtree(self.collection_path(new_name), ignore_errors=True)
+            os.rename(self.collection_path(name), self.collection_path(new_name))
+    
+    def list_collection_names(self) -> List[str]:
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if not name.startswith(".") and os.path.exists(os.path.join(self.directory, name, _INFO_FILE))
+        )
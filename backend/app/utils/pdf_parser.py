@@ -1,18 +1,255 @@
-import pdfplumber
-from typing import List, Dict
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from importlib.metadata import version
+from typing import List, Dict, Iterator
 import logging
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# pdfplumber and PyPDF2 are imported where used, mostly in the parser
+# processes, so they do not add to the application's startup time
+
+EXTRACTION_STRATEGIES = ("pdfplumber", "pypdf", "tiered")
+
+# Quality checks for fast-path text in the tiered strategy
+FALLBACK_MIN_CHARS = 20  # shorter pages are likely scanned or mostly graphics
+FALLBACK_MAX_GARBLED_RATIO = 0.05  # replacement, private-use and control characters
+FALLBACK_MAX_WORD_LENGTH = 15  # average word length, higher means spaces were lost
+FALLBACK_TABLE_MIN_LINES = 8
+FALLBACK_TABLE_LINE_RATIO = 0.5  # share of short numeric lines, typical of flattened tables
+
+
+def needs_fallback(text: str) -> bool:
+    """
+    Check whether text from the fast extractor is too poor to keep.
+    
+    Flags pages that came out (nearly) empty, contain garbled glyphs, lost
+    their word spacing, or look like a table flattened into one cell per
+    line.
+    """
+    text = text.strip()
+    if len(text) < FALLBACK_MIN_CHARS:
+        return True
+    
+    garbled = sum(
+        1 for ch in text
+        if ch == "\ufffd" or "\ue000" <= ch <= "\uf8ff" or (ord(ch) < 32 and ch not in "\n\r\t")
+    )
+    if garbled / len(text) > FALLBACK_MAX_GARBLED_RATIO:
+        return True
+    
+    words = text.split()
+    if sum(len(word) for word in words) / len(words) > FALLBACK_MAX_WORD_LENGTH:
+        return True
+    
+    lines = [line for line in text.splitlines() if line.strip()]
+    if len(lines) >= FALLBACK_TABLE_MIN_LINES:
+        tabular = sum(
+            1 for line in lines
+            if len(line.split()) <= 3 and any(ch.isdigit() for ch in line)
+        )
+        if tabular / len(lines) > FALLBACK_TABLE_LINE_RATIO:
+            return True
+    
+    return False
+
+
+def _pdfplumber_page_text(pdf, page_index: int) -> str:
+    """Extract one page with pdfplumber."""
+    page = pdf.pages[page_index]
+    text = page.extract_text()
+    # Release parsed layout objects, they are not needed once text is out
+    page.flush_cache()
+    return text or ""
+
+
+def _pypdf_page_text(reader, page_index: int) -> str:
+    """Extract one page with PyPDF2, treating extractor errors as empty text."""
+    try:
+        return reader.pages[page_index].extract_text() or ""
+    except Exception as e:
+        logger.debug(f"PyPDF2 could not extract page {page_index + 1}: {str(e)}")
+        return ""
+
+
+def _iter_page_range(file_path: str, start: int, end: int, strategy: str) -> Iterator[Dict]:
+    """
+    Yield extracted text for pages ``start`` to ``end`` of a PDF.
+    
+    With the ``tiered`` strategy every page goes through PyPDF2 first and
+    only pages failing ``needs_fallback`` are parsed again with pdfplumber,
+    which is opened on first use.
+    """
+    import pdfplumber
+    import PyPDF2
+    
+    with ExitStack() as stack:
+        reader = None
+        if strategy != "pdfplumber":
+            # Pass a file handle: given a path, PyPDF2 reads the whole file into memory
+            reader = PyPDF2.PdfReader(stack.enter_context(open(file_path, "rb")))
+        pdf = None
+        
+        for page_index in range(start, end):
+            text = None
+            if reader is not None:
+                text = _pypdf_page_text(reader, page_index)
+                if strategy == "tiered" and needs_fallback(text):
+                    text = None
+            
+            if text is None:
+                if pdf is None:
+                    pdf = stack.enter_context(pdfplumber.open(file_path))
+                text = _pdfplumber_page_text(pdf, page_index)
+            
+            text = text.strip()
+            if text:
+                yield {
+                    "page_number": page_index + 1,
+                    "text": text
+                }
+
+
+def _extract_page_range(file_path: str, start: int, end: int, strategy: str) -> List[Dict]:
+    """
+    Extract text from pages ``start`` to ``end`` (zero-based, end exclusive).
+    
+    Module-level so it can be pickled into worker processes. Each call
+    opens the file itself rather than sharing a handle across processes.
+    """
+    return list(_iter_page_range(file_path, start, end, strategy))
+
 
 class PDFParser:
     """Parse PDF documents and extract text content."""
     
+    # Identifies the extraction output, bump when the page text format changes
+    PARSER_VERSION = (
+        f"{settings.PDF_EXTRACTION_STRATEGY}-pdfplumber-{version('pdfplumber')}"
+        f"-pypdf2-{version('PyPDF2')}-1"
+    )
+    
+    _executor = None
+    _executor_lock = threading.Lock()
+    
+    @classmethod
+    def _get_executor(cls) -> ProcessPoolExecutor:
+        """Lazily create the process pool shared by all parser instances."""
+        with cls._executor_lock:
+            if cls._executor is None:
+                # Spawn rather than fork: the parser runs inside threaded ingestion workers
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=settings.PDF_PARSER_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                logger.info(f"Started PDF parser pool with {settings.PDF_PARSER_WORKERS} processes")
+            return cls._executor
+    
+    @classmethod
+    def shutdown(cls):
+        """Shut down the parser process pool if it was started."""
+        with cls._executor_lock:
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=False, cancel_futures=True)
+                cls._executor = None
+    
+    @staticmethod
+    def get_page_count(file_path: str) -> int:
+        """Get the number of pages in a PDF without extracting any text."""
+        import pdfplumber
+        
+        with pdfplumber.open(file_path) as pdf:
+            return len(pdf.pages)
+    
+    @staticmethod
+    def get_document_info(file_path: str) -> Dict[str, any]:
+        """Get the page count and metadata of a PDF without extracting any text."""
+        import pdfplumber
+        
+        with pdfplumber.open(file_path) as pdf:
+            return {
+                "page_count": len(pdf.pages),
+                "metadata": pdf.metadata if hasattr(pdf, 'metadata') else {}
+            }
+    
+    @staticmethod
+    def join_pages(pages: List[Dict]) -> str:
+        """Join page texts into one document text with page markers."""
+        return "".join(
+            f"\n\n--- Page {page['page_number']} ---\n\n{page['text']}"
+            for page in pages
+        ).strip()
+    
+    @staticmethod
+    def iter_pages(file_path: str, page_count: int = None) -> Iterator[Dict]:
+        """
+        Yield page texts in page order as they are extracted.
+        
+        Pages are extracted with PDF_EXTRACTION_STRATEGY; see ``needs_fallback``
+        for when the tiered strategy re-extracts a page with pdfplumber.
+        
+        Documents with at least PDF_PARALLEL_MIN_PAGES pages are extracted on
+        the parser process pool in ranges of PDF_PARALLEL_RANGE_PAGES. Only a
+        window of ranges is in flight at once, so memory stays bounded and
+        the first pages are available before the last ones are parsed.
+        
+        Args:
+            file_path: Path to PDF file
+            page_count: Page count if already known
+            
+        Yields:
+            Dictionaries with page_number and text
+        """
+        strategy = settings.PDF_EXTRACTION_STRATEGY
+        if strategy not in EXTRACTION_STRATEGIES:
+            raise ValueError(f"Unknown PDF_EXTRACTION_STRATEGY: {strategy}")
+        
+        if page_count is None:
+            page_count = PDFParser.get_page_count(file_path)
+        
+        parallel = (
+            settings.PDF_PARSER_WORKERS > 1
+            and page_count >= settings.PDF_PARALLEL_MIN_PAGES
+        )
+        
+        if not parallel:
+            yield from _iter_page_range(file_path, 0, page_count, strategy)
+            return
+        
+        executor = PDFParser._get_executor()
+        range_size = max(1, settings.PDF_PARALLEL_RANGE_PAGES)
+        ranges = [
+            (start, min(start + range_size, page_count))
+            for start in range(0, page_count, range_size)
+        ]
+        window = settings.PDF_PARSER_WORKERS * 2
+        
+        # Ranges are submitted and consumed in order, which keeps page order
+        pending = deque()
+        next_range = 0
+        try:
+            while next_range < len(ranges) or pending:
+                while next_range < len(ranges) and len(pending) < window:
+                    start, end = ranges[next_range]
+                    pending.append(executor.submit(_extract_page_range, file_path, start, end, strategy))
+                    next_range += 1
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+    
     @staticmethod
     def extract_text(file_path: str) -> Dict[str, any]:
         """
         Extract text from PDF file.
         
+        Large documents are extracted across the parser process pool,
+        see ``iter_pages``.
+        
         Args:
             file_path: Path to PDF file
             
@@ -24,32 +261,18 @@ class PDFParser:
                 - metadata: Document metadata
         """
         try:
-            pages_text = []
-            full_text = ""
-            
-            with pdfplumber.open(file_path) as pdf:
-                page_count = len(pdf.pages)
-                
-                for page_num, page in enumerate(pdf.pages, 1):
-                    text = page.extract_text()
-                    if text:
-                        pages_text.append({
-                            "page_number": page_num,
-                            "text": text.strip()
-                        })
-                        full_text += f"\n\n--- Page {page_num} ---\n\n{text.strip()}"
-                
-                metadata = pdf.metadata if hasattr(pdf, 'metadata') else {}
+            info = PDFParser.get_document_info(file_path)
+            pages_text = list(PDFParser.iter_pages(file_path, info["page_count"]))
             
-            logger.info(f"Successfully extracted text from {page_count} pages")
+            logger.info(f"Successfully extracted text from {info['page_count']} pages")
             
             return {
-                "full_text": full_text.strip(),
+                "full_text": PDFParser.join_pages(pages_text),
                 "pages": pages_text,
-                "page_count": page_count,
-                "metadata": metadata
+                "page_count": info["page_count"],
+                "metadata": info["metadata"]
             }
-            
+        
         except Exception as e:
             logger.error(f"Error parsing PDF {file_path}: {str(e)}")
             raise Exception(f"Failed to parse PDF: {str(e)}")
@@ -65,6 +288,8 @@ class PDFParser:
         Returns:
             True if valid PDF, False otherwise
         """
+        import pdfplumber
+        
         try:
             with pdfplumber.open(file_path) as pdf:
                 # Try to access first page
@@ -73,4 +298,4 @@ class PDFParser:
             return False
         except Exception as e:
             logger.error(f"PDF validation failed: {str(e)}")
-            return False
\ No newline at end of file
+            return False
@@ -1,26 +1,65 @@
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from bisect import bisect_left, bisect_right
+import statistics
 import re
+import hashlib
 from app.config import settings
 
+# Sentence end in whitespace-normalized text: terminal punctuation and a single space
+_SENTENCE_BOUNDARY = re.compile(r'[.!?] ')
+
+# Pages passed to the tokenizer per call in token mode
+TOKENIZE_BATCH_PAGES = 16
+
 
 class TextChunker:
     """Intelligently chunk text for better retrieval."""
     
-    def __init__(self, chunk_size: int = None, chunk_overlap: int = None):
+    def __init__(
+        self,
+        chunk_size: int = None,
+        chunk_overlap: int = None,
+        tokenizer=None,
+        max_tokens: int = None,
+        overlap_tokens: int = None
+    ):
         """
         Initialize text chunker.
         
+        Passing a tokenizer switches to token mode: chunks are packed up to
+        ``max_tokens`` tokens of that tokenizer with ``overlap_tokens`` of
+        overlap, instead of characters.
+        
         Args:
             chunk_size: Maximum characters per chunk
             chunk_overlap: Number of overlapping characters between chunks
+            tokenizer: Fast (offset-mapping capable) HuggingFace tokenizer
+            max_tokens: Maximum tokens per chunk in token mode
+            overlap_tokens: Number of overlapping tokens between chunks
         """
         self.chunk_size = chunk_size or settings.CHUNK_SIZE
         self.chunk_overlap = chunk_overlap or settings.CHUNK_OVERLAP
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens if overlap_tokens is not None else settings.CHUNK_OVERLAP_TOKENS
+        
+        if tokenizer is not None and not max_tokens:
+            raise ValueError("max_tokens is required in token mode")
+    
+    @property
+    def token_mode(self) -> bool:
+        """Whether chunks are measured in tokens rather than characters."""
+        return self.tokenizer is not None
     
     def chunk_text(self, text: str, document_id: int = None, page_info: List[Dict] = None) -> List[Dict]:
         """
         Split text into chunks with metadata.
         
+        When page information is given the document is rebuilt from the
+        pages, so chunk offsets and page numbers are exact and ``text`` (which
+        may contain page markers) is not used. Output is identical to
+        ``iter_chunks`` over the same pages.
+        
         Args:
             text: Full document text
             document_id: ID of source document
@@ -29,84 +68,287 @@ class TextChunker:
         Returns:
             List of chunk dictionaries with text and metadata
         """
-        # Clean text
-        text = self._clean_text(text)
+        pages = page_info if page_info else [{"page_number": None, "text": text}]
+        return list(self.iter_chunks(pages, document_id=document_id))
+    
+    def iter_chunks(self, pages: Iterable[Dict], document_id: int = None) -> Iterator[Dict]:
+        """
+        Chunk a stream of pages, yielding each chunk as soon as it is complete.
+        
+        Pages are whitespace-normalized and joined with single spaces into
+        one logical document; chunks are character ranges of it with
+        ``start_offset``/``end_offset`` recorded. A chunk's page number is
+        found by binary search over page start offsets, using the first
+        sentence that is new in the chunk (not the overlap). Only the text
+        from the current chunk onward is kept, so pages are consumed lazily.
         
-        # Split into sentences for better chunking
-        sentences = self._split_sentences(text)
+        In token mode chunk lengths are counted from the token offsets of a
+        batched tokenizer call per group of pages, sentences longer than the
+        budget are split at token boundaries, and each chunk carries a
+        ``token_count``.
+        
+        Args:
+            pages: Iterable of dictionaries with page_number and text
+            document_id: ID of source document
+            
+        Yields:
+            Chunk dictionaries with text and metadata
+        """
+        window = ""  # document text from window_start onward
+        window_start = 0
+        doc_length = 0
+        page_starts: List[int] = []
+        page_numbers: List[Optional[int]] = []
+        # Document offsets of the tokens from window_start onward (token mode only)
+        token_starts: Optional[List[int]] = [] if self.token_mode else None
+        budget = self.max_tokens if self.token_mode else self.chunk_size
         
-        chunks = []
-        current_chunk = []
-        current_length = 0
+        chunk_start = None  # offset where the current chunk begins, overlap included
+        chunk_end = None
+        new_start = None  # offset of the first sentence that is new in this chunk
         chunk_index = 0
         
-        for sentence in sentences:
-            sentence_length = len(sentence)
+        def emit() -> Dict:
+            page_number = page_numbers[bisect_right(page_starts, new_start) - 1]
+            chunk_text = window[chunk_start - window_start:chunk_end - window_start]
+            token_count = self._span_length(chunk_start, chunk_end, token_starts) if self.token_mode else None
+            return self._make_chunk(
+                chunk_text, chunk_index, document_id, page_number, chunk_start, chunk_end, token_count
+            )
+        
+        for page_number, page_text, token_offsets in self._iter_clean_pages(pages):
+            if doc_length:
+                window += " "
+                doc_length += 1
+            page_starts.append(doc_length)
+            page_numbers.append(page_number)
+            page_offset = doc_length
+            window += page_text
+            doc_length += len(page_text)
+            
+            if token_offsets is not None:
+                token_starts.extend(page_offset + start for start, _ in token_offsets)
             
-            # If adding this sentence exceeds chunk size, save current chunk
-            if current_length + sentence_length > self.chunk_size and current_chunk:
-                chunk_text = " ".join(current_chunk)
-                chunks.append({
-                    "text": chunk_text,
-                    "chunk_index": chunk_index,
-                    "document_id": document_id,
-                    "page_number": self._estimate_page(chunk_text, page_info) if page_info else None,
-                    "char_count": len(chunk_text)
-                })
-                
-                # Keep overlap sentences for context
-                overlap_text = chunk_text[-self.chunk_overlap:] if len(chunk_text) > self.chunk_overlap else chunk_text
-                current_chunk = [overlap_text, sentence]
-                current_length = len(overlap_text) + sentence_length
-                chunk_index += 1
-            else:
-                current_chunk.append(sentence)
-                current_length += sentence_length
+            for sentence_start, sentence_end in self._iter_sentence_spans(page_text, page_offset):
+                for start, end in self._fit_span(window, window_start, sentence_start, sentence_end, token_starts):
+                    if chunk_start is None:
+                        chunk_start = new_start = start
+                    elif self._span_length(chunk_start, end, token_starts) > budget:
+                        # Adding this sentence exceeds chunk size, save current chunk
+                        yield emit()
+                        chunk_index += 1
+                        chunk_start = self._overlap_start(window, window_start, chunk_start, chunk_end, token_starts)
+                        if chunk_start >= chunk_end:
+                            chunk_start = start  # no overlap
+                        elif self.token_mode and self._span_length(chunk_start, end, token_starts) > budget:
+                            chunk_start = start  # overlap would push the chunk past the model limit
+                        new_start = start
+                    chunk_end = end
+            
+            # Drop text that no later chunk can reach
+            if chunk_start is not None and chunk_start > window_start:
+                window = window[chunk_start - window_start:]
+                window_start = chunk_start
+                if token_starts is not None:
+                    del token_starts[:bisect_left(token_starts, chunk_start)]
         
         # Add remaining chunk
-        if current_chunk:
-            chunk_text = " ".join(current_chunk)
-            chunks.append({
-                "text": chunk_text,
-                "chunk_index": chunk_index,
-                "document_id": document_id,
-                "page_number": self._estimate_page(chunk_text, page_info) if page_info else None,
-                "char_count": len(chunk_text)
-            })
-        
-        return chunks
+        if chunk_start is not None:
+            yield emit()
     
-    def _clean_text(self, text: str) -> str:
-        """Clean and normalize text."""
-        # Remove multiple spaces
-        text = re.sub(r'\s+', ' ', text)
-        # Remove multiple newlines
-        text = re.sub(r'\n+', '\n', text)
-        return text.strip()
+    def _iter_clean_pages(self, pages: Iterable[Dict]) -> Iterator[Tuple[Optional[int], str, Optional[List]]]:
+        """
+        Clean pages and, in token mode, tokenize them in batches.
+        
+        Yields:
+            (page_number, cleaned_text, token_offsets) for non-empty pages;
+            token_offsets are (start, end) character offsets within the page,
+            or None in character mode
+        """
+        batch = []
+        for page in pages:
+            page_text = self._clean_text(page["text"])
+            if not page_text:
+                continue
+            
+            if not self.token_mode:
+                yield page["page_number"], page_text, None
+                continue
+            
+            batch.append((page["page_number"], page_text))
+            if len(batch) >= TOKENIZE_BATCH_PAGES:
+                yield from self._tokenize_pages(batch)
+                batch = []
+        
+        if batch:
+            yield from self._tokenize_pages(batch)
     
-    def _split_sentences(self, text: str) -> List[str]:
-        """Split text into sentences."""
-        # Simple sentence splitting
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        return [s.strip() for s in sentences if s.strip()]
+    def _tokenize_pages(self, batch: List[Tuple[Optional[int], str]]) -> Iterator[Tuple[Optional[int], str, List]]:
+        """Tokenize a batch of cleaned pages in one tokenizer call."""
+        encoded = self.tokenizer(
+            [page_text for _, page_text in batch],
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False
+        )
+        for (page_number, page_text), offsets in zip(batch, encoded["offset_mapping"]):
+            yield page_number, page_text, offsets
     
-    def _estimate_page(self, chunk_text: str, page_info: List[Dict]) -> int:
+    def _span_length(self, start: int, end: int, token_starts: Optional[List[int]]) -> int:
+        """Length of a document span in characters, or in tokens in token mode."""
+        if token_starts is None:
+            return end - start
+        return bisect_left(token_starts, end) - bisect_left(token_starts, start)
+    
+    def _fit_span(
+        self,
+        window: str,
+        window_start: int,
+        start: int,
+        end: int,
+        token_starts: Optional[List[int]]
+    ) -> Iterator[Tuple[int, int]]:
+        """
+        Split a sentence longer than the token budget at token boundaries.
+        
+        The model would silently truncate such a sentence anyway. Character
+        mode keeps sentences whole, as before.
+        """
+        if token_starts is None:
+            yield start, end
+            return
+        
+        first = bisect_left(token_starts, start)
+        last = bisect_left(token_starts, end)
+        if last - first <= self.max_tokens:
+            yield start, end
+            return
+        
+        for piece in range(first, last, self.max_tokens):
+            piece_start = token_starts[piece]
+            next_piece = piece + self.max_tokens
+            piece_end = token_starts[next_piece] if next_piece < last else end
+            while piece_end > piece_start and window[piece_end - 1 - window_start] == " ":
+                piece_end -= 1
+            yield piece_start, piece_end
+    
+    def _iter_sentence_spans(self, text: str, offset: int = 0) -> Iterator[Tuple[int, int]]:
         """
-        Estimate which page a chunk belongs to.
+        Split whitespace-normalized text into sentences in a single pass.
         
         Args:
-            chunk_text: The chunk text
-            page_info: List of page information
+            text: Cleaned text of one page
+            offset: Document offset of ``text``
+            
+        Yields:
+            (start, end) document offsets of each sentence; the end of the
+            page always ends a sentence
+        """
+        start = 0
+        for match in _SENTENCE_BOUNDARY.finditer(text):
+            end = match.start() + 1  # keep the punctuation
+            yield offset + start, offset + end
+            start = match.end()
+        
+        if start < len(text):
+            yield offset + start, offset + len(text)
+    
+    def _overlap_start(
+        self,
+        window: str,
+        window_start: int,
+        chunk_start: int,
+        chunk_end: int,
+        token_starts: Optional[List[int]] = None
+    ) -> int:
+        """
+        Find where the next chunk starts so it repeats the tail of the last one.
+        
+        The tail is ``chunk_overlap`` characters, or ``overlap_tokens`` tokens
+        in token mode. The cut is moved forward to the next word boundary so
+        the overlap never starts mid-word.
+        """
+        if token_starts is None:
+            if chunk_end - chunk_start <= self.chunk_overlap:
+                return chunk_start
+            cut = chunk_end - self.chunk_overlap
+        else:
+            first = bisect_left(token_starts, chunk_start)
+            last = bisect_left(token_starts, chunk_end)
+            if last - first <= self.overlap_tokens:
+                return chunk_start
+            if self.overlap_tokens <= 0:
+                return chunk_end
+            cut = token_starts[last - self.overlap_tokens]
+        
+        space = window.find(" ", cut - window_start, chunk_end - window_start)
+        if space != -1:
+            cut = window_start + space + 1
+        return cut
+    
+    @staticmethod
+    def summarize_token_lengths(token_counts: List[int], max_tokens: int = None) -> Dict:
+        """
+        Summarize the token-length distribution of a document's chunks.
+        
+        Args:
+            token_counts: Token count of every chunk
+            max_tokens: Chunk token budget, to report how many chunks fill it
             
         Returns:
-            Estimated page number
+            Dictionary with count, min, max, mean and percentiles
         """
-        if not page_info:
-            return None
+        if not token_counts:
+            return {"count": 0}
+        
+        ordered = sorted(token_counts)
         
-        # Find which page contains most of this chunk
-        for page in page_info:
-            if chunk_text[:100] in page["text"]:
-                return page["page_number"]
+        def percentile(q: float) -> int:
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
         
-        return 1  # Default to first page if not found
\ No newline at end of file
+        summary = {
+            "count": len(ordered),
+            "min": ordered[0],
+            "max": ordered[-1],
+            "mean": round(statistics.fmean(ordered), 1),
+            "p50": percentile(0.50),
+            "p90": percentile(0.90),
+            "p99": percentile(0.99)
+        }
+        if max_tokens:
+            summary["max_tokens"] = max_tokens
+            summary["at_budget"] = sum(1 for count in ordered if count >= max_tokens * 0.9)
+        return summary
+    
+    def _make_chunk(
+        self,
+        chunk_text: str,
+        chunk_index: int,
+        document_id: Optional[int],
+        page_number: Optional[int],
+        start_offset: int,
+        end_offset: int,
+        token_count: Optional[int] = None
+    ) -> Dict:
+        """Build a chunk dictionary."""
+        chunk = {
+            "text": chunk_text,
+            "chunk_index": chunk_index,
+            "document_id": document_id,
+            "page_number": page_number,
+            "char_count": len(chunk_text),
+            "start_offset": start_offset,
+            "end_offset": end_offset,
+            "chunk_hash": hashlib.sha256(chunk_text.encode("utf-8")).hexdigest()
+        }
+        if token_count is not None:
+            chunk["token_count"] = token_count
+        return chunk
+    
+    def _clean_text(self, text: str) -> str:
+        """Clean and normalize text."""
+        # Remove multiple spaces
+        text = re.sub(r'\s+', ' ', text)
+        return text.strip()
@@ -0,0 +1,110 @@
+import os
+import uuid
+import hashlib
+import tempfile
+from datetime import datetime
+from typing import Tuple
+import logging
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PDF_MAGIC = b"%PDF-"
+
+
+class UploadWriter:
+    """
+    Write an upload to disk incrementally.
+    
+    Data is written to a temporary file inside the upload directory while
+    the size limit, the PDF header and the content hash are checked on the
+    way. ``commit`` renames the finished file into place atomically, so a
+    partially written upload is never visible under its final name.
+    
+    Usable as a context manager; the temporary file is removed if the block
+    exits without a successful ``commit``.
+    """
+    
+    def __init__(self, original_filename: str, company_id: int, upload_dir: str = None, max_size: int = None):
+        """
+        Initialize upload writer.
+        
+        Args:
+            original_filename: Name the file was uploaded as
+            company_id: Company ID, used as the stored filename prefix
+            upload_dir: Target directory (defaults to UPLOAD_DIR)
+            max_size: Maximum size in bytes (defaults to MAX_UPLOAD_SIZE)
+        """
+        self.original_filename = original_filename
+        self.company_id = company_id
+        self.upload_dir = upload_dir or settings.UPLOAD_DIR
+        self.max_size = max_size or settings.MAX_UPLOAD_SIZE
+        self.file_size = 0
+        self._hasher = hashlib.sha256()
+        self._head = b""
+        self._committed = False
+        
+        # Same directory as the final path, so the rename never crosses filesystems
+        fd, self.temp_path = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=self.upload_dir)
+        self._buffer = os.fdopen(fd, "wb")
+    
+    @staticmethod
+    def stored_filename(original_filename: str, company_id: int) -> str:
+        """Generate a unique filename (the suffix keeps same-second uploads apart)."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"{company_id}_{timestamp}_{uuid.uuid4().hex[:8]}_{os.path.basename(original_filename)}"
+    
+    def __enter__(self) -> "UploadWriter":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if not self._committed:
+            self.abort()
+        return False
+    
+    def write(self, data: bytes):
+        """
+        Append a block of the upload.
+        
+        Raises:
+            ValueError: If the upload exceeds the size limit or does not
+                start with a PDF header
+        """
+        self.file_size += len(data)
+        if self.file_size > self.max_size:
+            raise ValueError(f"File size exceeds {self.max_size / (1024*1024)}MB limit")
+        
+        if len(self._head) < len(PDF_MAGIC):
+            self._head += data[:len(PDF_MAGIC) - len(self._head)]
+            if not PDF_MAGIC.startswith(self._head):
+                raise ValueError("File is not a valid PDF")
+        
+        self._hasher.update(data)
+        self._buffer.write(data)
+    
+    def commit(self) -> Tuple[str, str, int, str]:
+        """
+        Move the finished upload to its final path.
+        
+        Returns:
+            Tuple of (filename, file_path, file_size, content_hash)
+        """
+        if self._head != PDF_MAGIC:
+            raise ValueError("File is not a valid PDF")
+        
+        self._buffer.close()
+        
+        filename = self.stored_filename(self.original_filename, self.company_id)
+        file_path = os.path.join(self.upload_dir, filename)
+        
+        os.replace(self.temp_path, file_path)
+        self._committed = True
+        
+        logger.info(f"File saved: {file_path}")
+        return filename, file_path, self.file_size, self._hasher.hexdigest()
+    
+    def abort(self):
+        """Discard the partially written upload."""
+        self._buffer.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
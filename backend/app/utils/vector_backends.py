@@ -0,0 +1,132 @@
+"""
+Vector store backends.
+
+``ChromaBackend`` keeps collections in ChromaDB. ``NativeBackend`` (see
+``app.utils.native_vector_store``) keeps each collection as a memory-mapped
+float32 matrix and searches it in process, which avoids ChromaDB's
+per-query overhead and uses little more disk than the raw vectors.
+
+Select one with the VECTOR_STORE_BACKEND setting. Switching backends does
+not move data: reindex every company afterwards.
+"""
+from typing import Dict, List, Optional
+import logging
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+VECTOR_BACKENDS = ("chroma", "native")
+
+
+class CollectionNotFoundError(ValueError):
+    """A collection does not exist, or the one a handle was opened on was dropped or replaced."""
+
+
+class VectorBackend:
+    """
+    Interface of a vector store backend.
+    
+    Collections returned by a backend offer the subset of ChromaDB's
+    ``Collection`` API the vector store uses, with the same arguments and
+    result shapes: ``name``, ``metadata``, ``add``, ``upsert``, ``get``,
+    ``delete``, ``query``, ``count`` and ``modify``. Distances are squared
+    L2, ChromaDB's default space.
+    """
+    
+    name = ""
+    # Where the backend keeps its data
+    directory = ""
+    
+    def get_collection(self, name: str):
+        """Open a collection, raising ValueError if it does not exist."""
+        raise NotImplementedError
+    
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict] = None):
+        """Open a collection, creating it (with metadata) if it does not exist."""
+        raise NotImplementedError
+    
+    def create_collection(self, name: str, metadata: Optional[Dict] = None):
+        """Create a collection, raising ValueError if it exists."""
+        raise NotImplementedError
+    
+    def delete_collection(self, name: str):
+        """Drop a collection and its data."""
+        raise NotImplementedError
+    
+    def list_collection_names(self) -> List[str]:
+        """List the names of all collections."""
+        raise NotImplementedError
+    
+    def is_missing_collection_error(self, error: Exception) -> bool:
+        """Tell whether an error means the collection, or the one behind a stale handle, no longer exists."""
+        return isinstance(error, (CollectionNotFoundError, FileNotFoundError))
+    
+    def release_collection(self, name: str):
+        """Let other processes write to a collection this process wrote to, where the backend restricts that."""
+        pass
+
+
+class ChromaBackend(VectorBackend):
+    """Keep collections in a persistent ChromaDB database."""
+    
+    name = "chroma"
+    
+    def __init__(self, directory: str = None):
+        """
+        Initialize ChromaDB backend.
+        
+        Args:
+            directory: Database directory (defaults to CHROMA_DB_DIR)
+        """
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+        
+        self.directory = directory or settings.CHROMA_DB_DIR
+        self.client = chromadb.PersistentClient(
+            path=self.directory,
+            settings=ChromaSettings(anonymized_telemetry=False)
+        )
+    
+    def get_collection(self, name: str):
+        return self.client.get_collection(name)
+    
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict] = None):
+        return self.client.get_or_create_collection(name=name, metadata=metadata)
+    
+    def create_collection(self, name: str, metadata: Optional[Dict] = None):
+        return self.client.create_collection(name=name, metadata=metadata)
+    
+    def delete_collection(self, name: str):
+        self.client.delete_collection(name)
+    
+    def list_collection_names(self) -> List[str]:
+        return [collection.name for collection in self.client.list_collections()]
+    
+    def is_missing_collection_error(self, error: Exception) -> bool:
+        from chromadb.errors import InvalidCollectionException
+        
+        # Handles of a dropped collection fail with InvalidCollectionException,
+        # or StopIteration from get and count; opening one with a ValueError
+        return isinstance(error, (InvalidCollectionException, StopIteration)) or (
+            isinstance(error, ValueError) and str(error).endswith("does not exist.")
+        )
+
+
+def create_vector_backend(backend: str = None, directory: str = None) -> VectorBackend:
+    """
+    Create a vector store backend.
+    
+    Args:
+        backend: "chroma" or "native" (defaults to VECTOR_STORE_BACKEND)
+        directory: Data directory (defaults to the backend's setting)
+        
+    Returns:
+        Vector store backend
+    """
+    backend = backend or settings.VECTOR_STORE_BACKEND
+    if backend == "chroma":
+        return ChromaBackend(directory)
+    if backend == "native":
+        from app.utils.native_vector_store import NativeBackend
+        return NativeBackend(directory)
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND '{backend}', expected one of {', '.join(VECTOR_BACKENDS)}")
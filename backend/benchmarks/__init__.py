@@ -0,0 +1 @@
+#File can stay empty but its required to be present to make the directory a package.
\ No newline at end of file
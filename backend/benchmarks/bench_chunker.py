@@ -0,0 +1,111 @@
+"""
+Micro-benchmark: offset-based TextChunker against the previous implementation.
+
+Builds a large synthetic document whose sentences are tagged with their page
+number, chunks it with both implementations and reports throughput and how
+often the reported page number actually occurs in the chunk.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_chunker --pages 400
+"""
+import argparse
+import re
+import time
+from typing import Dict, List
+
+from app.utils.text_chunker import TextChunker
+
+PAGE_TAG = re.compile(r"\[p(\d+)\]")
+
+
+class LegacyTextChunker:
+    """The chunker before offset-based chunking, kept here for comparison."""
+    
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+    
+    def chunk_text(self, text: str, document_id: int = None, page_info: List[Dict] = None) -> List[Dict]:
+        text = re.sub(r'\s+', ' ', text).strip()
+        sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', text) if s.strip()]
+        
+        chunks = []
+        current_chunk = []
+        current_length = 0
+        for sentence in sentences:
+            if current_length + len(sentence) > self.chunk_size and current_chunk:
+                chunk_text = " ".join(current_chunk)
+                chunks.append({"text": chunk_text, "page_number": self._estimate_page(chunk_text, page_info)})
+                overlap_text = chunk_text[-self.chunk_overlap:] if len(chunk_text) > self.chunk_overlap else chunk_text
+                current_chunk = [overlap_text, sentence]
+                current_length = len(overlap_text) + len(sentence)
+            else:
+                current_chunk.append(sentence)
+                current_length += len(sentence)
+        
+        if current_chunk:
+            chunk_text = " ".join(current_chunk)
+            chunks.append({"text": chunk_text, "page_number": self._estimate_page(chunk_text, page_info)})
+        return chunks
+    
+    def _estimate_page(self, chunk_text: str, page_info: List[Dict]) -> int:
+        for page in page_info:
+            if chunk_text[:100] in page["text"]:
+                return page["page_number"]
+        return 1
+
+
+def build_document(page_count: int, sentences_per_page: int) -> tuple:
+    """Build synthetic pages the way PDFParser returns them."""
+    pages = []
+    for page_number in range(1, page_count + 1):
+        lines = [
+            f"Clause [p{page_number}] {i} requires staff to follow   procedure {i} carefully."
+            for i in range(sentences_per_page)
+        ]
+        pages.append({"page_number": page_number, "text": "\n".join(lines)})
+    full_text = "".join(f"\n\n--- Page {p['page_number']} ---\n\n{p['text']}" for p in pages).strip()
+    return full_text, pages
+
+
+def page_accuracy(chunks: List[Dict]) -> float:
+    """Share of chunks whose page number is one of the pages their text came from."""
+    correct = sum(
+        1 for chunk in chunks
+        if str(chunk["page_number"]) in set(PAGE_TAG.findall(chunk["text"]))
+    )
+    return correct / len(chunks) if chunks else 0.0
+
+
+def run(name: str, chunker, full_text: str, pages: List[Dict], repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = chunker.chunk_text(full_text, document_id=1, page_info=pages)
+        best = min(best, time.perf_counter() - started)
+    
+    megabytes = len(full_text) / (1024 * 1024)
+    print(
+        f"{name:<10} {len(chunks):>7} chunks  {best * 1000:>9.1f} ms  "
+        f"{megabytes / best:>7.2f} MB/s  page accuracy {page_accuracy(chunks):.1%}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--sentences-per-page", type=int, default=40)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    full_text, pages = build_document(args.pages, args.sentences_per_page)
+    print(f"Document: {args.pages} pages, {len(full_text) / 1024:.0f} KiB\n")
+    
+    run("legacy", LegacyTextChunker(args.chunk_size, args.chunk_overlap), full_text, pages, args.repeat)
+    run("offsets", TextChunker(args.chunk_size, args.chunk_overlap), full_text, pages, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
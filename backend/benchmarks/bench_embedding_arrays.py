@@ -0,0 +1,106 @@
+"""
+Benchmark: embeddings as float32 arrays versus lists of floats.
+
+Takes a batch of model output (random unit vectors, the model itself is
+the same either way) through the steps ingestion performs after encoding:
+handing the batch out of the embedding service, writing it to the
+embedding cache and passing it to ChromaDB, which validates every value.
+
+"lists" is the previous pipeline, which converted every vector with
+``tolist()`` in the service; "arrays" keeps one float32 matrix until
+ChromaDB converts it in a single call. Reports time per step, the size of
+the batch as handed out by the service, and peak allocation.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_embedding_arrays --chunks 10000 --dimension 384
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+import numpy as np
+from chromadb.api.types import validate_embeddings
+
+from app.services.embedding_service import normalize_rows
+from app.services.vector_store_service import VectorStoreService
+from app.utils.embedding_cache import EmbeddingCache
+
+
+PIPELINES = {
+    # (service output from model output, what the vector store hands to ChromaDB)
+    "lists": (
+        lambda output: [row.tolist() for row in output],
+        lambda batch: batch
+    ),
+    "arrays": (
+        lambda output: normalize_rows(np.ascontiguousarray(output, dtype=np.float32)),
+        lambda batch: VectorStoreService._as_matrix(batch).tolist()
+    )
+}
+
+
+def run(pipeline: str, output: np.ndarray, texts: List[str]) -> Tuple[Dict[str, float], object]:
+    """Run one pipeline, returning (seconds per step, the service's batch)."""
+    to_service, to_store = PIPELINES[pipeline]
+    timings = {}
+    
+    started = time.perf_counter()
+    batch = to_service(output)
+    timings["service"] = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    EmbeddingCache("bench", db_path="").put_many(texts, batch)
+    timings["cache"] = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    validate_embeddings(to_store(batch))
+    timings["store"] = time.perf_counter() - started
+    return timings, batch
+
+
+def peak_allocation(pipeline: str, output: np.ndarray, texts: List[str]) -> int:
+    """Peak bytes allocated while running one pipeline (traced separately, tracing slows it down)."""
+    tracemalloc.start()
+    run(pipeline, output, texts)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def batch_size(batch) -> int:
+    """Bytes held by a batch of vectors."""
+    if isinstance(batch, np.ndarray):
+        return batch.nbytes
+    # List of lists of boxed floats: list headers, pointers and float objects
+    return sum(56 + 8 * len(row) + 24 * len(row) for row in batch) + 56 + 8 * len(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(args.seed)
+    output = rng.standard_normal((args.chunks, args.dimension), dtype=np.float32)
+    normalize_rows(output)
+    texts = [f"chunk {index}" for index in range(args.chunks)]
+    print(f"{args.chunks} chunks x {args.dimension} dimensions\n")
+    
+    for pipeline in PIPELINES:
+        timings, batch = run(pipeline, output, texts)
+        held = batch_size(batch)
+        del batch
+        peak = peak_allocation(pipeline, output, texts)
+        print(
+            f"{pipeline:<7} "
+            + "  ".join(f"{step} {seconds * 1000:>7.1f} ms" for step, seconds in timings.items())
+            + f"  total {sum(timings.values()) * 1000:>7.1f} ms"
+            + f"  batch {held / 2 ** 20:>6.1f} MiB  peak {peak / 2 ** 20:>6.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
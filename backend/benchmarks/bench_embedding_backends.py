@@ -0,0 +1,89 @@
+"""
+Benchmark: embedding backends.
+
+Embeds a fixed, seeded set of texts with the torch backend, the ONNX
+backend and the int8-quantized ONNX backend, and reports throughput and
+how closely each backend's vectors agree with torch (cosine similarity of
+the two vectors of every text).
+
+The ONNX exports are created in EMBEDDING_ONNX_DIR on the first run.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_embedding_backends --texts 2000 --batch-size 32
+"""
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.utils.embedding_backends import EmbeddingBackend, OnnxBackend, TorchBackend
+
+WORDS = (
+    "employee policy leave request manager approval holiday allowance contract notice "
+    "period salary review training safety procedure report incident department budget "
+    "the a of to and in is for on with must should may each all"
+).split()
+
+
+def build_texts(count: int, seed: int) -> List[str]:
+    """Sentences to paragraphs of varying length, like real chunks."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        sentences = []
+        for _ in range(rng.choice([1, 1, 2, 4, 8])):
+            sentences.append(" ".join(rng.choices(WORDS, k=rng.randint(6, 18))).capitalize() + ".")
+        texts.append(" ".join(sentences))
+    return texts
+
+
+def run(backend: EmbeddingBackend, texts: List[str], batch_size: int) -> Tuple[float, np.ndarray]:
+    """Embed texts after a warm-up, returning (seconds, vectors)."""
+    backend.encode(texts[:batch_size], batch_size)
+    started = time.perf_counter()
+    vectors = np.asarray(backend.encode(texts, batch_size), dtype=np.float32)
+    return time.perf_counter() - started, vectors
+
+
+def cosine(vectors: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """Row-wise cosine similarity."""
+    dot = np.sum(vectors * reference, axis=1)
+    return dot / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=settings.EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    texts = build_texts(args.texts, args.seed)
+    print(f"Model: {args.model}, {len(texts)} texts, batch size {args.batch_size}\n")
+    
+    backends = [
+        ("torch", lambda: TorchBackend(args.model)),
+        ("onnx", lambda: OnnxBackend(args.model, quantize=False)),
+        ("onnx-int8", lambda: OnnxBackend(args.model, quantize=True))
+    ]
+    
+    reference = None
+    reference_seconds = None
+    for label, create in backends:
+        seconds, vectors = run(create(), texts, args.batch_size)
+        if reference is None:
+            reference, reference_seconds = vectors, seconds
+        similarity = cosine(vectors, reference)
+        print(
+            f"{label:<10} {len(texts) / seconds:>8.1f} texts/s  {seconds:>7.2f} s  "
+            f"x{reference_seconds / seconds:>4.2f}  "
+            f"cosine vs torch mean {similarity.mean():.5f} min {similarity.min():.5f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
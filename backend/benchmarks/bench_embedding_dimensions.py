@@ -0,0 +1,93 @@
+"""
+Benchmark: retrieval recall against embedding dimension.
+
+Embeds a seeded corpus of chunks, a separate sample to fit the PCA
+projection to, and held-out queries. For each dimension and reduction
+method, reports recall@k (the share of each query's full-width top k
+that the reduced vectors also return), index size and brute-force search
+time per query.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_embedding_dimensions --corpus 5000 --queries 200 --dimensions 32,64,128,256
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.config import settings
+from app.services.embedding_service import normalize_rows
+from app.utils.dimension_reduction import DimensionReducer, PCAProjection
+from app.utils.embedding_backends import create_backend
+from benchmarks.bench_embedding_bucketing import build_chunks
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Indices of each query's k nearest corpus vectors by dot product."""
+    scores = queries @ corpus.T
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    """Mean share of the true neighbours found, per query."""
+    return float(np.mean([len(set(row) & set(expected)) / len(expected) for row, expected in zip(found, truth)]))
+
+
+def embed(backend, texts: List[str]) -> np.ndarray:
+    """Full-width, normalized vectors."""
+    return normalize_rows(np.ascontiguousarray(backend.encode(texts, settings.EMBEDDING_BATCH_SIZE), dtype=np.float32))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=int, default=5000)
+    parser.add_argument("--fit", type=int, default=2000, help="texts the PCA projection is fitted to")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimensions", default="32,64,128,256")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    backend = create_backend(settings.EMBEDDING_MODEL)
+    corpus = embed(backend, build_chunks(args.corpus, args.seed))
+    fit_sample = embed(backend, build_chunks(args.fit, args.seed + 1))
+    # Queries are short, like questions
+    queries = embed(backend, [text[:120] for text in build_chunks(args.queries, args.seed + 2)])
+    projection = PCAProjection.fit(fit_sample)
+    print(
+        f"Model: {settings.EMBEDDING_MODEL}, {len(corpus)} chunks, {len(queries)} held-out queries, "
+        f"PCA fitted to {len(fit_sample)} other chunks, recall@{args.k}\n"
+    )
+    
+    truth = top_k(corpus, queries, args.k)
+    rows: List[Dict] = []
+    dimensions = [int(dimension) for dimension in args.dimensions.split(",")] + [corpus.shape[1]]
+    for dimension in dimensions:
+        if dimension == corpus.shape[1]:
+            reducers = {"full": None}
+        else:
+            reducers = {"truncate": DimensionReducer(dimension), "pca": DimensionReducer(dimension, projection)}
+        for method, reducer in reducers.items():
+            reduced_corpus = normalize_rows(reducer.reduce(corpus)) if reducer else corpus
+            reduced_queries = normalize_rows(reducer.reduce(queries)) if reducer else queries
+            started = time.perf_counter()
+            found = top_k(reduced_corpus, reduced_queries, args.k)
+            seconds = time.perf_counter() - started
+            rows.append({
+                "dimension": dimension,
+                "method": method,
+                "recall": recall(found, truth),
+                "size": reduced_corpus.nbytes,
+                "query_ms": seconds * 1000 / len(queries)
+            })
+    
+    for row in rows:
+        print(
+            f"{row['dimension']:>5} {row['method']:<9} recall@{args.k} {row['recall']:.3f}  "
+            f"index {row['size'] / 2 ** 20:>7.2f} MiB  {row['query_ms']:.3f} ms/query"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: embedding throughput against the number of pool processes.
+
+Embeds a seeded set of mixed-length chunks in length buckets, once in
+process and once per pool size, and reports chunks per second and how
+closely the pool's vectors agree with the in-process ones. Pool start-up
+(spawning processes, loading the model) is excluded, as it happens once
+at application startup.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_embedding_pool --chunks 4000 --workers 1,2,4,8 --threads 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.utils.embedding_backends import create_backend
+from app.utils.embedding_pool import EmbeddingPool
+from app.utils.length_buckets import plan_batches
+from benchmarks.bench_embedding_bucketing import build_chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=4000)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--threads", type=int, default=settings.EMBEDDING_POOL_THREADS)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    backend = create_backend(settings.EMBEDDING_MODEL)
+    chunks = build_chunks(args.chunks, args.seed)
+    encoded = backend.tokenizer(chunks, truncation=True, max_length=backend.max_seq_length)
+    lengths = [len(input_ids) for input_ids in encoded["input_ids"]]
+    batches = plan_batches(
+        lengths,
+        settings.EMBEDDING_TOKEN_BUDGET,
+        settings.EMBEDDING_MAX_BATCH_SIZE,
+        settings.EMBEDDING_BUCKET_MAX_PADDING
+    )
+    dimension = backend.get_dimension()
+    print(
+        f"Model: {settings.EMBEDDING_MODEL} ({settings.EMBEDDING_BACKEND}), {len(chunks)} chunks "
+        f"in {len(batches)} batches, {args.threads} threads per pool process\n"
+    )
+    
+    backend.encode(chunks[:32], 32)
+    started = time.perf_counter()
+    reference = np.zeros((len(chunks), dimension), dtype=np.float32)
+    for batch in batches:
+        reference[batch] = backend.encode([chunks[index] for index in batch], len(batch))
+    seconds = time.perf_counter() - started
+    print(f"{'in-process':<12} {len(chunks) / seconds:>8.1f} chunks/s  {seconds:>7.2f} s")
+    
+    for workers in (int(count) for count in args.workers.split(",")):
+        pool = EmbeddingPool(settings.EMBEDDING_MODEL, settings.EMBEDDING_BACKEND, workers, args.threads)
+        try:
+            pool.warm_up()
+            pool.encode(chunks[:32], [list(range(32))], dimension)
+            started = time.perf_counter()
+            vectors = pool.encode(chunks, batches, dimension)
+            seconds = time.perf_counter() - started
+        finally:
+            pool.close()
+        
+        similarity = np.sum(vectors * reference, axis=1) / (
+            np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1)
+        )
+        print(
+            f"{f'{workers} workers':<12} {len(chunks) / seconds:>8.1f} chunks/s  {seconds:>7.2f} s  "
+            f"cosine vs in-process min {similarity.min():.6f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
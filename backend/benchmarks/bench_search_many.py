@@ -0,0 +1,93 @@
+"""
+Benchmark: search throughput of batched queries.
+
+Fills a scratch vector store with one company's chunks, then answers the
+same queries one ``search`` call at a time and in ``search_many`` batches
+of increasing size, reporting queries per second for each. With
+``--embed`` the questions are embedded too (with EMBEDDING_MODEL and the
+cache off), one ``generate_embedding`` per question against one
+``generate_embeddings`` per batch, which is what ``POST /documents/search``
+does.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_search_many --chunks 20000 --queries 512 --batch-sizes 1,8,32,128
+    python -m benchmarks.bench_search_many --backend native --embed
+"""
+import argparse
+import tempfile
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from app.config import settings
+from app.services.embedding_service import normalize_rows
+
+
+def throughput(queries: int, batch_size: int, run_batch: Callable[[slice], object]) -> float:
+    """Run every query in batches of batch_size, returning queries per second."""
+    started = time.perf_counter()
+    for start in range(0, queries, batch_size):
+        run_batch(slice(start, start + batch_size))
+    return queries / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=384, help="vector dimension without --embed")
+    parser.add_argument("--queries", type=int, default=512)
+    parser.add_argument("--batch-sizes", default="1,8,32,128")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--backend", choices=("chroma", "native"), default="chroma")
+    parser.add_argument("--embed", action="store_true", help="embed the questions with the configured model")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+    
+    settings.VECTOR_STORE_BACKEND = args.backend
+    settings.CHROMA_DB_DIR = tempfile.mkdtemp(prefix="bench_chroma_")
+    settings.VECTOR_STORE_NATIVE_DIR = tempfile.mkdtemp(prefix="bench_vectors_")
+    settings.EMBEDDING_CACHE_ENABLED = False
+    from app.services.embedding_service import EmbeddingService
+    from app.services.vector_store_service import VectorStoreService
+    
+    rng = np.random.default_rng(args.seed)
+    store = VectorStoreService()
+    embedding_service = EmbeddingService() if args.embed else None
+    dimension = embedding_service.get_embedding_dimension() if args.embed else args.dimension
+    
+    store.create_collection(1)
+    for start in range(0, args.chunks, 1000):
+        count = min(1000, args.chunks - start)
+        chunks = [
+            {"text": f"chunk {start + index}", "chunk_index": start + index, "page_number": 1, "char_count": 12}
+            for index in range(count)
+        ]
+        store.add_documents(1, 1 + start // 1000, chunks, normalize_rows(rng.standard_normal((count, dimension), dtype=np.float32)))
+    
+    questions: List[str] = [f"question {index} about topic {index % 17}" for index in range(args.queries)]
+    vectors = normalize_rows(rng.standard_normal((args.queries, dimension), dtype=np.float32))
+    print(
+        f"{args.chunks} chunks, {dimension} dimensions, {args.queries} queries, {args.backend} backend"
+        f"{', embedding questions' if args.embed else ''}\n"
+    )
+    
+    if args.embed:
+        one_by_one = lambda batch: [store.search(1, embedding_service.generate_embedding(question), args.top_k) for question in questions[batch]]
+        batched = lambda batch: store.search_many(1, embedding_service.generate_embeddings(questions[batch]), args.top_k)
+        # Load the model before timing
+        embedding_service.generate_embeddings(questions[:1])
+    else:
+        one_by_one = lambda batch: [store.search(1, vector, args.top_k) for vector in vectors[batch]]
+        batched = lambda batch: store.search_many(1, vectors[batch], args.top_k)
+    
+    baseline = throughput(args.queries, max(batch_sizes), one_by_one)
+    print(f"{'search per query':<24} {baseline:>9.0f} queries/s")
+    for batch_size in batch_sizes:
+        rate = throughput(args.queries, batch_size, batched)
+        print(f"{f'search_many batch {batch_size}':<24} {rate:>9.0f} queries/s  {rate / baseline:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
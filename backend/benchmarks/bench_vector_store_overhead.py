@@ -0,0 +1,102 @@
+"""
+Benchmark: per-call overhead of the vector store service.
+
+Fills a scratch vector store (ChromaDB, or the native backend with
+``--backend native``) with a number of small company collections and times searches and collection counts spread over them,
+first looking every collection up per call (the LRU disabled, as before
+collection handles were cached) and then with cached handles. A raw
+``collection.query`` on a handle held by the benchmark is the floor.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_vector_store_overhead --companies 20 --chunks 200 --queries 1000
+    python -m benchmarks.bench_vector_store_overhead --backend native
+"""
+import argparse
+import tempfile
+import time
+from typing import Callable, Dict
+
+import numpy as np
+
+from app.config import settings
+from app.services.embedding_service import normalize_rows
+
+
+def timed(calls: int, call: Callable[[int], object]) -> np.ndarray:
+    """Run call(index) ``calls`` times, returning each call's duration in microseconds."""
+    durations = np.empty(calls)
+    for index in range(calls):
+        started = time.perf_counter()
+        call(index)
+        durations[index] = (time.perf_counter() - started) * 1e6
+    return durations
+
+
+def describe(durations: np.ndarray) -> str:
+    return (
+        f"mean {durations.mean():>7.0f} us  p50 {np.percentile(durations, 50):>7.0f} us  "
+        f"p95 {np.percentile(durations, 95):>7.0f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--companies", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=200, help="chunks per company")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--backend", choices=("chroma", "native"), default="chroma")
+    args = parser.parse_args()
+    
+    settings.VECTOR_STORE_BACKEND = args.backend
+    settings.CHROMA_DB_DIR = tempfile.mkdtemp(prefix="bench_chroma_")
+    settings.VECTOR_STORE_NATIVE_DIR = tempfile.mkdtemp(prefix="bench_vectors_")
+    from app.services.vector_store_service import VectorStoreService
+    
+    rng = np.random.default_rng(args.seed)
+    store = VectorStoreService()
+    for company_id in range(1, args.companies + 1):
+        store.create_collection(company_id)
+        chunks = [
+            {"text": f"chunk {index}", "chunk_index": index, "page_number": 1, "char_count": 8}
+            for index in range(args.chunks)
+        ]
+        vectors = normalize_rows(rng.standard_normal((args.chunks, args.dimension), dtype=np.float32))
+        store.add_documents(company_id, 1, chunks, vectors)
+    
+    queries = normalize_rows(rng.standard_normal((args.queries, args.dimension), dtype=np.float32))
+    company_of = [1 + index % args.companies for index in range(args.queries)]
+    print(
+        f"{args.companies} companies x {args.chunks} chunks, {args.dimension} dimensions, "
+        f"{args.queries} calls each, {args.backend} backend\n"
+    )
+    
+    handles = {
+        company_id: store.backend.get_collection(f"company_{company_id}_documents")
+        for company_id in set(company_of)
+    }
+    results: Dict[str, Dict[str, np.ndarray]] = {}
+    cache_size = settings.VECTOR_STORE_COLLECTION_CACHE_SIZE
+    for label, size in (("lookup per call", 0), ("cached handles", cache_size)):
+        settings.VECTOR_STORE_COLLECTION_CACHE_SIZE = size
+        store._forget(*[f"company_{company_id}_documents" for company_id in handles])
+        results[label] = {
+            "search": timed(args.queries, lambda index: store.search(company_of[index], queries[index])),
+            "count": timed(args.queries, lambda index: store.get_collection_count(company_of[index]))
+        }
+    
+    # Last, so every index is already loaded
+    results["raw query"] = {"search": timed(args.queries, lambda index: handles[company_of[index]].query(
+        query_embeddings=queries[index:index + 1],
+        n_results=settings.TOP_K_RETRIEVAL,
+        include=["documents", "metadatas", "distances"]
+    ))}
+    
+    for label, timings in results.items():
+        for operation, durations in timings.items():
+            print(f"{label:<16} {operation:<7} {describe(durations)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Check: importing the application stays fast.
+
+Imports ``app.main`` in fresh interpreters and fails (exit status 1) when
+the fastest import takes longer than the budget, or when it pulls in a
+heavy library that should only load at startup (the model, the vector
+store). Prints the slowest modules from ``-X importtime`` to show where
+the time goes.
+
+Usage (from the backend directory):
+    python -m benchmarks.check_import_time --budget 2.0 --runs 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# Loaded by the warm-up at startup, never by importing the app
+HEAVY_MODULES = ("torch", "transformers", "sentence_transformers", "chromadb", "onnxruntime", "pdfplumber", "PyPDF2")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SCRIPT = (
+    "import sys, json, app.main; "
+    f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))"
+)
+
+
+def import_app(importtime: bool = False) -> Tuple[float, List[str], str]:
+    """Import the app in a fresh interpreter, returning (seconds, heavy modules loaded, stderr)."""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", IMPORT_SCRIPT]
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+    seconds = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing app.main failed:\n{result.stderr}")
+    return seconds, json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_modules(importtime_output: str, count: int) -> List[Tuple[str, int]]:
+    """Parse ``-X importtime`` output into the packages and app modules with the highest cumulative time (us)."""
+    cumulative: Dict[str, int] = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, total, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if not total.strip().isdigit() or name == "app.main":
+            continue
+        # Nested modules are included in their package's time, except the app's own
+        if "." not in name or name.startswith("app."):
+            cumulative[name] = int(total)
+    return sorted(cumulative.items(), key=lambda item: -item[1])[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds allowed for the fastest import")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    
+    runs = [import_app() for _ in range(args.runs)]
+    seconds = min(run[0] for run in runs)
+    heavy = runs[0][1]
+    
+    _, _, importtime_output = import_app(importtime=True)
+    print(f"import app.main: {seconds:.2f}s (fastest of {args.runs}, budget {args.budget:.2f}s)\n")
+    for name, microseconds in slowest_modules(importtime_output, args.top):
+        print(f"{microseconds / 1000:>9.1f} ms  {name}")
+    
+    failures = []
+    if seconds > args.budget:
+        failures.append(f"import took {seconds:.2f}s, over the {args.budget:.2f}s budget")
+    if heavy:
+        failures.append(f"import loaded {', '.join(heavy)}, which should load at startup instead")
+    for failure in failures:
+        print(f"\nFAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Check: the native vector store backend behaves like the ChromaDB one.
+
+Runs the same sequence of vector store calls against scratch ChromaDB
+and native stores (exact, and with the IVF index forced on): adds with
+repeated ids, upserts, chunk and document deletes, a shadow rebuild and
+swap, lookups and searches. Then it compares what the calls returned.
+Lookups must match exactly. Searches must return the same texts,
+metadata and scores for the chunks both backends find. ChromaDB's HNSW
+index is approximate, so the top-k lists themselves are compared with
+the exact nearest neighbours instead. Native exact search must find all
+of them, and the IVF index at least ``--min-recall`` of them. ChromaDB's
+own recall is printed for reference. Exits with status 1 on any mismatch.
+
+Usage (from the backend directory):
+    python -m benchmarks.check_vector_backend_parity --documents 20 --chunks 50 --queries 100
+"""
+import argparse
+import logging
+import sys
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+
+from app.config import settings
+from app.services.embedding_service import normalize_rows
+
+COMPANY_ID = 1
+# Observed search results and the exact neighbour distances they are scored against
+SEARCHES = (("search", "truth"), ("search after swap", "truth after swap"))
+
+
+def make_chunks(document_id: int, count: int, version: str = "") -> List[Dict]:
+    return [
+        {
+            "text": f"document {document_id} chunk {index}{version}",
+            "chunk_index": index,
+            "page_number": 1 + index // 10,
+            "char_count": 20 + index,
+            "chunk_hash": f"{document_id}-{index}{version}"
+        }
+        for index in range(count)
+    ]
+
+
+def run_scenario(backend: str, index: str, args, rng_seed: int) -> Dict[str, object]:
+    """Run the call sequence on a fresh store, returning what each step observed."""
+    from app.services.vector_store_service import VectorStoreService
+    
+    settings.VECTOR_STORE_BACKEND = backend
+    settings.VECTOR_STORE_NATIVE_INDEX = index
+    settings.VECTOR_STORE_IVF_MIN_ROWS = 0
+    settings.CHROMA_DB_DIR = tempfile.mkdtemp(prefix="parity_chroma_")
+    settings.VECTOR_STORE_NATIVE_DIR = tempfile.mkdtemp(prefix="parity_vectors_")
+    # A fresh process-wide backend in the scratch directory
+    VectorStoreService._backend = None
+    VectorStoreService._collections.clear()
+    VectorStoreService._live_names.clear()
+    VectorStoreService._generation = None
+    store = VectorStoreService()
+    
+    rng = np.random.default_rng(rng_seed)
+    # Chunks of a document scatter around its topic, as real embeddings cluster
+    vectors = {
+        document_id: normalize_rows(
+            rng.standard_normal(args.dimension, dtype=np.float32)
+            + rng.standard_normal((args.chunks, args.dimension), dtype=np.float32)
+        )
+        for document_id in range(1, args.documents + 1)
+    }
+    observed: Dict[str, object] = {}
+    
+    store.create_collection(COMPANY_ID)
+    for document_id, document_vectors in vectors.items():
+        store.add_documents(COMPANY_ID, document_id, make_chunks(document_id, args.chunks), document_vectors)
+    # Existing ids are skipped, not overwritten
+    store.add_documents(COMPANY_ID, 1, make_chunks(1, args.chunks, " again"), vectors[2])
+    
+    vectors[2] = normalize_rows(vectors[2] + rng.standard_normal(vectors[2].shape, dtype=np.float32))
+    store.upsert_documents(COMPANY_ID, 2, make_chunks(2, args.chunks, " v2"), vectors[2])
+    store.delete_chunks(COMPANY_ID, [store.get_chunk_id(4, index) for index in range(0, args.chunks, 3)])
+    store.delete_document(COMPANY_ID, 3)
+    observed["count after writes"] = store.get_collection_count(COMPANY_ID)
+    observed["chunks"] = {
+        document_id: store.get_document_chunks(COMPANY_ID, document_id, include_embeddings=True)
+        for document_id in (1, 2, 3, 4)
+    }
+    ids = [store.get_chunk_id(document_id, 0) for document_id in vectors] + ["doc_999_chunk_0"]
+    observed["embeddings"] = store.get_embeddings(COMPANY_ID, ids)
+    
+    # Queries near stored chunks
+    stored = np.concatenate([vectors[document_id] for document_id in vectors if document_id != 3])
+    queries = stored[rng.choice(len(stored), args.queries)]
+    queries = normalize_rows(queries + 0.5 * rng.standard_normal(queries.shape, dtype=np.float32))
+    observed["search"] = [store.search(COMPANY_ID, query, top_k=args.top_k) for query in queries]
+    live = store.get_embeddings(COMPANY_ID, [
+        store.get_chunk_id(document_id, index) for document_id in vectors for index in range(args.chunks)
+    ])
+    observed["truth"] = nearest_distances(queries, np.stack(list(live.values())), args.top_k)
+    
+    try:
+        store.search(COMPANY_ID, queries[0][:args.dimension // 2])
+        observed["wrong dimension"] = "accepted"
+    except ValueError:
+        observed["wrong dimension"] = "ValueError"
+    
+    # Rebuild into the shadow collection and put it live
+    shadow = store.get_shadow_collection_name(COMPANY_ID)
+    store.reset_collection(COMPANY_ID, shadow)
+    for document_id in (5, 6):
+        store.add_documents(COMPANY_ID, document_id, make_chunks(document_id, args.chunks), vectors[document_id], collection_name=shadow)
+    store.swap_collection(COMPANY_ID, shadow)
+    observed["collections after swap"] = [
+        name for name in store.backend.list_collection_names() if name.startswith(f"company_{COMPANY_ID}_")
+    ]
+    observed["live after swap"] = store._get_collection_name(COMPANY_ID)
+    observed["count after swap"] = store.get_collection_count(COMPANY_ID)
+    observed["search after swap"] = [store.search(COMPANY_ID, query, top_k=args.top_k) for query in queries[:10]]
+    observed["truth after swap"] = nearest_distances(queries[:10], np.concatenate([vectors[5], vectors[6]]), args.top_k)
+    observed["sample size"] = len(store.sample_texts(args.chunks))
+    return observed
+
+
+def nearest_distances(queries: np.ndarray, rows: np.ndarray, k: int) -> np.ndarray:
+    """Exact squared L2 distances of each query's k nearest rows, ascending."""
+    distances = ((queries[:, None, :] - rows[None, :, :]) ** 2).sum(axis=2)
+    return np.sort(distances, axis=1)[:, :k]
+
+
+def recall(searches: List[List[Dict]], truth: np.ndarray) -> float:
+    """Share of the true k nearest neighbours found, counting ties with the k-th as found."""
+    found = [
+        sum(1 - result["score"] <= query_truth[-1] + 1e-4 for result in results[:len(query_truth)])
+        for results, query_truth in zip(searches, truth)
+    ]
+    return sum(found) / truth.size
+
+
+def compare_chunks(expected: Dict, actual: Dict) -> List[str]:
+    failures = []
+    for document_id, chunks in expected.items():
+        if set(chunks) != set(actual[document_id]):
+            failures.append(f"document {document_id}: chunk ids differ")
+            continue
+        for chunk_id, chunk in chunks.items():
+            other = actual[document_id][chunk_id]
+            if chunk["metadata"] != other["metadata"]:
+                failures.append(f"{chunk_id}: metadata {chunk['metadata']} != {other['metadata']}")
+            if not np.allclose(chunk["embedding"], other["embedding"], atol=1e-6):
+                failures.append(f"{chunk_id}: embeddings differ")
+    return failures
+
+
+def compare_searches(expected: List[List[Dict]], actual: List[List[Dict]], label: str) -> List[str]:
+    """Check that the chunks both backends return come back with the same text, metadata and score."""
+    failures = []
+    for position, (results, other_results) in enumerate(zip(expected, actual)):
+        by_text = {result["text"]: result for result in results}
+        for result in other_results:
+            reference = by_text.get(result["text"])
+            if reference is None:
+                continue
+            if result["metadata"] != reference["metadata"] or result["document_id"] != reference["document_id"]:
+                failures.append(f"{label} query {position}: metadata of '{result['text']}' differs")
+            if abs(result["score"] - reference["score"]) > 1e-4:
+                failures.append(
+                    f"{label} query {position}: score of '{result['text']}' "
+                    f"{result['score']:.6f} != {reference['score']:.6f}"
+                )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=50, help="chunks per document")
+    parser.add_argument("--dimension", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--min-recall", type=float, default=0.9, help="required recall of the IVF index")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    if args.documents < 6:
+        parser.error("--documents must be at least 6")
+    # ChromaDB warns about every repeated id the scenario adds on purpose
+    logging.getLogger("chromadb").setLevel(logging.ERROR)
+    
+    reference = run_scenario("chroma", "flat", args, args.seed)
+    for key, truth_key in SEARCHES:
+        print(f"chroma {key}: recall@{args.top_k} {recall(reference[key], reference[truth_key]):.3f}")
+    failures = []
+    for index in ("flat", "ivf"):
+        label = f"native/{index}"
+        observed = run_scenario("native", index, args, args.seed)
+        for key in ("count after writes", "wrong dimension", "collections after swap", "count after swap", "sample size"):
+            if observed[key] != reference[key]:
+                failures.append(f"{label} {key}: {observed[key]!r} != chroma {reference[key]!r}")
+        failures.extend(f"{label} {failure}" for failure in compare_chunks(reference["chunks"], observed["chunks"]))
+        if set(observed["embeddings"]) != set(reference["embeddings"]) or not all(
+            np.allclose(vector, observed["embeddings"][chunk_id], atol=1e-6)
+            for chunk_id, vector in reference["embeddings"].items()
+        ):
+            failures.append(f"{label} embeddings by id differ")
+        
+        # Exact search must find every true neighbour, IVF most of them
+        required = 1.0 if index == "flat" else args.min_recall
+        for key, truth_key in SEARCHES:
+            failures.extend(compare_searches(reference[key], observed[key], f"{label} {key}"))
+            key_recall = recall(observed[key], observed[truth_key])
+            print(f"{label} {key}: recall@{args.top_k} {key_recall:.3f}")
+            if key_recall < required - 1e-9:
+                failures.append(f"{label} {key}: recall {key_recall:.3f} below {required}")
+    
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("Backends agree")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()